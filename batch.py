@@ -0,0 +1,109 @@
+""" batch conversion: parse all docx files in a folder (or matching a glob) in a process pool """
+import glob
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+from xml.etree.ElementTree import ParseError
+
+from rich.console import Console
+from rich.table import Table
+
+from document import get_parsed_document, IncorrectNumberofQuestions, IncorrectAnswerMarking, \
+    IncorrectNumberofAnswers
+from validate import validate
+
+
+def find_documents(path_or_glob: str) -> List[str]:
+    """
+    :param path_or_glob: a folder (all its .docx files are used) or a glob pattern
+    :return: sorted list of docx filenames, without the lock files (~$...) of Word
+    """
+    pattern = os.path.join(path_or_glob, '*.docx') if os.path.isdir(path_or_glob) else path_or_glob
+    return sorted(filename for filename in glob.glob(pattern)
+                  if not os.path.basename(filename).startswith('~'))
+
+
+def convert_file(filename: str, check_num_questions: int = 0, normalize_fontsize: int = 0) -> dict:
+    """
+    Parse one document, runs in a worker process. A document with errors in its
+    structure is rejected before the parse, its error has a line per problem
+    :return: dict with the result: filename, ok, quizzes, questions,
+    not_recognized (number of lines), error, warnings (of the check before the parse), seconds
+    """
+    start = time.perf_counter()
+    result = dict(filename=filename, ok=False, quizzes=0, questions=0,
+                  not_recognized=0, error='', warnings=[])
+    try:
+        validation = validate(filename, check_num_questions=check_num_questions)
+        result['warnings'] = [str(warning) for warning in validation.warnings]
+        if not validation.ok:
+            result['error'] = '\n'.join(str(problem) for problem in validation.problems)
+            result['seconds'] = time.perf_counter() - start
+            return result
+        document = get_parsed_document(filename, normalize_fontsize=normalize_fontsize)
+        quiz_data, not_recognized = document.quiz_data(check_num_questions=check_num_questions)
+    except (IncorrectNumberofQuestions, IncorrectAnswerMarking, IncorrectNumberofAnswers) as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    except (zipfile.BadZipFile, ParseError, KeyError, OSError) as e:  # no docx
+        result['error'] = f"{type(e).__name__}: {e}"
+    else:
+        result.update(ok=not not_recognized,
+                      quizzes=len(quiz_data),
+                      questions=sum(len(questions) for _, questions in quiz_data),
+                      not_recognized=len(not_recognized))
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def convert_batch(path_or_glob: str,
+                  check_num_questions: int = 0,
+                  normalize_fontsize: int = 0,
+                  workers: Optional[int] = None) -> List[dict]:
+    """
+    Parse all documents found by path_or_glob, in parallel
+    :param path_or_glob: see find_documents
+    :param check_num_questions: number of questions in a document (0 is no check)
+    :param normalize_fontsize: if > 0 change fontsizes Q&A
+    :param workers: number of processes, default the number of cores
+    :return: list of results (see convert_file) in filename order
+    """
+    filenames = find_documents(path_or_glob)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(convert_file, filename, check_num_questions,
+                                   normalize_fontsize): filename for filename in filenames}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:  # of the worker (e.g. it died), the other files go on
+                results.append(dict(filename=futures[future], ok=False, quizzes=0, questions=0,
+                                    not_recognized=0, error=f"{type(e).__name__}: {e}",
+                                    warnings=[], seconds=0.0))
+    return sorted(results, key=lambda result: result['filename'])
+
+
+def show_results(console: Console, results: List[dict], seconds: float):
+    """ print the results of convert_batch as a table """
+    table = Table(title=f"{len(results)} documents converted in {seconds:.2f}s")
+    table.add_column("File", style="cyan")
+    table.add_column("Quizzes", justify="right")
+    table.add_column("Questions", justify="right")
+    table.add_column("Not recognized", justify="right")
+    table.add_column("Time (s)", justify="right")
+    table.add_column("Result")
+    for result in results:
+        if result['error']:
+            status = f"[bold red]{result['error']}[/]"
+        elif result['not_recognized']:
+            status = "[yellow]check not recognized lines[/]"
+        else:
+            status = "[green]ok[/]"
+        table.add_row(os.path.basename(result['filename']),
+                      str(result['quizzes']),
+                      str(result['questions']),
+                      str(result['not_recognized']),
+                      f"{result['seconds']:.2f}",
+                      status)
+    console.print(table)
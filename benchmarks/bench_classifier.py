@@ -0,0 +1,78 @@
+""" micro-benchmark of the paragraph classification: w2q.parse (rule after rule) and
+classifier.Classifier (one combined expression) on the paragraphs of a synthetic document
+or a docx, e.g.
+
+    python benchmarks/bench_classifier.py --sections 50 --repeat 5
+    python benchmarks/bench_classifier.py --docx data/version2.docx
+
+Both must give the same result for every paragraph, the benchmark stops if they don't """
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.dirname(HERE)
+sys.path.insert(0, APP)  # the modules of the app
+
+import synthetic  # noqa: E402
+
+
+def read_paragraphs(filename: str) -> list:
+    import docxstream
+    return [par.strip() for par in docxstream.iter_paragraphs(filename) if par.strip()]
+
+
+def paragraphs_per_second(function, paragraphs: list, repeat: int) -> float:
+    """ :return: the best of repeat runs """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for par in paragraphs:
+            function(par)
+        best = min(best, time.perf_counter() - start)
+    return len(paragraphs) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the paragraph classification")
+    parser.add_argument('--docx', help="the paragraphs of this docx instead of a synthetic one")
+    parser.add_argument('--sections', type=int, default=20)
+    parser.add_argument('--questions', type=int, default=10, help="per section")
+    parser.add_argument('--unrecognized', type=int, default=1, help="lines per section")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    import word2quiz as w2q
+    from classifier import get_classifier
+    from rich.console import Console
+    from rich.table import Table
+
+    if args.docx:
+        paragraphs = read_paragraphs(args.docx)
+    else:
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'synthetic.docx')
+            synthetic.make_docx(filename, sections=args.sections, questions=args.questions,
+                                unrecognized=args.unrecognized)
+            paragraphs = read_paragraphs(filename)
+
+    classify = get_classifier().classify
+    different = [par for par in paragraphs if classify(par) != w2q.parse(par)]
+    if different:
+        sys.exit(f"{len(different)} paragraphs are classified differently, e.g. {different[0]!r}")
+
+    table = Table(title=f"{len(paragraphs)} paragraphs, best of {args.repeat}")
+    table.add_column("Classifier")
+    table.add_column("paragraphs/s", justify="right")
+    table.add_column("speedup", justify="right")
+    before = paragraphs_per_second(w2q.parse, paragraphs, args.repeat)
+    after = paragraphs_per_second(classify, paragraphs, args.repeat)
+    table.add_row("w2q.parse", f"{before:,.0f}", "")
+    table.add_row("Classifier.classify", f"{after:,.0f}", f"{after / before:.2f}x")
+    Console().print(table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+""" benchmark of the document-to-quiz pipeline on a synthetic document, e.g.
+
+    python benchmarks/bench_pipeline.py --sections 20 --questions 10 --repeat 5
+
+Every stage runs --repeat times (p50/p95 of those) and once more with tracemalloc
+for its peak memory. The results are added to benchmarks/results.jsonl and shown
+next to the previous result of the same configuration, so regressions stand out """
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.dirname(HERE)
+sys.path.insert(0, APP)  # the modules of the app
+
+import synthetic  # noqa: E402
+import stubcanvas  # noqa: E402
+
+RESULTS = os.path.join(HERE, 'results.jsonl')
+FANOUT_COURSES = [1, 2, 3]
+
+
+def percentile(values, fraction: float) -> float:
+    """ nearest rank percentile """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def get_stages(filename: str, canvas_url: str):
+    """ :return: list of (name, function) in the order of the pipeline """
+    import word2quiz as w2q
+    import docxstream
+    from document import ParsedDocument
+    from preview import preview_items
+    from upload import CanvasApi, PreparedUpload, QuizUploader
+    from images import CourseImages
+    from qti import QtiUploader, write_package
+    from fanout import FanoutUploader
+    from normalize import write_normalized
+    from validate import validate
+    from journal import UploadJournal
+    from httpsession import get_session
+
+    document = ParsedDocument(filename)
+    data, _ = document.quiz_data()
+    api = CanvasApi(canvas_url, 'benchmark', session=get_session())
+    journal = UploadJournal.for_data(data)
+    prepared = PreparedUpload(data, docx=filename)
+
+    def get_document_html():
+        with contextlib.redirect_stdout(io.StringIO()):  # it prints every paragraph
+            w2q.get_document_html(filename)
+
+    def parse_document_d2p():
+        w2q.parse_document_d2p(filename, check_num_questions=0)
+
+    def stream_paragraphs():  # the reader of parse
+        for _ in docxstream.iter_paragraphs(filename):
+            pass
+
+    def validate_structure():  # the check of batch and service before parse
+        assert validate(filename).ok
+
+    def parse():  # what the app uses instead of parse_document_d2p
+        ParsedDocument(filename).quiz_data()
+
+    def normalize_docx():  # the normalized copy of normalize_fontsize 12
+        write_normalized(filename, os.path.join(os.path.dirname(filename), 'normalized.docx'), 12)
+
+    def preview():
+        ''.join(preview_items(document, 'not recognized'))
+
+    def create_quizzes_from_data():
+        stats = QuizUploader(api).create_quizzes_from_data(1, data, resume=False)
+        assert not stats.errors, stats.errors[:3]
+
+    def upload_images():  # before create_quizzes_from_data, each unique image once
+        CourseImages.forget(1)  # upload all again
+        _, errors = prepared.course_payloads(api, 1)
+        assert not errors, errors[:3]
+
+    def fanout():  # the same quizzes in FANOUT_COURSES courses
+        for course_id in FANOUT_COURSES:
+            journal.clear(course_id)  # create all again
+        stats = FanoutUploader(api, QuizUploader).create_quizzes_from_data(FANOUT_COURSES, data)
+        assert not stats.errors, stats.errors[:3]
+
+    def export_qti():
+        write_package(os.path.join(os.path.dirname(filename), 'quizzes.zip'), data)
+
+    def upload_qti():  # instead of create_quizzes_from_data
+        stats = QtiUploader(api, poll_seconds=0).create_quizzes_from_data(1, data)
+        assert not stats.errors, stats.errors[:3]
+
+    return [('get_document_html', get_document_html),
+            ('parse_document_d2p', parse_document_d2p),
+            ('stream_paragraphs', stream_paragraphs),
+            ('validate', validate_structure),
+            ('parse', parse),
+            ('normalize_docx', normalize_docx),
+            ('preview', preview),
+            ('upload_images', upload_images),
+            ('create_quizzes_from_data', create_quizzes_from_data),
+            ('fanout', fanout),
+            ('export_qti', export_qti),
+            ('upload_qti', upload_qti)]
+
+
+def measure(function, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dict(p50=percentile(times, 0.5), p95=percentile(times, 0.95), peak_kib=peak // 1024)
+
+
+def previous_result(config: dict):
+    """ :return: the last stored result with the same configuration or None """
+    last = None
+    if os.path.exists(RESULTS):
+        with open(RESULTS, encoding='utf-8') as results:
+            for line in results:
+                result = json.loads(line)
+                if result['config'] == config:
+                    last = result
+    return last
+
+
+def show(result: dict, previous):
+    from rich.console import Console
+    from rich.table import Table
+
+    config = result['config']
+    table = Table(title=f"{config['sections']} sections x {config['questions']} questions "
+                        f"({result['document']['paragraphs']} paragraphs), "
+                        f"repeat {config['repeat']}")
+    table.add_column("Stage")
+    table.add_column("p50 ms", justify="right")
+    table.add_column("p95 ms", justify="right")
+    table.add_column("questions/s", justify="right")
+    table.add_column("peak KiB", justify="right")
+    table.add_column(f"vs {previous['commit'] or 'previous'}" if previous else "", justify="right")
+    for name, stage in result['stages'].items():
+        change = ''
+        if previous and name in previous['stages']:
+            ratio = stage['p50'] / previous['stages'][name]['p50'] - 1
+            color = 'red' if ratio > 0.1 else 'green' if ratio < -0.1 else ''
+            change = f"[{color}]{ratio:+.0%}[/]" if color else f"{ratio:+.0%}"
+        table.add_row(name, f"{stage['p50'] * 1000:.1f}", f"{stage['p95'] * 1000:.1f}",
+                      f"{stage['questions_per_s']:.0f}", str(stage['peak_kib']), change)
+    Console().print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the docx to quiz pipeline")
+    parser.add_argument('--sections', type=int, default=10)
+    parser.add_argument('--questions', type=int, default=10, help="per section")
+    parser.add_argument('--answers', type=int, default=4, help="per question")
+    parser.add_argument('--runs', type=int, default=3, help="formatting runs per paragraph")
+    parser.add_argument('--unrecognized', type=int, default=1, help="lines per section")
+    parser.add_argument('--images', type=int, default=0, help="media parts, see synthetic.py")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help="seconds per request of the stub Canvas")
+    parser.add_argument('--https', action='store_true',
+                        help="the stub Canvas serves https, connections cost a tls handshake")
+    parser.add_argument('--stages', nargs='*', help="only these stages")
+    parser.add_argument('--no-save', action='store_true', help="don't add to results.jsonl")
+    args = parser.parse_args()
+    config = dict(sections=args.sections, questions=args.questions, answers=args.answers,
+                  runs=args.runs, unrecognized=args.unrecognized, repeat=args.repeat,
+                  latency=args.latency)
+    if args.images:  # results without images stay comparable
+        config['images'] = args.images
+    if args.https:
+        config['https'] = True
+
+    from httpsession import connection_stats, get_session
+
+    server = stubcanvas.start(latency=args.latency, tls=args.https)
+    if server.certfile:  # trust the stub, a CA bundle of the environment would win over verify
+        get_session().verify = server.certfile
+        get_session().trust_env = False
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)  # the upload journal goes to databases/ of the current folder
+        filename = os.path.join(folder, 'synthetic.docx')
+        document = synthetic.make_docx(filename, sections=args.sections,
+                                       questions=args.questions, answers=args.answers,
+                                       runs=args.runs, unrecognized=args.unrecognized,
+                                       images=args.images)
+        stages = {}
+        canvas_url = f"{server.scheme}://127.0.0.1:{server.server_port}"
+        for name, function in get_stages(filename, canvas_url):
+            if args.stages and name not in args.stages:
+                continue
+            stage = measure(function, args.repeat)
+            stage['questions_per_s'] = document['questions'] / stage['p50']
+            stages[name] = stage
+        os.chdir(APP)
+    server.shutdown()
+
+    result = dict(time=time.strftime('%Y-%m-%dT%H:%M:%S'), commit=git_commit(),
+                  python=platform.python_version(), config=config, document=document,
+                  stages=stages)
+    show(result, previous_result(config))
+    print(f"{connection_stats.requests} http requests over {connection_stats.opened} "
+          f"opened connections")
+    if not args.no_save:
+        with open(RESULTS, 'a', encoding='utf-8') as results:
+            results.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
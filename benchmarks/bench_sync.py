@@ -0,0 +1,115 @@
+""" benchmark of the course sync (coursesync.py) against the stub Canvas, e.g.
+
+    python benchmarks/bench_sync.py --courses 500 --students 40
+
+The syncs run in a temporary folder, on the empty canvasrobot tables of the
+databases/storage.sqlite of the app:
+    full         the first sync, all courses and their enrollments
+    unchanged    nothing changed in Canvas, only the course list is fetched
+    enrolled     students enrolled in some courses, those courses are fetched
+    swapped      in some courses a student left and another one enrolled: the number of
+                 students is the same, the sync doesn't see it
+    refreshed    the sync after [sync] refresh_hours, it fetches all courses again
+After every sync the students in course2user are compared with those of the stub """
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.dirname(HERE)
+sys.path.insert(0, APP)  # the modules of the app
+
+import stubcanvas  # noqa: E402
+
+CANVASROBOT_TABLES = ('course', 'user', 'course2user')
+
+
+def create_tables():
+    """ the course tables canvasrobot makes, in databases/ of the current folder """
+    import localdb
+
+    with sqlite3.connect(os.path.join(APP, localdb.db_path())) as app_db:
+        statements = [sql for name, sql in app_db.execute("SELECT name, sql FROM sqlite_master "
+                                                          "WHERE type = 'table'")
+                      if name in CANVASROBOT_TABLES]
+    with localdb.connect() as conn:
+        for statement in statements:
+            conn.execute(statement)
+
+
+def local_students() -> dict:
+    """ :return: course id -> the sorted user ids of its students in course2user """
+    import localdb
+    from coursesync import STUDENT_ROLE
+
+    students = {}
+    with localdb.connect() as conn:
+        for course_id, user_id in conn.execute(
+                'SELECT course.course_id, "user".user_id FROM course2user '
+                'JOIN course ON course.id = course2user.course '
+                'JOIN "user" ON "user".id = course2user.user WHERE role = ?', (STUDENT_ROLE,)):
+            students.setdefault(course_id, []).append(user_id)
+    return {course_id: sorted(user_ids) for course_id, user_ids in students.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the course sync")
+    parser.add_argument('--courses', type=int, default=200)
+    parser.add_argument('--students', type=int, default=30, help="per course")
+    parser.add_argument('--changed', type=int, default=10, help="courses changed per step")
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help="seconds per request of the stub Canvas")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    canvas = {course_id: rnd.sample(range(1, 10 * args.students + 1), args.students)
+              for course_id in range(1001, 1001 + args.courses)}
+    next_user = 10 * args.students + 1
+    server = stubcanvas.start(latency=args.latency, courses=canvas)
+
+    from rich.console import Console
+    from rich.table import Table
+    from coursesync import sync_courses
+    from httpsession import get_session
+    from upload import CanvasApi
+
+    api = CanvasApi(f"http://127.0.0.1:{server.server_port}", 'benchmark', session=get_session())
+    table = Table(title=f"course sync of {args.courses} courses x {args.students} students, "
+                        f"latency {args.latency * 1000:.0f}ms")
+    for column in ("Sync", "s", "requests", "changed", "enrollments", "errors", "in sync"):
+        table.add_column(column, justify="left" if column in ("Sync", "in sync") else "right")
+
+    def sync(name: str, refresh_hours: float = 24.0):
+        requests_before = server.requests
+        stats = sync_courses(api, max_workers=8, refresh_hours=refresh_hours)
+        in_sync = local_students() == {course_id: sorted(students)
+                                       for course_id, students in canvas.items() if students}
+        table.add_row(name, f"{stats.seconds:.2f}", str(server.requests - requests_before),
+                      str(stats.changed), str(stats.enrollments), str(len(stats.errors)),
+                      "[green]yes[/]" if in_sync else "[red]no[/]")
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)  # the database goes to databases/ of the current folder
+        create_tables()
+        sync('full')
+        sync('unchanged')
+        for course_id in rnd.sample(sorted(canvas), args.changed):
+            canvas[course_id].append(next_user)
+            next_user += 1
+        sync('enrolled')
+        for course_id in rnd.sample(sorted(canvas), args.changed):
+            canvas[course_id].pop(0)
+            canvas[course_id].append(next_user)
+            next_user += 1
+        sync('swapped')
+        sync('refreshed', refresh_hours=0)
+        os.chdir(HERE)
+    server.shutdown()
+    Console().print(table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+""" a local stand-in for the Canvas REST API, for the benchmarks:
+every POST or PUT returns a new id, DELETE an empty object, after a fixed latency.
+A content migration or a course file gets an upload url for its file, a migration
+is completed right away. The course list and the student enrollments of the courses
+(for coursesync) are pages of the courses given to start, with the Link header of Canvas.
+With tls it serves https, like Canvas, with a self-signed certificate made by openssl """
+import itertools
+import json
+import os
+import re
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+COURSES = re.compile(r'/api/v1/(?:accounts/[^/]+/)?courses$')
+ENROLLMENTS = re.compile(r'/api/v1/courses/(?P<id>\d+)/enrollments$')
+
+
+class StubCanvasHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like Canvas
+    scheme = 'http'
+    latency = 0.0  # seconds per request
+    ids = itertools.count(1)
+    courses: Dict[int, List[int]] = {}  # course id -> the user ids of its students
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, obj, link: Optional[str] = None):
+        time.sleep(self.latency)
+        body = json.dumps(obj).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Rate-Limit-Remaining', '700')
+        if link:
+            self.send_header('Link', link)
+        # headers and body in one write: separate small writes meet Nagle
+        # and delayed ACKs, that adds 40ms per request on some systems
+        self._headers_buffer.append(b'\r\n' + body)
+        self.flush_headers()
+        self.server.requests += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        host = f"{self.scheme}://{self.headers['Host']}"
+        upload = {'upload_url': f"{host}/files_upload", 'upload_params': {'key': 'stub'}}
+        if self.path.endswith('/content_migrations'):
+            self._reply({'id': next(self.ids), 'workflow_state': 'running',
+                         'pre_attachment': upload})
+        elif self.path.endswith('/files'):
+            self._reply(upload)
+        else:
+            self._reply({'id': next(self.ids)})
+
+    def _reply_page(self, items: list):
+        """ reply the page of items the query asks for, with the links to the others """
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        per_page = int(query.get('per_page', ['10'])[0])
+        page = int(query.get('page', ['1'])[0])
+        last = max(1, -(-len(items) // per_page))
+
+        def link(rel: str, number: int) -> str:
+            query['page'] = [str(number)]
+            return (f'<{self.scheme}://{self.headers["Host"]}{url.path}?'
+                    f'{urlencode(query, doseq=True)}>; rel="{rel}"')
+        links = [link('current', page), link('first', 1), link('last', last)]
+        if page < last:
+            links.append(link('next', page + 1))
+        self._reply(items[(page - 1) * per_page:page * per_page], ', '.join(links))
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        enrollments = ENROLLMENTS.match(path)
+        if '/content_migrations/' in self.path:
+            self._reply([] if self.path.endswith('/migration_issues')
+                        else {'id': int(self.path.rsplit('/', 1)[1]),
+                              'workflow_state': 'completed'})
+        elif COURSES.match(path):
+            self._reply_page([{'id': course_id, 'name': f"Course {course_id}",
+                               'course_code': f"C{course_id}",
+                               'sis_course_id': f"SIS-{course_id}",
+                               'total_students': len(students), 'workflow_state': 'available'}
+                              for course_id, students in sorted(self.courses.items())])
+        elif enrollments:
+            students = self.courses.get(int(enrollments.group('id')), [])
+            self._reply_page([{'user_id': user_id, 'type': 'StudentEnrollment',
+                               'user': {'id': user_id, 'sortable_name': f"Student {user_id}, A",
+                                        'login_id': f"s{user_id}"}}
+                              for user_id in students])
+        else:
+            self._reply({})
+
+    do_PUT = do_POST
+
+    def do_DELETE(self):
+        self._reply({})
+
+
+def self_signed_certificate(folder: str) -> str:
+    """ :return: the certificate file of 127.0.0.1 in folder, its key is key.pem """
+    certfile = os.path.join(folder, 'cert.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1',
+                    '-keyout', os.path.join(folder, 'key.pem'), '-out', certfile],
+                   check=True, capture_output=True)
+    return certfile
+
+
+def start(latency: float = 0.0,
+          courses: Optional[Dict[int, List[int]]] = None,
+          tls: bool = False) -> ThreadingHTTPServer:
+    """
+    :param latency: seconds per request
+    :param courses: course id -> the user ids of its students, a change shows in the next GET
+    :param tls: serve https, a client trusts server.certfile (e.g. session.verify)
+    :return: the running server, its url is f"{server.scheme}://127.0.0.1:{server.server_port}"
+    """
+    scheme = 'https' if tls else 'http'
+    handler = type('Handler', (StubCanvasHandler,),
+                   dict(latency=latency, courses=courses or {}, scheme=scheme))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.requests = 0
+    server.scheme = scheme
+    server.certfile = None
+    if tls:
+        server.certfile = self_signed_certificate(tempfile.mkdtemp(prefix='stubcanvas-'))
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(server.certfile, os.path.join(os.path.dirname(server.certfile),
+                                                              'key.pem'))
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,156 @@
+""" synthetic quiz-format docx files of any size for the benchmarks, built like
+data/version1.docx: a title, sections with a bold quiz name, numbered questions with
+lettered answers (Word numbering, the right answer marked with '!') and optionally
+a figure or logo in the questions, the same few images again and again """
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+WP_NS = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Default Extension="png" ContentType="image/png"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/numbering.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"/>
+</Types>"""
+
+PACKAGE_RELS = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="{R_NS}/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+DOCUMENT_RELS = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="{R_NS}/numbering" Target="numbering.xml"/>
+{{}}</Relationships>"""
+IMAGE_REL = f'<Relationship Id="rIdImage{{0}}" Type="{R_NS}/image" Target="media/image{{0}}.png"/>'
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+QUESTION_NUMBERING = 0  # abstractNum ids
+ANSWER_NUMBERING = 1
+
+WORDS = ("sacrament liturgie orthodoxie theologie gemeenschap kerk geloof leer "
+         "priester offer betekenis traditie ritueel handelen bidden leven").split()
+
+
+def abstract_num(abstract_id: int, num_fmt: str) -> str:
+    return (f'<w:abstractNum w:abstractNumId="{abstract_id}"><w:lvl w:ilvl="0">'
+            f'<w:start w:val="1"/><w:numFmt w:val="{num_fmt}"/><w:lvlText w:val="%1)"/>'
+            f'</w:lvl></w:abstractNum>')
+
+
+def num(num_id: int, abstract_id: int) -> str:
+    """ every numbered list gets its own num, docx2python counts per numId """
+    return (f'<w:num w:numId="{num_id}"><w:abstractNumId w:val="{abstract_id}"/>'
+            f'<w:lvlOverride w:ilvl="0"><w:startOverride w:val="1"/></w:lvlOverride></w:num>')
+
+
+def run(text: str, bold=False, italic=False, underline=False, size=0) -> str:
+    props = ''.join(('<w:b/>' if bold else '', '<w:i/>' if italic else '',
+                     '<w:u w:val="single"/>' if underline else '',
+                     f'<w:sz w:val="{size * 2}"/><w:szCs w:val="{size * 2}"/>' if size else ''))
+    return (f'<w:r>{f"<w:rPr>{props}</w:rPr>" if props else ""}'
+            f'<w:t xml:space="preserve">{escape(text)}</w:t></w:r>')
+
+
+def image_run(index: int) -> str:
+    """ an inline picture of media/image{index}.png, like Word makes it """
+    return (f'<w:r><w:drawing><wp:inline><wp:docPr id="{index}" name="Picture {index}" '
+            f'descr="Figure {index}"/><a:graphic><a:graphicData><a:blip r:embed="rIdImage{index}"/>'
+            f'</a:graphicData></a:graphic></wp:inline></w:drawing></w:r>')
+
+
+def paragraph(runs: str, num_id: int = 0) -> str:
+    numbering = (f'<w:pPr><w:numPr><w:ilvl w:val="0"/><w:numId w:val="{num_id}"/>'
+                 f'</w:numPr></w:pPr>' if num_id else '')
+    return f'<w:p>{numbering}{runs}</w:p>'
+
+
+def formatted_runs(text: str, nr_runs: int, prefix: str = '') -> str:
+    """ text in nr_runs runs, every other run in italics like the Latin terms of the examples """
+    words = text.split()
+    size = max(1, len(words) // nr_runs)
+    parts = [' '.join(words[i:i + size]) for i in range(0, len(words), size)]
+    return (run(prefix) if prefix else '') + ''.join(run(part + ' ', italic=index % 2 == 1)
+                                                      for index, part in enumerate(parts))
+
+
+def sentence(rnd: random.Random, nr_words: int) -> str:
+    return ' '.join(rnd.choice(WORDS) for _ in range(nr_words)).capitalize()
+
+
+def make_docx(filename: str,
+              sections: int = 5,
+              questions: int = 10,
+              answers: int = 4,
+              runs: int = 3,
+              unrecognized: int = 1,
+              images: int = 0,
+              seed: int = 0) -> dict:
+    """
+    Write a synthetic quiz docx
+    :param filename: the docx to write
+    :param sections: number of quizzes
+    :param questions: questions per section
+    :param answers: answers per question, one of them is right
+    :param runs: formatting runs per question and answer
+    :param unrecognized: lines per section that are deliberately not in the quiz format
+    :param images: media parts, question after question has the next one. The parts come
+    in pairs with the same content, like a logo pasted twice
+    :param seed: same seed, same document
+    :return: the numbers of the document, for the throughput
+    """
+    rnd = random.Random(seed)
+    body = [paragraph(run('Meerkeuzevragen per hoofdstuk', underline=True, size=24))]
+    nums = []
+    next_num_id = 1
+    nr_question = 0
+    for section in range(sections):
+        body.append(paragraph(run(f'Vragen bij hoofdstuk {section + 1}', bold=True, size=14)))
+        for _ in range(unrecognized):
+            body.append(paragraph(run(f'Zie {sentence(rnd, 6)}')))
+        question_num_id = next_num_id
+        nums.append(num(question_num_id, QUESTION_NUMBERING))
+        next_num_id += 1
+        for _ in range(questions):
+            figure = image_run(nr_question % images + 1) if images else ''
+            nr_question += 1
+            body.append(paragraph(formatted_runs(sentence(rnd, 20) + '?', runs) + figure,
+                                  question_num_id))
+            answer_num_id = next_num_id
+            nums.append(num(answer_num_id, ANSWER_NUMBERING))
+            next_num_id += 1
+            right = rnd.randrange(answers)
+            for index in range(answers):
+                body.append(paragraph(formatted_runs(sentence(rnd, 8), runs,
+                                                     prefix='!' if index == right else ''),
+                                      answer_num_id))
+            body.append(paragraph(''))
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                f'<w:document xmlns:w="{W_NS}" xmlns:r="{R_NS}" xmlns:a="{A_NS}" '
+                f'xmlns:wp="{WP_NS}"><w:body>'
+                f'{"".join(body)}</w:body></w:document>')
+    numbering = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                 f'<w:numbering xmlns:w="{W_NS}">'
+                 f'{abstract_num(QUESTION_NUMBERING, "decimal")}'
+                 f'{abstract_num(ANSWER_NUMBERING, "lowerLetter")}'
+                 f'{"".join(nums)}</w:numbering>')
+    with zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr('[Content_Types].xml', CONTENT_TYPES)
+        docx.writestr('_rels/.rels', PACKAGE_RELS)
+        docx.writestr('word/_rels/document.xml.rels', DOCUMENT_RELS.format(
+            ''.join(IMAGE_REL.format(index) for index in range(1, images + 1))))
+        docx.writestr('word/document.xml', document)
+        docx.writestr('word/numbering.xml', numbering)
+        for index in range(1, images + 1):
+            content = (index + 1) // 2  # image1 and image2 are the same, 3 and 4 etc.
+            docx.writestr(f'word/media/image{index}.png',
+                          PNG_SIGNATURE + random.Random(content).randbytes(20_000))
+    return dict(sections=sections, questions=sections * questions,
+                paragraphs=len(body), bytes=len(document), images=images)
@@ -0,0 +1,93 @@
+""" classification of the paragraphs with the rules of word2quiz, compiled into one
+regular expression: a paragraph is matched once instead of rule after rule like
+w2q.parse does, with the same result
+
+    classify = get_classifier().classify
+    nr, weight, text, p_type = classify('1) What is a sacrament?')
+
+The rules are a table (name, pattern, type), a new format is a rule added to it:
+
+    roman = Rule('question_roman', re.compile(r'^(?P<id>[IVX]+)[.] (?P<text>.*)'), 'Question')
+    Classifier(w2q_rules() + [roman])
+
+The rules are tried in order, as alternatives of the expression, so the first rule
+that matches wins like in w2q.parse. A rule only costs time for the paragraphs the
+rules before it don't match. """
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from quizformat import FULL_SCORE, RULES, Rule
+
+SKIPPED_RULES = ('page_ref_style',)  # w2q.parse goes on with the next rule after these
+NOT_RECOGNIZED = (None, 0, "", 'Not recognized')
+SCOPED_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'), (re.VERBOSE, 'x'))
+
+
+@dataclass(frozen=True)
+class _Alternative:
+    """ the groups of a rule in the combined expression """
+    type: str
+    id: Optional[int]
+    prefix: Optional[int]
+    text: int
+    score: int
+
+
+def w2q_rules() -> List[Rule]:
+    """ :return: the rules of word2quiz (quizformat.RULES), in its order """
+    return list(RULES)
+
+
+def _scoped(pattern: re.Pattern, name: str) -> str:
+    """ :return: the pattern with its groups renamed to rule{name}_<group> and its flags
+    in a scoped group, to be an alternative of the combined expression """
+    if re.search(r'\\[1-9]', pattern.pattern):
+        raise ValueError(f"rule {name}: numbered backreferences can't be combined")
+    source = re.sub(r'\(\?P([<=])(\w+)', rf'(?P\1{name}_\2', pattern.pattern)
+    flags = ''.join(letter for flag, letter in SCOPED_FLAGS if pattern.flags & flag)
+    return f'(?{flags}:{source})' if flags else source
+
+
+class Classifier:
+    """ The rules compiled into one expression, classify gives the result of w2q.parse """
+
+    def __init__(self, rules: List[Rule]):
+        """
+        :param rules: in the order they are tried, the rules in SKIPPED_RULES are left out
+        """
+        rules = [rule for rule in rules if rule.name not in SKIPPED_RULES]
+        names = [f"r{index}" for index in range(len(rules))]
+        self.pattern = re.compile('|'.join(f'(?P<{name}>{_scoped(rule.pattern, name)})'
+                                           for name, rule in zip(names, rules)))
+        groups = self.pattern.groupindex
+        # the group of a rule closes after its inner groups, it is the lastindex of a match
+        self.alternatives = {groups[name]: _Alternative(type=rule.type,
+                                                        id=groups.get(f"{name}_id"),
+                                                        prefix=groups.get(f"{name}_prefix"),
+                                                        text=groups[f"{name}_text"],
+                                                        score=FULL_SCORE if f"{name}_fullscore"
+                                                        in groups else 0)
+                             for name, rule in zip(names, rules)}
+
+    def classify(self, text: str) -> Tuple[object, int, str, str]:
+        """
+        :param text: html of a paragraph
+        :return: tuple like w2q.parse(text): question number (int)/answer id (str),
+        score (if answer), text, type or NOT_RECOGNIZED
+        """
+        match = self.pattern.match(text)
+        if not match:
+            return NOT_RECOGNIZED
+        alternative = self.alternatives[match.lastindex]
+        id_str = (match.group(alternative.id) if alternative.id else None) or ''
+        prefix = (match.group(alternative.prefix) if alternative.prefix else None) or ''
+        return (int(id_str) if id_str.isdigit() else id_str, alternative.score,
+                prefix + match.group(alternative.text).strip(), alternative.type)
+
+
+@lru_cache(maxsize=None)
+def get_classifier() -> Classifier:
+    """ :return: the Classifier of the word2quiz rules, made once """
+    return Classifier(w2q_rules())
@@ -0,0 +1,139 @@
+""" course lookup for the course picker on the Canvas tab, on the course and
+course2user tables canvasrobot keeps in databases/storage.sqlite """
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, NamedTuple, Tuple
+
+import localdb
+
+# the tables are made by canvasrobot, the app only adds indexes
+# NOCASE indexes let a case insensitive LIKE 'prefix%' use them
+INDEXES = """
+CREATE INDEX IF NOT EXISTS course_course_id ON course(course_id);
+CREATE INDEX IF NOT EXISTS course_sis_code_nocase ON course(sis_code COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS course_name_nocase ON course(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS course2user_course ON course2user(course, role);
+CREATE INDEX IF NOT EXISTS course2user_user ON course2user(user);
+"""
+
+MAX_RESULTS = 50  # courses shown in the picker
+STUDENT_ROLE = 'S'
+
+
+class Course(NamedTuple):
+    course_id: int
+    sis_code: str
+    name: str
+    nr_students: int
+
+    def label(self) -> str:
+        """ :return: text in the picker """
+        return f"{self.sis_code or '-'}  {self.name or ''} ({self.course_id})"
+
+
+_lock = threading.Lock()
+_indexed = False
+_generation = 0  # raised by invalidate, results of older generations are not used
+_cache: Dict[Tuple[str, int], List[Course]] = {}
+
+
+def invalidate():
+    """ forget the cached results, call this after the course tables changed """
+    global _generation
+    with _lock:
+        _generation += 1
+        _cache.clear()
+
+
+def _ensure_indexes(conn) -> bool:
+    """ :return: False if canvasrobot did not make the course tables yet """
+    global _indexed
+    if not _indexed:
+        try:
+            conn.executescript(INDEXES)
+        except sqlite3.OperationalError as e:  # no such table
+            logging.info(f"no course tables yet: {e}")
+            return False
+        _indexed = True
+    return True
+
+
+def refresh_student_counts():
+    """ store the number of students of each course in course.nr_students,
+    so the picker doesn't need a join with course2user.
+    Only courses with enrolled students in course2user are updated, canvasrobot
+    fills nr_students of the other courses itself """
+    with localdb.connect() as conn:
+        if not _ensure_indexes(conn):
+            return
+        conn.execute("UPDATE course SET nr_students = "
+                     "(SELECT count(*) FROM course2user "
+                     " WHERE course2user.course = course.id AND role = ?) "
+                     "WHERE id IN (SELECT course FROM course2user WHERE role = ?)",
+                     (STUDENT_ROLE, STUDENT_ROLE))
+    invalidate()
+
+
+def _escape_like(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _query(prefix: str, limit: int) -> List[Course]:
+    with localdb.connect() as conn:
+        if not _ensure_indexes(conn):
+            return []
+        if not prefix:
+            rows = conn.execute("SELECT course_id, sis_code, name, nr_students FROM course "
+                                "WHERE nr_students > 0 "
+                                "ORDER BY sis_code COLLATE NOCASE LIMIT ?",
+                                (limit,)).fetchall()
+        else:
+            # a UNION, so each half can use its own index
+            pattern = _escape_like(prefix) + '%'
+            rows = conn.execute("SELECT course_id, sis_code, name, nr_students FROM course "
+                                "WHERE sis_code LIKE ? ESCAPE '\\' AND nr_students > 0 "
+                                "UNION "
+                                "SELECT course_id, sis_code, name, nr_students FROM course "
+                                "WHERE name LIKE ? ESCAPE '\\' AND nr_students > 0 "
+                                "ORDER BY 2 COLLATE NOCASE LIMIT ?",
+                                (pattern, pattern, limit)).fetchall()
+    return [Course(*row) for row in rows]
+
+
+def find_courses(prefix: str = '', limit: int = MAX_RESULTS) -> List[Course]:
+    """
+    :param prefix: start of the sis_code or the name of the course, case insensitive
+    :param limit: maximum number of courses
+    :return: the courses with students, ordered by sis_code
+    """
+    prefix = prefix.strip()
+    key = (prefix.lower(), limit)
+    with _lock:
+        if key in _cache:
+            return _cache[key]
+        generation = _generation
+        # typing one more character: filter the complete result of the shorter prefix
+        shorter = _cache.get((key[0][:-1], limit)) if prefix else None
+    if shorter is not None and len(shorter) < limit:
+        courses = [course for course in shorter
+                   if any((text or '').lower().startswith(key[0])
+                          for text in (course.sis_code, course.name))]
+    else:
+        courses = _query(prefix, limit)
+    with _lock:
+        if generation == _generation:
+            _cache[key] = courses
+    return courses
+
+
+def find_course(label_or_id: str):
+    """ :return: course_id of the picker text (a label or a course_id), None if unknown """
+    text = label_or_id.strip()
+    if text.isdigit():
+        return int(text)
+    if text.endswith(')') and '(' in text:
+        course_id = text[text.rindex('(') + 1:-1]
+        if course_id.isdigit():
+            return int(course_id)
+    return None
@@ -0,0 +1,230 @@
+""" incremental sync of the Canvas courses and their students into the course, user and
+course2user tables canvasrobot keeps in databases/storage.sqlite, for the course picker
+
+The course list is fetched completely (it is cheap, the pages are fetched concurrently),
+the enrollments only of the courses that are new or changed since the last sync, or that
+were synced longer than [sync] refresh_hours ago: the number of students stays the same
+when a student leaves and another one enrolls """
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+import requests
+
+import courses
+import localdb
+import timing
+from settings import config
+from upload import CanvasApi
+
+# high-water mark per course: the enrollments were fetched at synced, when it looked like this
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS course_sync(
+    course_id INTEGER PRIMARY KEY,
+    total_students INTEGER,
+    workflow_state TEXT,
+    synced REAL NOT NULL
+);
+"""
+
+STUDENT_ROLE = courses.STUDENT_ROLE
+
+
+@dataclass
+class SyncStats:
+    courses: int = 0  # in Canvas
+    changed: int = 0  # new or changed since the last sync, their enrollments were fetched
+    enrollments: int = 0
+    errors: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def page_url(url: str, page: int) -> str:
+    """ :return: url (from a Link header) for another page """
+    parts = urlparse(url)
+    query = parse_qs(parts.query)
+    query['page'] = [str(page)]
+    return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def get_all_pages(api: CanvasApi, path: str, params: dict,
+                  executor: Optional[ThreadPoolExecutor] = None) -> list:
+    """
+    :param api: CanvasApi
+    :param path: path after /api/v1/ of a paginated list
+    :param params: query parameters, include per_page
+    :param executor: fetch the pages after the first concurrently, when Canvas tells the last page
+    :return: the items of all pages, in order
+    """
+    items, links = api.get_page(path, params=params)
+    last = parse_qs(urlparse(links['last']).query).get('page', [''])[0] if 'last' in links else ''
+    if executor and last.isdigit():  # not a bookmark
+        urls = [page_url(links['last'], page) for page in range(2, int(last) + 1)]
+        for page_items in executor.map(lambda url: api.get_page(url)[0], urls):
+            items.extend(page_items)
+        return items
+    while 'next' in links:
+        page_items, links = api.get_page(links['next'])
+        items.extend(page_items)
+    return items
+
+
+def _upsert(conn, table: str, key: str, rows: List[dict],
+            insert_only: Tuple[str, ...] = ()):
+    """ update or insert rows on key; the tables of canvasrobot have no unique key
+    for ON CONFLICT, an update and an insert of the missing rows do the same.
+    The fields in insert_only are only set in new rows, an update keeps their value """
+    if not rows:
+        return
+    fields = [name for name in rows[0] if name != key]
+    updated = [name for name in fields if name not in insert_only]
+    conn.executemany(f"UPDATE {table} SET {', '.join(f'{name} = :{name}' for name in updated)} "
+                     f"WHERE {key} = :{key}", rows)
+    conn.executemany(f"INSERT INTO {table}({key}, {', '.join(fields)}) "
+                     f"SELECT :{key}, {', '.join(f':{name}' for name in fields)} "
+                     f"WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {key} = :{key})", rows)
+
+
+def _local_ids(conn, table: str, key: str, values) -> Dict[int, int]:
+    """ :return: dict of key value -> id (the primary key the reference fields use) """
+    ids = {}
+    values = list(values)
+    for start in range(0, len(values), 500):  # the maximum number of sql variables
+        chunk = values[start:start + 500]
+        ids.update(conn.execute(f"SELECT {key}, id FROM {table} "
+                                f"WHERE {key} IN ({', '.join('?' * len(chunk))})",
+                                chunk).fetchall())
+    return ids
+
+
+def save_courses(canvas_courses: List[dict]):
+    """ upsert the courses in one transaction, nr_students is the total_students of Canvas """
+    rows = [dict(course_id=course['id'],
+                 course_code=course.get('course_code'),
+                 sis_code=course.get('sis_course_id') or 'n.a.',
+                 name=course.get('name'),
+                 nr_students=course.get('total_students') or 0)
+            for course in canvas_courses]
+    with localdb.connect() as conn:
+        _upsert(conn, 'course', 'course_id', rows)
+    courses.invalidate()
+
+
+def save_enrollments(enrollments: Dict[int, List[dict]], canvas_courses: Dict[int, dict]):
+    """
+    Replace the students of the courses in course2user, in one transaction
+    and remember the state of the courses in course_sync
+    :param enrollments: course_id -> the StudentEnrollments of the course
+    :param canvas_courses: course_id -> course as Canvas returned it
+    """
+    users = {}
+    for course_enrollments in enrollments.values():
+        for enrollment in course_enrollments:
+            user = enrollment.get('user') or {}
+            last_name, _, first_name = (user.get('sortable_name') or '').partition(', ')
+            users[enrollment['user_id']] = dict(user_id=enrollment['user_id'],
+                                                username=user.get('login_id') or
+                                                user.get('sis_user_id'),
+                                                first_name=first_name,
+                                                last_name=last_name,
+                                                primary_role=STUDENT_ROLE)
+    now = time.time()
+    with localdb.connect(SCHEMA) as conn:
+        # a teacher enrolled as a student keeps the role canvasrobot gave
+        _upsert(conn, '"user"', 'user_id', list(users.values()), insert_only=('primary_role',))
+        user_ids = _local_ids(conn, '"user"', 'user_id', users)
+        course_ids = _local_ids(conn, 'course', 'course_id', enrollments)
+        conn.executemany("DELETE FROM course2user WHERE course = ? AND role = ?",
+                         [(course_ids[course_id], STUDENT_ROLE) for course_id in enrollments])
+        conn.executemany("INSERT INTO course2user(course, user, role) VALUES (?, ?, ?)",
+                         {(course_ids[course_id], user_ids[enrollment['user_id']], STUDENT_ROLE)
+                          for course_id, course_enrollments in enrollments.items()
+                          for enrollment in course_enrollments})
+        conn.executemany("INSERT OR REPLACE INTO course_sync"
+                         "(course_id, total_students, workflow_state, synced) "
+                         "VALUES (?, ?, ?, ?)",
+                         [(course_id, canvas_courses[course_id].get('total_students'),
+                           canvas_courses[course_id].get('workflow_state'), now)
+                          for course_id in enrollments])
+    courses.invalidate()
+
+
+def changed_courses(canvas_courses: List[dict],
+                    refresh_hours: Optional[float] = None) -> List[dict]:
+    """
+    :param canvas_courses: as Canvas returned them
+    :param refresh_hours: a course synced longer ago counts as changed, default
+    [sync] refresh_hours
+    :return: the courses that are new or changed since their enrollments were fetched
+    """
+    if refresh_hours is None:
+        refresh_hours = config.getfloat('sync', 'refresh_hours')
+    since = time.time() - refresh_hours * 3600
+    with localdb.connect(SCHEMA) as conn:
+        known = {course_id: (total_students, workflow_state)
+                 for course_id, total_students, workflow_state
+                 in conn.execute("SELECT course_id, total_students, workflow_state "
+                                 "FROM course_sync WHERE synced > ?", (since,))}
+    return [course for course in canvas_courses
+            if known.get(course['id']) != (course.get('total_students'),
+                                           course.get('workflow_state'))]
+
+
+def sync_courses(api: CanvasApi,
+                 account_id=None,
+                 max_workers: Optional[int] = None,
+                 courses_ready: Optional[Callable[[], None]] = None,
+                 refresh_hours: Optional[float] = None) -> SyncStats:
+    """
+    Sync the courses of Canvas into the local database
+    :param api: CanvasApi, e.g. CanvasApi.from_canvasrobot(canvasrobot)
+    :param account_id: the courses of this account, by default the courses of the api user
+    :param max_workers: number of simultaneous API calls
+    :param courses_ready: called when the courses are saved, before the enrollments are fetched
+    :param refresh_hours: see changed_courses
+    :return: SyncStats
+    """
+    start = time.perf_counter()
+    stats = SyncStats()
+    max_workers = max_workers or config.getint('sync', 'max_workers')
+    per_page = config.getint('sync', 'per_page')
+    path = f"accounts/{account_id}/courses" if account_id else "courses"
+    with timing.RunThreadPoolExecutor(max_workers=max_workers) as executor:
+        canvas_courses = get_all_pages(api, path,
+                                       {'per_page': per_page, 'include[]': ['total_students']},
+                                       executor)
+        stats.courses = len(canvas_courses)
+        save_courses(canvas_courses)
+        if courses_ready:
+            courses_ready()
+
+        changed = changed_courses(canvas_courses, refresh_hours)
+        stats.changed = len(changed)
+        futures = {executor.submit(get_all_pages, api, f"courses/{course['id']}/enrollments",
+                                   {'per_page': per_page, 'type[]': ['StudentEnrollment']}):
+                   course['id'] for course in changed}
+        enrollments = {}
+        for future in as_completed(futures):
+            course_id = futures[future]
+            try:
+                enrollments[course_id] = future.result()
+            except requests.RequestException as e:  # e.g. no rights, tried again next sync
+                stats.errors.append(f"enrollments of course {course_id}: {e!r}")
+    save_enrollments(enrollments, {course['id']: course for course in changed})
+    courses.refresh_student_counts()  # the enrolled students, instead of total_students
+    stats.enrollments = sum(len(course_enrollments) for course_enrollments in enrollments.values())
+    stats.seconds = time.perf_counter() - start
+    for error in stats.errors:
+        logging.error(error)
+    logging.info(f"course sync: {stats.courses} courses, {stats.changed} new or changed, "
+                 f"{stats.enrollments} enrollments in {stats.seconds:.1f}s")
+    return stats
+
+
+def sync_with_canvasrobot(canvasrobot, **kwargs) -> SyncStats:
+    """ sync_courses with the login and the admin account of canvasrobot """
+    account_id = config.get('sync', 'account_id') or getattr(canvasrobot, 'admin_id', None)
+    return sync_courses(CanvasApi.from_canvasrobot(canvasrobot), account_id=account_id, **kwargs)
@@ -0,0 +1,296 @@
+""" parsed Word documents: read a docx once, reuse it for preview and quiz data """
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+import docxstream
+from model import Answer, Question, Section, intern, to_tuples
+import normalize
+from quizformat import FORMAT_VERSION, FULL_SCORE, IncorrectNumberofQuestions, \
+    IncorrectAnswerMarking, IncorrectNumberofAnswers
+import quizcache
+import timing
+
+NOT_RECOGNIZED = 'Not recognized'
+MAX_DOCUMENTS = 8  # number of parsed documents kept in memory
+
+# a classified paragraph: (p_type, question_nr/answer_id, ans_weight, text, html)
+Paragraph = Tuple[str, object, int, str, str]
+Progress = Callable[[float], None]  # receives the fraction done
+
+
+class ParseCancelled(Exception):
+    """ parsing was stopped by the cancel event """
+    pass
+
+
+class ParsedDocument:
+    """ The paragraphs of a Word docx, read and classified only once.
+    Both the preview (Docx tab) and the quiz data (Quiz Data tab)
+    are derived from the same list of classified paragraphs """
+
+    def __init__(self, filename: str, normalize_fontsize: int = 0,
+                 paragraphs: Optional[List[Paragraph]] = None,
+                 not_recognized: Optional[List[str]] = None,
+                 progress: Optional[Progress] = None,
+                 cancel: Optional[threading.Event] = None,
+                 memo: Optional[docxstream.ParagraphMemo] = None):
+        """
+        :param filename: filename of the Word docx to parse
+        :param normalize_fontsize: if > 0 change fontsizes Q&A
+        :param paragraphs: already classified paragraphs (from the cache), skips reading the file
+        :param not_recognized: the not recognized paragraphs belonging to paragraphs
+        :param progress: called with the fraction done while reading
+        :param cancel: when set, reading stops with ParseCancelled
+        :param memo: the paragraphs of an earlier version, only the changed ones are parsed
+        """
+        self.filename = filename
+        self.normalize_fontsize = normalize_fontsize
+        self.paragraphs: List[Paragraph] = paragraphs or []
+        self.not_recognized: List[str] = not_recognized or []
+        self._quiz_data = None
+        if paragraphs is None:
+            self._read(progress, cancel, memo)
+
+    def _read(self, progress: Optional[Progress] = None, cancel: Optional[threading.Event] = None,
+              memo: Optional[docxstream.ParagraphMemo] = None):
+        def check_cancel():
+            if cancel is not None and cancel.is_set():
+                raise ParseCancelled(self.filename)
+
+        source, fontsize, normalized_fontsize = self.filename, self.normalize_fontsize, 0
+        made = []  # progress of making the normalized copy, the first half
+
+        def normalize_progress(fraction: float):
+            made.append(fraction)
+            progress(fraction / 2)
+
+        if fontsize:
+            normalized = normalize.normalized_docx(self.filename, fontsize,
+                                                   progress=progress and normalize_progress)
+            if normalized:  # its questions and answers have the fontsize
+                source, fontsize, normalized_fontsize = normalized, 0, fontsize
+            check_cancel()
+        read_progress = (progress and (lambda fraction: progress(0.5 + fraction / 2))
+                         if made else progress)
+
+        # paragraph by paragraph from the zip: the document is never in memory as a whole
+        with timing.span('read', file_bytes=os.path.getsize(self.filename)) as attrs:
+            pars = docxstream.iter_classified(source, fontsize, progress=read_progress, memo=memo,
+                                              normalized_fontsize=normalized_fontsize)
+            nr_par = 0
+            for nr_par, (p_type, nr, weight, text, par) in enumerate(pars, 1):
+                if nr_par % 50 == 0:
+                    check_cancel()
+                logging.debug(f"{par} = {p_type} {weight}")
+                if p_type == NOT_RECOGNIZED:
+                    self.not_recognized.append(par)
+                    continue
+                self.paragraphs.append((p_type, nr, weight, text, par))
+            attrs['paragraphs'] = nr_par
+            attrs['not_recognized'] = len(self.not_recognized)
+            if memo is not None:
+                attrs['reused'] = memo.reused
+
+    @classmethod
+    def from_cache_entry(cls, filename: str, normalize_fontsize: int, entry: dict):
+        """ :return: ParsedDocument restored from an entry of the quizcache,
+        the quiz data is made again from the paragraphs: it shares their strings """
+        return cls(filename, normalize_fontsize,
+                   paragraphs=[(intern(p_type), intern(nr), weight, text, par)
+                               for p_type, nr, weight, text, par in entry['paragraphs']],
+                   not_recognized=entry['not_recognized'])
+
+    def to_cache_entry(self) -> dict:
+        """ :return: json serializable entry for the quizcache """
+        return dict(paragraphs=self.paragraphs,
+                    not_recognized=self.not_recognized)
+
+    def preview(self):
+        """
+        same result as w2q.get_document_html, without reading the file again
+        :returns tuple of the paragraphs of the first question block as
+        (p_type, ans_weight, text, html), not recognized paragraphs
+        """
+        par_list = []
+        last_p_type = None
+        for p_type, _, weight, text, par in self.paragraphs:
+            if p_type == 'Quizname':
+                par_list.append((p_type, None, text, par))
+            if last_p_type == 'Answer' and p_type in ('Question', 'Quizname'):  # last answer
+                break
+            if p_type == 'Answer':
+                par_list.append((p_type, weight, text, par))
+            if p_type == 'Question':
+                par_list.append((p_type, None, text, par))
+            last_p_type = p_type
+
+        return par_list, self.not_recognized
+
+    def blocks(self):
+        """
+        yields the question blocks of the document: a question with its answers,
+        the quiz name before the first question of a quiz is part of its block
+        :return: generator of lists of (p_type, ans_weight, text, html)
+        """
+        block = []
+        for p_type, _, weight, text, par in self.paragraphs:
+            if p_type not in ('Quizname', 'Question', 'Answer'):
+                continue
+            if p_type != 'Answer' and block and block[-1][0] == 'Answer':
+                yield block
+                block = []
+            block.append((p_type, weight if p_type == 'Answer' else None, text, par))
+        if block:
+            yield block
+
+    def quiz_data(self, check_num_questions: int = 0):
+        """
+        same result as w2q.parse_document_d2p, without reading the file again
+        :param check_num_questions: number of questions (0 is no check)
+        :returns tuple of quiz_data (list of model.Section, they unpack as
+        (quiz_name, questions)), not recognized lines
+        :raises IncorrectAnswerMarking, IncorrectNumberofQuestions, IncorrectNumberofAnswers
+        """
+        if self._quiz_data is None:
+            self._quiz_data = self._build_quiz_data()
+        total_nr_questions = sum(len(questions) for _, questions in self._quiz_data)
+        if check_num_questions and total_nr_questions != check_num_questions:
+            raise IncorrectNumberofQuestions(f"The document has {total_nr_questions} "
+                                             f"questions this should be "
+                                             f"{check_num_questions} questions")
+
+        return self._quiz_data, self.not_recognized
+
+    def _build_quiz_data(self):
+        with timing.span('quiz_data') as attrs:
+            result = self._quiz_sections()
+            attrs['quizzes'] = len(result)
+            attrs['questions'] = sum(len(questions) for _, questions in result)
+        return result
+
+    def _quiz_sections(self):
+        section_nr = 0
+        last_p_type = None
+        quiz_name = last_quiz_name = None
+        question_text = None
+        question_list = []
+        answers = []
+        result = []
+
+        #  the Word text contains one or more sections
+        #  quiz_name (multiple)
+        #    questions (5) starting with number 1
+        #       answers (4)
+        # we save the question list into the result list when we detect new question 1
+        for p_type, nr, weight, text, _ in self.paragraphs:
+            if p_type == 'Quizname':
+                last_quiz_name = quiz_name  # we need it, when saving question_list
+                quiz_name = text
+            if last_p_type == 'Answer' and p_type in ('Question', 'Quizname'):  # last answer
+                question_list.append(Question(question_text, answers))
+                answers = []
+            if p_type == 'Answer':
+                answers.append(Answer(answer_html=text, answer_weight=weight))
+            if p_type == 'Question':
+                question_text = text
+                if nr == 1:
+                    logging.debug("New quiz is being parsed")
+                    if section_nr > 0:  # after first section add the quiz+questions
+                        result.append(Section(last_quiz_name, question_list))
+                    question_list = []
+                    section_nr += 1
+            last_p_type = p_type
+        # handle last question and last section
+        question_list.append(Question(question_text, answers))
+        result.append(Section(quiz_name, question_list))
+
+        for _, questions in result:
+            for question_text, answers in questions:
+                if len(answers) != 4:  # e.g. while the question is edited in Word
+                    raise IncorrectNumberofAnswers(f"Q '{question_text}' has {len(answers)} "
+                                                   f"of 4 answers")
+                if sum(ans.answer_weight for ans in answers) != FULL_SCORE:
+                    raise IncorrectAnswerMarking(f"Check right/wrong marking and weights in "
+                                                 f"Q '{question_text}'\n Ans {answers}")
+        return result
+
+
+_documents: "OrderedDict[tuple, ParsedDocument]" = OrderedDict()
+_documents_lock = threading.Lock()
+
+
+def get_parsed_document(filename: str, normalize_fontsize: int = 0,
+                        progress: Optional[Progress] = None,
+                        cancel: Optional[threading.Event] = None,
+                        memo: Optional[docxstream.ParagraphMemo] = None) -> ParsedDocument:
+    """
+    Return the parsed document for filename. The file is only read when it is
+    not parsed before: in memory (same modification time and normalize setting)
+    or in the quizcache (same content and normalize setting)
+    :param filename: filename of the Word docx
+    :param normalize_fontsize: if > 0 change fontsizes Q&A
+    :param progress: called with the fraction done while reading
+    :param cancel: when set, reading stops with ParseCancelled
+    :param memo: of the earlier reads of filename (watch mode), read with it when not cached
+    :return: ParsedDocument
+    """
+    path = os.path.abspath(filename)
+    key = (path, os.stat(path).st_mtime_ns, normalize_fontsize)
+    with timing.span('document', file=os.path.basename(path), source='memory') as attrs:
+        with _documents_lock:
+            document: Optional[ParsedDocument] = _documents.get(key)
+            if document is not None:
+                _documents.move_to_end(key)
+                return document
+
+        content_hash = quizcache.file_hash(path)
+        cache_key = quizcache.cache_key(content_hash,
+                                        normalize_fontsize=normalize_fontsize,
+                                        quiz_format=FORMAT_VERSION)
+        entry = quizcache.get(cache_key)
+        if entry is not None:
+            attrs['source'] = 'cache'
+            document = ParsedDocument.from_cache_entry(path, normalize_fontsize, entry)
+        else:
+            attrs['source'] = 'file'
+            document = ParsedDocument(path, normalize_fontsize, progress=progress, cancel=cancel,
+                                      memo=memo)
+            # saved while it was read: the parse can be of neither version, it isn't kept
+            if (os.stat(path).st_mtime_ns != key[1]
+                    or quizcache.file_hash(path) != content_hash):
+                logging.info(f"{path} changed while it was read, not cached")
+                attrs['source'] = 'changed'
+                return document
+            quizcache.put(cache_key, document.to_cache_entry())
+
+        with _documents_lock:
+            _documents[key] = document
+            while len(_documents) > MAX_DOCUMENTS:
+                _documents.popitem(last=False)
+        return document
+
+
+def word2quiz(filename: str,
+              uploader,
+              course_id,
+              check_num_questions: int,
+              normalize_fontsize: int = 0,
+              testrun: bool = False):
+    """
+    same as w2q.word2quiz but unchanged files are not parsed again
+    :param uploader: creates the quizzes: a CanvasRobot or upload.QuizUploader
+    :param course_id: the course, a list of courses for a fanout.FanoutUploader
+    :return tuple stats, quiz_data or None, not_recognized
+    """
+    document = get_parsed_document(filename, normalize_fontsize=normalize_fontsize)
+    quiz_data, lines_not_recognized = document.quiz_data(check_num_questions=check_num_questions)
+    if testrun or lines_not_recognized:
+        return None, quiz_data, lines_not_recognized
+
+    stats = uploader.create_quizzes_from_data(course_id=course_id,
+                                              data=to_tuples(quiz_data),  # also for a CanvasRobot
+                                              question_format="Question {}.")
+    return stats, None, None
@@ -0,0 +1,584 @@
+""" streaming docx reader: the paragraphs of word/document.xml as html, read straight from
+the zip with incremental xml parsing. Every paragraph is cleared after it is yielded,
+so memory stays flat whatever the size of the document
+
+The html is the same as docx2python.docx2python(filename, html=True) gives for the body:
+runs with b, i, u, s, sub/sup and a span for size, color, caps etc., runs with the same
+formatting merged, numbering as '1)\t' or 'a)\t' counted per numId, tabs, line breaks,
+links and ----media/image1.png---- for images. Not supported: copying merged table cells
+
+A ParagraphMemo keeps the paragraphs of a read, a next read of the (edited) document
+only parses and classifies the paragraphs that changed, see iter_classified
+"""
+import posixpath
+import re
+import time
+import zipfile
+from html import unescape
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+import timing
+from model import intern
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+V_NS = 'urn:schemas-microsoft-com:vml'
+WP_NS = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
+M_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/math'
+REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+
+def w(name: str) -> str:
+    return f'{{{W_NS}}}{name}'
+
+
+BODY, P, R, T, TAB, BR, SYM = w('body'), w('p'), w('r'), w('t'), w('tab'), w('br'), w('sym')
+PPR, RPR = w('pPr'), w('rPr')
+HYPERLINK = w('hyperlink')
+FOOTNOTE_REFERENCE, ENDNOTE_REFERENCE = w('footnoteReference'), w('endnoteReference')
+COMMENT_RANGE_START, COMMENT_RANGE_END = w('commentRangeStart'), w('commentRangeEnd')
+BLIP, IMAGEDATA, DOCPR = f'{{{A_NS}}}blip', f'{{{V_NS}}}imagedata', f'{{{WP_NS}}}docPr'
+MATH, MATH_TEXT = f'{{{M_NS}}}oMath', f'{{{M_NS}}}t'
+VAL = w('val')
+
+# elements that hold text, other elements (spelling, revision marks) are skipped
+CONTENT_TAGS = {BODY, BR, COMMENT_RANGE_END, COMMENT_RANGE_START, w('document'),
+                w('endnote'), ENDNOTE_REFERENCE, w('footnote'), FOOTNOTE_REFERENCE,
+                w('checkBox'), w('ddList'), HYPERLINK, BLIP, IMAGEDATA, DOCPR, MATH, P, R,
+                w('sdt'), SYM, TAB, w('tbl'), w('tc'), w('tr'), T, MATH_TEXT}
+MERGEABLE_TAGS = {R, HYPERLINK, T, MATH_TEXT}
+
+# run properties -> html: in a span style or a tag of its own
+SPAN_STYLES = {'smallCaps': lambda val: 'font-variant:small-caps',
+               'caps': lambda val: 'text-transform:uppercase',
+               'highlight': lambda val: f'background-color:{val}',
+               'sz': lambda val: f'font-size:{val}pt',
+               'color': lambda val: f'color:{val}'}
+TAGS = {'b': lambda val: 'b',
+        'i': lambda val: 'i',
+        'u': lambda val: 'u',
+        'strike': lambda val: 's',
+        'vertAlign': lambda val: val[:3]}
+HEADINGS = {f'Heading{level}': f'h{level}' for level in range(1, 7)}
+
+Progress = Callable[[float], None]  # receives the fraction done
+
+
+def _roman(n: int) -> str:
+    result = ''
+    for value, numeral in ((1000, 'm'), (900, 'cm'), (500, 'd'), (400, 'cd'), (100, 'c'),
+                           (90, 'xc'), (50, 'l'), (40, 'xl'), (10, 'x'), (9, 'ix'),
+                           (5, 'v'), (4, 'iv'), (1, 'i')):
+        count, n = divmod(n, value)
+        result += numeral * count
+    return result
+
+
+def _letter(n: int) -> str:
+    result = ''
+    while n:
+        n, remainder = divmod(n - 1, 26)
+        result = chr(ord('a') + remainder) + result
+    return result
+
+
+NUMBER_FORMATS = {'decimal': str,
+                  'lowerLetter': _letter,
+                  'upperLetter': lambda n: _letter(n).upper(),
+                  'lowerRoman': _roman,
+                  'upperRoman': lambda n: _roman(n).upper()}
+BULLET = '--'
+
+
+def _escape(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _properties(elem, name: str) -> Dict[str, Optional[str]]:
+    """ :return: the child elements of the first pPr/rPr of elem: local name -> w:val """
+    props = elem.find(name)
+    if props is None:
+        return {}
+    return {child.tag.rpartition('}')[2]: child.get(VAL) or None for child in props}
+
+
+def run_style(run) -> List[str]:
+    """ :return: the html tags (without < >) of the formatting of the run, the span first """
+    styles, tags = [], []
+    for name, val in _properties(run, RPR).items():
+        if name in SPAN_STYLES:
+            styles.append(SPAN_STYLES[name](val or ''))
+        elif name in TAGS:
+            tags.append(TAGS[name](val or ''))
+    return ([f'span style="{";".join(sorted(styles))}"'] if styles else []) + sorted(tags)
+
+
+def _html(style: List[str], text: str) -> str:
+    return (''.join(f'<{tag}>' for tag in style) + text +
+            ''.join(f'</{tag.split()[0]}>' for tag in reversed(style)))
+
+
+def _has_content(elem) -> bool:
+    return elem.tag in CONTENT_TAGS or any(_has_content(child) for child in elem)
+
+
+def merge_runs(elem, rels: Dict[str, str]):
+    """ join consecutive runs (links, texts) with the same formatting, like docx2python
+    does, Word splits text in many runs for spelling and revision marks """
+    def key(child):
+        if child.tag not in MERGEABLE_TAGS:
+            return child.tag, '', []
+        rel_id = child.get(f'{{{R_NS}}}id')
+        if rel_id:
+            return child.tag, rels.get(rel_id, ''), []
+        return child.tag, '', run_style(child) if child.tag == R else []
+
+    group, group_key = [], None
+    for child in [child for child in elem if _has_content(child)] + [None]:
+        child_key = key(child) if child is not None else None
+        if child_key != group_key:
+            if len(group) > 1 and group[0].tag in MERGEABLE_TAGS:
+                if group[0].tag in (T, MATH_TEXT):
+                    group[0].text = ''.join(part.text or '' for part in group)
+                for part in group[1:]:
+                    group[0].extend(list(part))
+                    elem.remove(part)
+            group, group_key = [], child_key
+        group.append(child)
+    for child in elem:
+        merge_runs(child, rels)
+
+
+class Numbering:
+    """ the numbers of numbered paragraphs, counted per numId and level like docx2python """
+
+    def __init__(self, numbering_xml: Optional[bytes] = None):
+        self.formats: Dict[str, List[Tuple[Optional[str], int]]] = {}  # numId -> per level
+        self.counters: Dict[str, Dict[str, int]] = {}
+        if not numbering_xml:
+            return
+        root = ElementTree.fromstring(numbering_xml)
+        abstract = {}
+        for abstract_num in root.iter(w('abstractNum')):
+            levels = []
+            for lvl in abstract_num.iter(w('lvl')):
+                num_fmt, start = lvl.find(w('numFmt')), lvl.find(w('start'))
+                levels.append((num_fmt.get(VAL) if num_fmt is not None else None,
+                               int(start.get(VAL)) if start is not None else 1))
+            abstract[abstract_num.get(w('abstractNumId'))] = levels
+        for num in root.iter(w('num')):
+            abstract_id = num.find(w('abstractNumId'))
+            if abstract_id is not None:
+                self.formats[num.get(w('numId'))] = abstract.get(abstract_id.get(VAL), [])
+
+    def bullet(self, paragraph) -> str:
+        """ :return: e.g. '1)\t', '\ta)\t' for the second level, '' if not numbered """
+        num_pr = paragraph.find(f'{PPR}/{w("numPr")}')
+        if num_pr is None:
+            return ''
+        num_id, ilvl = num_pr.find(w('numId')), num_pr.find(w('ilvl'))
+        if num_id is None or ilvl is None or num_id.get(VAL) is None or ilvl.get(VAL) is None:
+            return ''
+        return self.number(num_id.get(VAL), ilvl.get(VAL))
+
+    def number(self, num_id: str, ilvl: str, count: bool = True) -> str:
+        """ :return: the bullet of the next paragraph of list num_id at level ilvl,
+        with count False the paragraph is not counted """
+        counter = dict(self.counters.get(num_id, {}))
+        counter[ilvl] = counter.get(ilvl, 0) + 1
+        for level in [level for level in counter if level > ilvl]:  # restart the sub lists
+            del counter[level]
+        if count:
+            self.counters[num_id] = counter
+        try:
+            num_fmt, start = self.formats[num_id][int(ilvl)]
+        except (KeyError, IndexError, ValueError):
+            num_fmt, start = None, 1
+        number_format = NUMBER_FORMATS.get(num_fmt)
+        bullet = number_format(counter[ilvl] + start - 1) + ')' if number_format else BULLET
+        return '\t' * int(ilvl) + bullet + '\t'
+
+
+class ParagraphWriter:
+    """ html of paragraph elements, the runs are kept as [style, text] """
+
+    def __init__(self, rels: Dict[str, str], numbering: Numbering):
+        self.rels = rels
+        self.numbering = numbering
+        self.paragraphs: List[str] = []  # done, nested paragraphs (text boxes) come first
+        self._open: List[Tuple[List[str], list]] = []  # (style, runs) of the open paragraphs
+
+    def _runs(self) -> list:
+        if not self._open:  # text outside a paragraph, e.g. in a link
+            self._open.append(([], []))
+        return self._open[-1][1]
+
+    def _run(self) -> list:
+        runs = self._runs()
+        if not runs:
+            runs.append([[], ''])
+        return runs[-1]
+
+    def _insert(self, text: str):
+        """ text as a run of its own, the formatting goes on after it """
+        style = self._run()[0]
+        self._runs().extend(([[], text], [style, '']))
+
+    def close(self):
+        while self._open:
+            self._close_paragraph()
+
+    def _close_paragraph(self):
+        style, runs = self._open.pop()
+        html = ''.join(_html(run_style_, text) for run_style_, text in runs if text)
+        self.paragraphs.append(_html(style, html) if style and html else html)
+
+    def _text_below(self, elem) -> str:
+        paragraphs = []
+        for child in elem:
+            writer = ParagraphWriter(self.rels, self.numbering)
+            writer.write(child)
+            writer.close()
+            paragraphs.extend(writer.paragraphs)
+        return '\n\n'.join(paragraphs)
+
+    def write(self, elem):
+        tag = elem.tag
+        if tag == P:
+            heading = HEADINGS.get(_properties(elem, PPR).get('pStyle') or '')
+            self._open.append(([heading] if heading else [], []))
+            self._insert(self.numbering.bullet(elem))
+        elif tag == R:
+            self._runs().append([run_style(elem), ''])
+        elif tag in (T, MATH_TEXT):
+            self._run()[1] += _escape(elem.text or '')
+        elif tag == BR:
+            self._run()[1] += '\n'
+        elif tag == TAB:
+            self._insert('\t')
+        elif tag == SYM:
+            char = elem.get(w('char')) or ''
+            self._run()[1] += f"<span style=font-family:{elem.get(w('font'))}>&#x0{char[1:]};</span>"
+        elif tag == HYPERLINK:
+            text = self._text_below(elem)
+            link = self.rels.get(elem.get(f'{{{R_NS}}}id'))
+            if link:
+                anchor = elem.get(w('anchor'))
+                link = f'{link}#{anchor}' if anchor else link
+            self._insert(f'<a href="{link}">{text}</a>' if link else text)
+            return
+        elif tag == MATH:
+            self._insert(f"<latex>{''.join(elem.itertext())}</latex>")
+            return
+        elif tag in (COMMENT_RANGE_START, COMMENT_RANGE_END):
+            return
+        elif tag in (BLIP, IMAGEDATA):
+            image = self.rels.get(elem.get(f'{{{R_NS}}}embed' if tag == BLIP else f'{{{R_NS}}}id'))
+            if image:
+                self._insert(f'----{image}----')
+        elif tag == DOCPR:
+            if elem.get('descr') is not None:
+                self._insert(f"----Image alt text---->{elem.get('descr')}<")
+        elif tag in (FOOTNOTE_REFERENCE, ENDNOTE_REFERENCE):
+            kind = 'footnote' if tag == FOOTNOTE_REFERENCE else 'endnote'
+            self._insert(f'----{kind}{elem.get(w("id"))}----')
+
+        for child in elem:
+            self.write(child)
+
+        if tag == P:
+            self._close_paragraph()
+        elif tag == R:
+            self._runs().append([[], ''])
+
+
+def _relationships(docx: zipfile.ZipFile, part: str) -> List[Tuple[str, str, str]]:
+    """ :return: the relationships of part as (id, type, target) """
+    folder, name = posixpath.split(part)
+    try:
+        root = ElementTree.fromstring(docx.read(posixpath.join(folder, '_rels', f'{name}.rels')))
+    except KeyError:
+        return []
+    return [(rel.get('Id'), rel.get('Type', '').rpartition('/')[2], rel.get('Target'))
+            for rel in root.iter(f'{{{REL_NS}}}Relationship')]
+
+
+def _part(folder: str, target: str) -> str:
+    """ :return: name in the zip of a relationship target """
+    return target.lstrip('/') if target.startswith('/') else posixpath.join(folder, target)
+
+
+class _ProgressReader:
+    """ file-like, reports the fraction of the (uncompressed) part read """
+
+    def __init__(self, stream, size: int, progress: Progress):
+        self.stream = stream
+        self.size = max(size, 1)
+        self.done = 0
+        self.progress = progress
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.done += len(data)
+        self.progress(min(1.0, self.done / self.size))
+        return data
+
+
+def _document(docx: zipfile.ZipFile) -> Tuple[str, Dict[str, str], Numbering]:
+    """ :return: the main document part, its relationships (id -> target) and numbering """
+    document_part = next((_part('', target) for _, rel_type, target
+                          in _relationships(docx, '')
+                          if rel_type == 'officeDocument'), 'word/document.xml')
+    relationships = _relationships(docx, document_part)
+    rels = {rel_id: target for rel_id, _, target in relationships}
+    folder = posixpath.dirname(document_part)
+    numbering_part = next((_part(folder, target) for _, rel_type, target in relationships
+                           if rel_type == 'numbering'), None)
+    return document_part, rels, Numbering(docx.read(numbering_part) if numbering_part else None)
+
+
+def iter_paragraphs(filename: str, progress: Optional[Progress] = None) -> Iterator[str]:
+    """
+    :param filename: the Word docx
+    :param progress: called with the fraction of the document read
+    :return: generator of the html of the paragraphs of the body, in order
+    """
+    with zipfile.ZipFile(filename) as docx:
+        document_part, rels, numbering = _document(docx)
+        writer = ParagraphWriter(rels, numbering)
+        with docx.open(document_part) as stream:
+            if progress:
+                stream = _ProgressReader(stream, docx.getinfo(document_part).file_size, progress)
+            parents = []  # the open elements
+            paragraph_depth = 0  # > 1 in a text box in a paragraph
+            for event, elem in ElementTree.iterparse(stream, events=('start', 'end')):
+                if event == 'start':
+                    parents.append(elem)
+                    paragraph_depth += elem.tag == P
+                    continue
+                parents.pop()
+                if elem.tag == P:
+                    paragraph_depth -= 1
+                    if paragraph_depth == 0:
+                        merge_runs(elem, rels)
+                        writer.write(elem)
+                        yield from writer.paragraphs
+                        writer.paragraphs = []
+                        elem.clear()
+                if parents and parents[-1].tag == BODY:  # done with it, keep memory flat
+                    parents[-1].remove(elem)
+
+
+def _root_tags(data: bytes) -> Tuple[bytes, bytes]:
+    """ :return: start and end tag of the root element of the xml """
+    start = re.search(rb'<(?![?!])([^\s>/]+)[^>]*>', data)
+    if start is None:
+        raise ElementTree.ParseError("no root element")
+    return start.group(0), b'</' + start.group(1) + b'>'
+
+
+def _paragraph_chunks(data: bytes, prefix: bytes) -> List[bytes]:
+    """ :return: the xml of the outermost w:p elements of the document, in order """
+    chunks = []
+    depth = start = 0
+    for match in re.finditer(rb'<(/?)' + re.escape(prefix) + rb':p(?=[\s>/])', data):
+        tag_end = data.index(b'>', match.end()) + 1
+        if match.group(1):
+            depth -= 1
+            if depth == 0:
+                chunks.append(data[start:tag_end])
+        elif data[tag_end - 2:tag_end - 1] == b'/':  # <w:p/>
+            if depth == 0:
+                chunks.append(data[match.start():tag_end])
+        else:
+            if depth == 0:
+                start = match.start()
+            depth += 1
+    return chunks
+
+
+def _numbering_ids(chunk: bytes, prefix: bytes) -> Optional[Tuple[str, str]]:
+    """ :return: (numId, ilvl) of the numbering of the w:p xml or None, like Numbering.bullet
+    :raises ValueError: when the numbering can't be found without parsing """
+    if b':numPr' not in chunk:
+        return None
+    ns = re.escape(prefix)
+    properties = re.match(rb'<' + ns + rb':p\b[^>]*>\s*<' + ns + rb':pPr\b.*?</' + ns + rb':pPr>',
+                          chunk, re.S)
+    if (properties is None or chunk.count(b'<' + prefix + b':numPr') > 1 or
+            b':pPrChange' in chunk or b':numPr' not in properties.group(0)):
+        raise ValueError('numbering not in the properties of the paragraph')
+    num_id = re.search(rb'<' + ns + rb':numId\s+' + ns + rb':val="([^"]*)"', properties.group(0))
+    ilvl = re.search(rb'<' + ns + rb':ilvl\s+' + ns + rb':val="([^"]*)"', properties.group(0))
+    if num_id is None or ilvl is None:
+        return None
+    return num_id.group(1).decode(), ilvl.group(1).decode()
+
+
+def _text_tokens(prefix: bytes) -> re.Pattern:
+    """ :return: expression of the xml that makes the plain text of paragraphs: w:p start
+    and end tags, w:pPr (the numbering and tab stops), w:t, w:tab and w:br """
+    ns = re.escape(prefix)
+    return re.compile(rb'<' + ns + rb':p(?=[\s>/])[^>]*?(?P<empty>/)?>|(?P<close></' + ns +
+                      rb':p>)|<' + ns + rb':pPr\b[^>]*>(?P<properties>.*?)</' + ns + rb':pPr>|<' +
+                      ns + rb':t(?:\s[^>]*)?>(?P<text>[^<]*)</' + ns + rb':t>|(?P<tab><' + ns +
+                      rb':tab\s*/>)|(?P<br><' + ns + rb':br\b[^>]*/>)', re.S)
+
+
+def iter_texts(filename: str) -> Iterator[str]:
+    """
+    The plain text of the paragraphs: the text of iter_paragraphs without its html,
+    found with regular expressions instead of parsing the xml. Much faster, for checks
+    that don't need the formatting (see validate.py)
+    :param filename: the Word docx
+    :return: generator of the text of the paragraphs of the body with their numbering,
+    e.g. '1)\tWhat is a sacrament?', in the order of iter_paragraphs
+    """
+    with zipfile.ZipFile(filename) as docx:
+        document_part, _, numbering = _document(docx)
+        data = docx.read(document_part)
+    root_start, _ = _root_tags(data)
+    prefix = re.search(rb'xmlns:([^\s=]+)\s*=\s*["\']' + re.escape(W_NS.encode()) + rb'["\']',
+                       root_start)
+    ns = prefix.group(1) if prefix else b'w'
+    num_id = re.compile(rb'<' + re.escape(ns) + rb':numId\s+' + re.escape(ns) + rb':val="([^"]*)"')
+    ilvl = re.compile(rb'<' + re.escape(ns) + rb':ilvl\s+' + re.escape(ns) + rb':val="([^"]*)"')
+    change, tab_stop = b'<' + ns + b':pPrChange', b'<' + ns + b':tab '
+    parts: List[List[str]] = []  # of the open paragraphs, a text box paragraph is nested
+    for match in _text_tokens(ns).finditer(data):
+        text, properties = match.group('text'), match.group('properties')
+        if text is not None:
+            if parts:
+                parts[-1].append(unescape(text.decode('utf-8')))
+        elif properties is not None and parts and not parts[-1]:
+            current = properties.split(change)[0]  # not the numbering before a revision
+            num, level = num_id.search(current), ilvl.search(current)
+            if num and level:
+                parts[-1].append(numbering.number(num.group(1).decode(), level.group(1).decode()))
+            parts[-1].append('\t' * properties.count(tab_stop))  # a tab each, like docx2python
+        elif match.group('tab') or match.group('br'):
+            if parts:
+                parts[-1].append('\t' if match.group('tab') else '\n')
+        elif match.group('close'):
+            if parts:
+                yield ''.join(parts.pop())
+        elif match.group('empty'):
+            yield ''
+        else:
+            parts.append([])
+
+
+class ParagraphMemo:
+    """ The classified paragraphs of the last read of a document by the xml of their w:p
+    element and their number (if numbered). A next read with the memo only parses and
+    classifies the paragraphs that changed or got another number.
+    Unlike iter_paragraphs it reads word/document.xml as a whole """
+
+    def __init__(self):
+        self.classified: Dict[Tuple[bytes, str], List[tuple]] = {}
+        self.rels: Optional[Dict[str, str]] = None  # an image or link changed: all again
+        self.reused = 0  # paragraphs of the last read that were not parsed again
+        self.parsed = 0
+
+    def iter_classified(self, filename: str, classify: Callable[[str], Optional[tuple]],
+                        progress: Optional[Progress] = None) -> Iterator[tuple]:
+        """ :return: generator of classify(html) of the paragraphs that are not None """
+        with zipfile.ZipFile(filename) as docx:
+            document_part, rels, numbering = _document(docx)
+            data = docx.read(document_part)
+        root_start, root_end = _root_tags(data)
+        prefix = re.search(rb'xmlns:([^\s=]+)\s*=\s*["\']' + re.escape(W_NS.encode()) + rb'["\']',
+                           root_start)
+        if prefix is None:  # not the usual w: prefix, no memo
+            self.classified, self.rels = {}, None
+            for par in iter_paragraphs(filename, progress):
+                classified = classify(par)
+                if classified:
+                    yield classified
+            return
+        if rels != self.rels:
+            self.classified, self.rels = {}, rels
+        chunks = _paragraph_chunks(data, prefix.group(1))
+        writer = ParagraphWriter(rels, numbering)
+        known, self.classified = self.classified, {}
+        self.reused = self.parsed = 0
+        for index, chunk in enumerate(chunks):
+            if progress and index % 100 == 0:
+                progress(index / len(chunks))
+            try:
+                ids = _numbering_ids(chunk, prefix.group(1))
+            except ValueError:  # e.g. numbered paragraphs in a text box, parse it every time
+                key = None
+            else:
+                key = (chunk, numbering.number(*ids, count=False) if ids else '')
+            pars = known.get(key) if key else None
+            if pars is None:
+                elem = ElementTree.fromstring(root_start + chunk + root_end)[0]
+                merge_runs(elem, rels)
+                writer.write(elem)  # counts the number
+                pars = [classified for classified in map(classify, writer.paragraphs)
+                        if classified]
+                writer.paragraphs = []
+                self.parsed += 1
+            else:
+                if ids:
+                    numbering.number(*ids)
+                self.reused += 1
+            if key:
+                self.classified[key] = pars
+            yield from pars
+        if progress:
+            progress(1.0)
+
+
+def iter_classified(filename: str,
+                    normalize_fontsize: int = 0,
+                    progress: Optional[Progress] = None,
+                    memo: Optional[ParagraphMemo] = None,
+                    normalized_fontsize: int = 0) -> Iterator[tuple]:
+    """
+    :param filename: the Word docx
+    :param normalize_fontsize: if > 0 change fontsizes Q&A
+    :param progress: called with the fraction of the document read
+    :param memo: the paragraphs of the previous read of the document with the same
+    normalize_fontsize, only the changed paragraphs are parsed. It is updated
+    :param normalized_fontsize: the fontsize of filename when it is a normalized copy
+    (normalize.py): its questions and answers have it in half points, shown as this fontsize
+    :return: generator of (p_type, question_nr/answer_id, ans_weight, text, html) of the
+    paragraphs that are not empty, p_type is 'Not recognized' for lines not in the quiz format
+    """
+    from classifier import get_classifier
+    from quizformat import normalize_size
+
+    parse = get_classifier().classify  # same result as w2q.parse, one match per paragraph
+    normalize_seconds = 0.0
+    half_points = f'font-size:{2 * normalized_fontsize}pt'
+
+    def classify(par: str) -> Optional[tuple]:
+        nonlocal normalize_seconds
+        par = par.strip()
+        if not par:
+            return None
+        nr, weight, text, p_type = parse(par)
+        if normalize_fontsize and p_type in ('Question', 'Answer'):
+            # like w2q.parse(par, normalize_fontsize) does, timed apart
+            start = time.perf_counter()
+            text = normalize_size(text, normalize_fontsize)
+            normalize_seconds += time.perf_counter() - start
+        elif normalized_fontsize and p_type in ('Question', 'Answer'):
+            # like the html normalization, w:sz shows as pt
+            size = f'font-size:{normalized_fontsize}pt'
+            par, text = par.replace(half_points, size), text.replace(half_points, size)
+        return intern(p_type), intern(nr), weight, text, par
+
+    if memo is not None:
+        yield from memo.iter_classified(filename, classify, progress)
+    else:
+        for par in iter_paragraphs(filename, progress):
+            classified = classify(par)
+            if classified:
+                yield classified
+    if normalize_fontsize:
+        timing.record('normalize', normalize_seconds, fontsize=normalize_fontsize)
@@ -0,0 +1,125 @@
+""" upload one parsed document to several courses (e.g. parallel sections of a course)
+in one run: the payloads are built once and the courses are uploaded at the same time,
+sharing one RateLimiter, so together they make at most [upload] fanout_workers API calls
+
+    uploader = FanoutUploader(api, lambda api: ChangesUploader(api, source='exam.docx'))
+    stats = uploader.create_quizzes_from_data([101, 102, 103], data)
+    uploader.course_stats[102].errors
+"""
+import logging
+import time
+from concurrent.futures import as_completed
+from typing import Callable, Dict, List, Optional
+
+import timing
+from settings import config
+from upload import CanvasApi, PreparedUpload, RateLimiter, UploadStats
+
+DONE_EVENT = '<<CreateQuizzes:Done>>'
+
+
+class CourseProgress:
+    """ gui_root and gui_queue for the uploader of one course: keeps the fraction done
+    of the course and passes its increments, scaled to the number of courses, to the
+    progressbar. The Done event of the course is not passed, the fan-out sends one """
+
+    def __init__(self, gui_root, gui_queue, nr_courses: int):
+        self.gui_root = gui_root
+        self.gui_queue = gui_queue
+        self.nr_courses = nr_courses
+        self.done = 0.0  # fraction
+
+    def put(self, value: float):
+        self.done = min(1.0, self.done + value)
+        if self.gui_queue is not None:
+            self.gui_queue.put(value / self.nr_courses)
+
+    def event_generate(self, sequence: str):
+        if self.gui_root and sequence != DONE_EVENT:
+            self.gui_root.event_generate(sequence)
+
+
+class FanoutUploader:
+    """ Creates the quizzes of parsed quiz data in several courses at the same time,
+    with an uploader per course """
+
+    def __init__(self, api: CanvasApi, make_uploader: Callable[[CanvasApi], object],
+                 max_workers: Optional[int] = None, docx: Optional[str] = None):
+        """
+        :param api: CanvasApi, the courses use its session with a shared RateLimiter
+        :param make_uploader: returns the uploader of a course, e.g. a ChangesUploader
+        :param max_workers: number of simultaneous API calls of all courses together
+        :param docx: the document of the quiz data, its images are hashed once for all courses
+        """
+        self.max_workers = max_workers or config.getint('upload', 'fanout_workers')
+        self.api = api.with_rate_limiter(RateLimiter(max_concurrent=self.max_workers))
+        self.make_uploader = make_uploader
+        self.docx = docx
+        self.course_progress: Dict[object, CourseProgress] = {}
+        self.course_stats: Dict[object, UploadStats] = {}
+        self.stats: Optional[UploadStats] = None  # of the last upload, set before the Done event
+
+    def create_quizzes_from_data(self,
+                                 course_id,
+                                 data,
+                                 question_format: str = "Question {}.",
+                                 gui_root=None,
+                                 gui_queue=None) -> UploadStats:
+        """
+        Same parameters as upload.QuizUploader.create_quizzes_from_data, but
+        :param course_id: list of the course ids, the quizzes are added to each
+        :return: UploadStats of all courses, an error starts with its course
+        """
+        course_ids = list(course_id)
+        start = time.perf_counter()
+        prepared = PreparedUpload(data, question_format, docx=self.docx)
+        self.course_progress = {course: CourseProgress(gui_root, gui_queue, len(course_ids))
+                                for course in course_ids}
+        self.course_stats = {}
+
+        def upload(course):
+            uploader = self.make_uploader(self.api)
+            progress = self.course_progress[course]
+            return uploader.create_quizzes_from_data(course_id=course, data=data,
+                                                     question_format=question_format,
+                                                     gui_root=progress, gui_queue=progress,
+                                                     prepared=prepared)
+
+        with timing.RunThreadPoolExecutor(max_workers=len(course_ids) or 1) as executor:
+            futures = {executor.submit(upload, course): course for course in course_ids}
+            for future in as_completed(futures):
+                course = futures[future]
+                self.course_progress[course].done = 1.0  # also when nothing changed
+                try:
+                    self.course_stats[course] = future.result()
+                except Exception as e:  # of one course, the other courses go on
+                    logging.exception(f"upload to course {course} failed")
+                    self.course_stats[course] = UploadStats(errors=[f"{type(e).__name__}: {e}"])
+
+        stats = UploadStats()
+        for course in course_ids:
+            course_stats = self.course_stats[course]
+            stats.quiz_ids.extend(course_stats.quiz_ids)
+            stats.question_ids.extend(course_stats.question_ids)
+            stats.errors.extend(f"course {course}: {error}" for error in course_stats.errors)
+            stats.skipped += course_stats.skipped
+        for line in self.report():
+            logging.info(line)
+        timing.record('fanout', time.perf_counter() - start, courses=len(course_ids),
+                      quizzes=len(stats.quiz_ids), questions=len(stats.question_ids),
+                      errors=len(stats.errors))
+        self.stats = stats
+        if gui_root:
+            gui_root.event_generate(DONE_EVENT)
+        return stats
+
+    def report(self) -> List[str]:
+        """ :return: a line per course of the last upload """
+        lines = []
+        for course in self.course_progress:  # in the order of the upload
+            stats = self.course_stats.get(course)
+            if stats:
+                lines.append(f"course {course}: {len(stats.quiz_ids)} quizzes, "
+                             f"{len(stats.question_ids)} questions, {stats.skipped} unchanged, "
+                             f"{len(stats.errors)} errors")
+        return lines
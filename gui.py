@@ -0,0 +1,799 @@
+""" GUI version of word2quiz app, main.py --cmd and --batch don't import it (nor Tk)
+the modules to parse documents and to talk to Canvas are imported when first used """
+import os
+import sys
+import logging
+import threading
+import time
+from functools import partial
+from queue import Queue, Empty
+from typing import Union, Callable
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from tkinter.filedialog import askopenfilename
+
+import customtkinter as ctk
+
+import timing
+from courses import find_courses, find_course
+from quizview import QuizDataTree
+from robot import get_canvasrobot
+from settings import config
+from translation import get_translator
+
+root = None
+if sys.platform == 'darwin':
+    from macos_messagebox import root, macos_messagebox as messagebox
+
+
+class Word2QuizApp(ctk.CTkFrame):
+    gettext: Union[Callable[[str], str], Callable[[str], str]] = get_translator()
+
+    def __init__(self):
+        super().__init__()
+
+        self.notebook = None
+        self.file_frame = None
+        self.entry_num_questions = None
+        self.tkvar_font_normalize = None
+        self.cb_font_normalize = None
+        self.html_lbl_docsample = None
+        self.btn_convert2data = None
+        self.data_dict = None
+        self.tree_quiz_data = None
+        self.tkvar_course_id = None
+        self.om_course = None
+        self.lb_courses = None
+        self.upload_courses = []  # (course_id, label) of the next upload, see add_course
+        self.after_update_courses = None
+        self.thread_sync_courses = None
+        self.tree_run_stats = None
+        self.entry_file_name = None
+        self.background_image = None
+        self.background_image_label = None
+        self.thread_create_quizzes = None
+        self.uploader = None
+        self.upload_stats = None  # of an upload that ended with an exception, see upload_quizzes
+        # parsing and preview run in a worker thread, see start_parse
+        self.btn_open_file = None
+        self.pb_open_file = None
+        self.btn_cancel_open = None
+        self.pb_quiz_data = None
+        self.btn_cancel_convert = None
+        self.document_ok = False
+        self.parse_queue = Queue()
+        self.upload_queue = Queue()  # progress of the upload, see run
+        self.parse_cancel = threading.Event()
+        self.parse_on_done = None
+        self.parse_widgets = ()
+        # parse the document again when it is saved, see watch.py
+        self.tkvar_watch = None
+        self.lbl_watch = None
+        self.watcher = None
+        self.watch_queue = Queue()
+
+    def get_course_combobox(self, master):
+        """ :return: combobox to pick a course, typing shows the courses that start with the text """
+        self.tkvar_course_id = tk.StringVar(self.master)
+        combobox = ctk.CTkComboBox(master=master,
+                                   values=[],
+                                   width=360,
+                                   variable=self.tkvar_course_id,
+                                   command=self.on_select_course)
+        combobox.entry.bind('<KeyRelease>', self.on_type_course)
+        return combobox
+
+    def init_ui(self):
+        """
+        ---------------------------------------------
+                [filename]            box text docx
+
+                         [ Open file]
+        ---------------------------------------------
+
+            #question [dropbox]
+                                     box parsed data
+            [v] check box testrun
+
+                        [ Convert ]
+        ---------------------------------------------
+
+            course_id [ input ]
+
+                                    browserbox/link
+
+                        [ Create quiz]
+        ---------------------------------------------
+
+        :return:
+        """
+
+        _ = self.gettext
+        #  root = self.master
+        self.master.title(_("Word to Canvasquiz Converter"))  # that's the tk root
+        self.pack(fill="both", expand=True)
+
+        # img_filepath = os.path.abspath(os.path.join(os.pardir, "data", "witraster.png"))
+        # assert os.path.exists(img_filepath)
+
+        # self.background_image = tk.PhotoImage(file=img_filepath)
+        # self.background_image_label = tk.Label(self, image=self.background_image)
+        # self.background_image_label.place(x=0, y=0)
+
+        # self.canvas = tk.Canvas(self, width=500, height=700,
+        #                        background='white',
+        #                        highlightthickness=0,
+        #                        borderwidth=0)
+        # self.canvas.place(x=50, y=60)
+        try:
+            self.master.wm_iconbitmap("../data/word2quiz.ico")
+        except FileNotFoundError:
+            print('icon file is not available')
+            pass
+        file = ""
+        default_text = (_("Your extracted quizdata will "
+                          "appear here.\n\n please check the data"))
+
+        # the frames
+        self.notebook = ttk.Notebook(self)
+        file_frame = ctk.CTkFrame(self.notebook)
+        file_frame.pack(fill=tk.BOTH)
+        data_frame = ctk.CTkFrame(self.notebook)
+        data_frame.pack(fill=tk.BOTH)
+        canvas_frame = ctk.CTkFrame(self.notebook)
+        canvas_frame.pack(fill=tk.BOTH)
+        stats_frame = ctk.CTkFrame(self.notebook)
+        stats_frame.pack(fill=tk.BOTH)
+
+        self.notebook.add(file_frame, text=_('Docx File'))
+        self.notebook.add(data_frame, text=_('Quiz Data'))
+        self.notebook.add(canvas_frame, text=_('Canvas'))
+        self.notebook.add(stats_frame, text=_('Stats'))
+        self.notebook.pack(expand=1, fill="both")
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+
+        # File_frame Input: button Output: filename label, box with sample
+        self.btn_open_file = ctk.CTkButton(file_frame,
+                                           text=_(' Open '),
+                                           width=30,
+                                           corner_radius=8,
+                                           command=self.open_word_file)
+        self.btn_open_file.pack(side="bottom", padx=5, pady=5)
+        # progressbar and cancel button while the document is parsed
+        self.btn_cancel_open = ctk.CTkButton(file_frame,
+                                             text=_('Cancel'),
+                                             width=30,
+                                             corner_radius=8,
+                                             command=self.parse_cancel.set,
+                                             state=ctk.DISABLED)
+        self.btn_cancel_open.pack(side="bottom", padx=5, pady=5)
+        self.pb_open_file = ttk.Progressbar(file_frame, orient=tk.HORIZONTAL,
+                                            length=300, mode='determinate')
+        self.pb_open_file.pack(side="bottom", pady=5)
+        # # Select word file
+        lbl_file = ctk.CTkLabel(file_frame,
+                                width=120,
+                                height=25,
+                                text=_("Select docx file"),
+                                text_font=("Arial", 20)
+                                )
+        lbl_file.pack(side="top", pady=5)
+
+        self.entry_file_name = ctk.CTkEntry(file_frame,
+                                            placeholder_text=_("no file selected"),
+                                            width=400,
+                                            height=25,
+                                            border_width=2,
+                                            corner_radius=10)
+        self.entry_file_name.pack(side="top", pady=5, padx=5)
+
+        # # Select word file
+        lbl_font_normalize = ctk.CTkLabel(file_frame,
+                                          width=80,
+                                          height=25,
+                                          text=_("Normalize\nfontsize?"),
+                                          text_font=("Arial", 12)
+                                          )
+        lbl_font_normalize.pack(side="left", pady=5)
+
+        # Dictionary with options
+        choices = {_('no change'), '12', '14', '16'}
+        self.tkvar_font_normalize = tk.StringVar(self.master)
+        self.tkvar_font_normalize.set(_('no change'))  # set the default option
+        self.cb_font_normalize = tk.OptionMenu(file_frame, self.tkvar_font_normalize, *choices, )
+        self.cb_font_normalize.config(width=6)
+
+        # link function to change dropdown
+        self.tkvar_font_normalize.trace('w', self.on_change_cb_normalize_fontsize)
+
+        self.cb_font_normalize.pack(side="left", pady=5)
+
+        # parse again on every save of the document in Word
+        self.tkvar_watch = tk.BooleanVar(self.master, value=False)
+        cb_watch = ctk.CTkCheckBox(file_frame,
+                                   text=_("Watch for changes"),
+                                   variable=self.tkvar_watch,
+                                   command=self.restart_watch)
+        cb_watch.pack(side="left", pady=5, padx=10)
+        self.lbl_watch = ctk.CTkLabel(file_frame,
+                                      width=120,
+                                      height=25,
+                                      text="",
+                                      text_font=("Arial", 10))
+        self.lbl_watch.pack(side="left", pady=5)
+
+        # the preview (tkhtmlview) is made after the first paint, see init_deferred
+        self.file_frame = file_frame
+
+        # data_frame Inputs: num questions, testrun Output: box quizdata
+        self.btn_convert2data = ctk.CTkButton(data_frame,
+                                              text=_("Convert"),
+                                              width=30,
+                                              command=self.create_quizdata,
+                                              state=tk.DISABLED)
+        self.btn_convert2data.pack(side="bottom", padx=5, pady=5)
+        self.btn_cancel_convert = ctk.CTkButton(data_frame,
+                                                text=_('Cancel'),
+                                                width=30,
+                                                command=self.parse_cancel.set,
+                                                state=ctk.DISABLED)
+        self.btn_cancel_convert.pack(side="bottom", padx=5, pady=5)
+        self.pb_quiz_data = ttk.Progressbar(data_frame, orient=tk.HORIZONTAL,
+                                            length=300, mode='determinate')
+        self.pb_quiz_data.pack(side="bottom", pady=5)
+
+        lbl_num_questions = ctk.CTkLabel(data_frame,
+                                         width=120,
+                                         height=25,
+                                         text=_("How many questions\n(in  a section)"),
+                                         text_font=("Arial", 12)
+                                         )
+        lbl_num_questions.pack(side="left", pady=5)
+
+        self.entry_num_questions = ctk.CTkEntry(data_frame,
+                                                placeholder_text="0",
+                                                width=30,
+                                                height=25,
+                                                border_width=2)
+        self.entry_num_questions.pack(side="left", pady=5, padx=5)
+
+        #  ======================= Tree to show quizdata
+        tree_frame = ttk.Frame(data_frame)
+        self.tree_quiz_data = QuizDataTree(tree_frame, height=25)
+        scrollbar_quiz_data = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL,
+                                            command=self.tree_quiz_data.yview)
+        self.tree_quiz_data.configure(yscrollcommand=scrollbar_quiz_data.set)
+        scrollbar_quiz_data.pack(side="right", fill=tk.Y)
+        self.tree_quiz_data.pack(side="left", fill=tk.BOTH, expand=True)
+        tree_frame.pack(side="right", fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+        lbl_course_id = ctk.CTkLabel(canvas_frame,
+                                     width=120,
+                                     height=25,
+                                     text=_("Choose Course"),
+                                     text_font=("Arial", 12)
+                                     )
+        lbl_course_id.pack(side="top", pady=5)
+
+        # the courses (with students) from the local database, see courses.py
+        self.om_course = self.get_course_combobox(canvas_frame)
+        self.om_course.pack(side="top", pady=5)
+        # more courses for one upload, e.g. parallel sections, see fanout.py
+        btn_add_course = ctk.CTkButton(canvas_frame,
+                                       text=_('Add course'),
+                                       width=30,
+                                       corner_radius=8,
+                                       command=self.add_course)
+        btn_add_course.pack(side="top", pady=5)
+        self.lb_courses = tk.Listbox(canvas_frame, height=4, width=50)
+        self.lb_courses.bind('<Double-Button-1>', self.remove_course)
+        self.lb_courses.bind('<Delete>', self.remove_course)
+        self.lb_courses.pack(side="top", pady=5)
+        # progressbar
+        self.pb_create_quizzes = ttk.Progressbar(canvas_frame, orient=tk.HORIZONTAL,
+                               length=300, mode='determinate')
+        self.pb_create_quizzes.pack(side="top", pady=10)
+        self.btn_create_quizzes = ctk.CTkButton(
+                canvas_frame,
+                text=_(' Create Quizzes in Canvas '),
+                width=30,
+                corner_radius=8,
+                command=self.create_quizzes,
+                state=ctk.DISABLED,
+                                                )
+        self.btn_create_quizzes.pack(side="top", pady=10)
+
+        # stats_frame: the timing spans of the last run (open, convert or upload)
+        self.tree_run_stats = ttk.Treeview(stats_frame, height=25,
+                                           columns=('count', 'total', 'max', 'details'))
+        for column, text, width in (('#0', _('Step'), 140), ('count', '#', 50),
+                                    ('total', _('Total ms'), 80), ('max', _('Max ms'), 80),
+                                    ('details', '', 250)):
+            self.tree_run_stats.heading(column, text=text)
+            self.tree_run_stats.column(column, width=width,
+                                       anchor=tk.W if column in ('#0', 'details') else tk.E)
+        self.tree_run_stats.pack(side="top", fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+        # events of the parse worker thread
+        self.master.bind('<<ParseDocument:Progress>>', self.on_parse_event)
+        self.master.bind('<<ParseDocument:Done>>', self.on_parse_event)
+        # the watch thread parsed a saved document
+        self.master.bind('<<WatchDocument:Changed>>', self.on_document_changed)
+        # the course sync thread saved the courses
+        self.master.bind('<<CourseSync:Ready>>', lambda event: self.update_course_choices())
+        # once the window is painted (the idle callback of after_idle)
+        self.after_idle(self.after, 0, self.init_deferred)
+        # ===============================Button to access save2word method=================
+        # save2canvas = Button(root, text="Save to Word File", font=('arial', 10, 'bold'),
+        #                      bg="RED", fg='WHITE', command=save2canvas)
+        # save2canvas.place(x=255, y=320)
+
+        # button = InterActiveButton(self,
+        #                           text="Button",
+        #                           width=200,
+        #                           height=50)
+        # Using `anchor="w"` forces the button to expand to the right.
+        # If it's removed, the button will expand in both directions
+        # button.pack(padx=20, pady=20, anchor="w")
+
+    def init_deferred(self):
+        """ the widgets that need heavier modules, made after the first paint """
+        from tktooltip import ToolTip
+        from preview import PagedHTMLPreview
+        _ = self.gettext
+
+        ToolTip(self.btn_open_file, msg=_("Open a docx file with special quiz-format. See help."))
+        self.html_lbl_docsample = PagedHTMLPreview(self.file_frame,
+                                                   height=400,
+                                                   # width=100,
+                                                   html=_("<p><i>no content yet</i></p>"))
+
+        self.html_lbl_docsample.pack(side="right", pady=20, padx=20)
+
+    def on_tab_changed(self, event):
+        """ the CanvasRobot is only needed on the Canvas tab, start making it """
+        if self.notebook.index('current') == 2:
+            if not self.om_course.values:
+                self.update_course_choices()
+            if not self.thread_sync_courses:
+                self.start_course_sync()
+        elif self.notebook.index('current') == 3:
+            self.show_run_stats()
+
+    def show_run_stats(self):
+        """ fill the Stats tab with the summary of the last run """
+        run = timing.last_run()
+        self.tree_run_stats.delete(*self.tree_run_stats.get_children())
+        self.tree_run_stats.heading('#0', text=run.name)
+        for row in run.summary():
+            self.tree_run_stats.insert('', tk.END, text=row['name'],
+                                       values=(row['count'], f"{row['total'] * 1000:.1f}",
+                                               f"{row['max'] * 1000:.1f}",
+                                               ', '.join(f"{key}={value}"
+                                                         for key, value in row['attrs'].items())))
+
+    def start_course_sync(self):
+        """ make the CanvasRobot and sync the courses in the local database in a thread
+        the course choices are updated when the courses are saved """
+        from coursesync import sync_with_canvasrobot
+
+        def courses_ready():
+            self.master.event_generate('<<CourseSync:Ready>>')
+
+        def sync():
+            try:
+                sync_with_canvasrobot(get_canvasrobot(), courses_ready=courses_ready)
+            except Exception:  # the local courses can still be used
+                logging.exception("course sync failed")
+
+        self.thread_sync_courses = threading.Thread(target=timing.in_current_run(sync),
+                                                    daemon=True)
+        self.thread_sync_courses.start()
+
+    def on_change_cb_normalize_fontsize(self, *args):
+        print(self.tkvar_font_normalize.get())
+
+    def on_select_course(self, *args):
+        """ enables button on Tab Canvas that can start the creation of the quizzes
+        by calling self.create_quizzes"""
+        self.btn_create_quizzes.configure(state=ctk.NORMAL)
+
+    def on_type_course(self, event):
+        """ search as you type, after a short pause """
+        if self.after_update_courses:
+            self.after_cancel(self.after_update_courses)
+        self.after_update_courses = self.after(150, self.update_course_choices)
+
+    def update_course_choices(self):
+        """ show the courses that start with the typed text """
+        self.after_update_courses = None
+        text = self.tkvar_course_id.get()
+        self.om_course.configure(values=[course.label() for course in find_courses(text)])
+        ready = find_course(text) or self.upload_courses
+        self.btn_create_quizzes.configure(state=ctk.NORMAL if ready else ctk.DISABLED)
+
+    def add_course(self):
+        """ add the chosen course to the courses of the next upload """
+        label = self.om_course.get()
+        course_id = find_course(label)
+        if course_id is None or course_id in [course for course, _ in self.upload_courses]:
+            return
+        self.upload_courses.append((course_id, label))
+        self.lb_courses.insert(tk.END, label)
+        self.btn_create_quizzes.configure(state=ctk.NORMAL)
+
+    def remove_course(self, event):
+        """ double-click or Delete removes the course from the next upload """
+        for index in reversed(self.lb_courses.curselection()):
+            self.lb_courses.delete(index)
+            del self.upload_courses[index]
+
+    def show_course_progress(self):
+        """ the progress per course of an upload to several courses """
+        progress = getattr(self.uploader, 'course_progress', {})
+        for index, (course_id, label) in enumerate(self.upload_courses):
+            if course_id in progress:
+                self.lb_courses.delete(index)
+                self.lb_courses.insert(index, f"{label}  {progress[course_id].done:.0%}")
+
+    def start_parse(self, target, on_done, progressbar, cancel_button):
+        """
+        Run target in a worker thread, so the window keeps responding
+        :param target: function(progress, cancel) returning the result
+        :param on_done: function(result, error) called in the Tk thread when target is ready
+        :param progressbar: shows the progress of target
+        :param cancel_button: enabled while target runs
+        """
+        self.parse_cancel.clear()
+        self.parse_on_done = on_done
+        self.parse_widgets = (progressbar, cancel_button)
+        progressbar['value'] = 0
+        cancel_button.configure(state=ctk.NORMAL)
+        self.btn_open_file.configure(state=ctk.DISABLED)
+        self.btn_convert2data.configure(state=tk.DISABLED)
+
+        def progress(fraction):
+            self.parse_queue.put(('progress', fraction))
+            self.master.event_generate('<<ParseDocument:Progress>>')
+
+        def run():
+            try:
+                with timing.profiled(timing.current_run().name):
+                    result = (target(progress, self.parse_cancel), None)
+            except Exception as e:  # reported in the Tk thread
+                result = (None, e)
+            self.parse_queue.put(('done', result))
+            self.master.event_generate('<<ParseDocument:Done>>')
+
+        threading.Thread(target=timing.in_current_run(run), daemon=True).start()
+
+    def on_parse_event(self, event):
+        """ handles the messages of the parse worker, in the Tk thread """
+        while True:
+            try:
+                kind, value = self.parse_queue.get_nowait()
+            except Empty:
+                return
+            progressbar, cancel_button = self.parse_widgets
+            if kind == 'progress':
+                progressbar['value'] = 100 * value
+                continue
+            progressbar['value'] = 100
+            cancel_button.configure(state=ctk.DISABLED)
+            self.btn_open_file.configure(state=ctk.NORMAL)
+            self.btn_convert2data.configure(state=tk.NORMAL if self.document_ok else tk.DISABLED)
+            result, error = value
+            if error is None:
+                self.parse_on_done(result)
+                self.show_run_stats()
+            elif type(error).__name__ == 'ParseCancelled':  # without importing document in the Tk thread
+                progressbar['value'] = 0
+            else:
+                logging.error("parsing failed", exc_info=error)
+                messagebox.showerror(title="docx", message=str(error))
+
+    def open_word_file(self):
+        """
+        Open the Word file
+        save the filename in self.entry_filename
+        normalize Q&A fontsize if asked
+        the document is parsed in a worker thread, show_preview shows the result"""
+
+        _ = self.gettext
+
+        f = askopenfilename(defaultextension=".docx",
+                            filetypes=[("Word docx", "*.docx")])
+        if not f:
+            return
+        timing.new_run(f"open {os.path.basename(f)}")
+        self.entry_file_name.delete(0, tk.END)
+        # self.entry_file_name.config(fg="blue")
+        self.entry_file_name.insert(0, f)
+        self.document_ok = False
+
+        normalize = self.tkvar_font_normalize.get()
+        normalize = int(normalize) if normalize.isdigit() else 0
+
+        def parse(progress, cancel):
+            from document import get_parsed_document
+            # the parsed document is kept, create_quizdata uses it too
+            return get_parsed_document(filename=f, normalize_fontsize=normalize,
+                                       progress=progress, cancel=cancel)
+
+        self.start_parse(parse, self.show_preview, self.pb_open_file, self.btn_cancel_open)
+        self.restart_watch()
+
+    def restart_watch(self):
+        """ stop watching the previous document, watch the open one if asked """
+        if self.watcher:
+            self.watcher.stop()  # without waiting, it may be in event_generate for this thread
+            self.watcher = None
+        self.lbl_watch.configure(text="")
+        filename = self.entry_file_name.get()
+        if not (self.tkvar_watch.get() and filename):
+            return
+        from watch import DocumentWatcher
+        normalize = self.tkvar_font_normalize.get()
+
+        def on_change(changed_filename, document, changed):  # in the watch thread
+            self.watch_queue.put((changed_filename, document, changed))
+            self.master.event_generate('<<WatchDocument:Changed>>')
+
+        self.watcher = DocumentWatcher(filename, on_change,
+                                       normalize_fontsize=int(normalize) if normalize.isdigit() else 0)
+        self.watcher.start()
+
+    def on_document_changed(self, event):
+        """ show the document that was parsed again after a save, and its quiz data
+        if that was converted already """
+        from preview import preview_items
+        from document import IncorrectNumberofQuestions, IncorrectAnswerMarking, \
+            IncorrectNumberofAnswers
+        _ = self.gettext
+
+        filename, document, changed = self.watch_queue.get()
+        if filename != self.entry_file_name.get():  # the watch of a previous document
+            return
+        self.html_lbl_docsample.set_items(
+            preview_items(document, _('Note that the next lines are not recognized')))
+        message = _("{} question blocks changed").format(changed)
+        if self.data_dict is not None:
+            num_questions = self.entry_num_questions.get()
+            try:
+                self.show_quizdata(document.quiz_data(
+                    check_num_questions=int(num_questions) if num_questions.isdigit() else 0))
+            except (IncorrectNumberofQuestions, IncorrectAnswerMarking,
+                    IncorrectNumberofAnswers) as e:  # a question may be half edited
+                message = f"{message}, {e}"
+        self.lbl_watch.configure(text=f"{time.strftime('%H:%M:%S')} {message}")
+        self.show_run_stats()
+
+    def show_preview(self, document):
+        """ show the parsed document (the rest is rendered while scrolling)
+        and ask if the first question block is ok """
+        from preview import preview_items
+        _ = self.gettext
+
+        self.html_lbl_docsample.set_items(
+            preview_items(document, _('Note that the next lines are not recognized')))
+        # enable next step
+        # root.tk.eval('::msgcat::mclocale nl')
+        result = messagebox.askquestion(title="docx",
+                                        message=_('Is the first question block ok?'))
+        # todo: change symbol
+        if result == 'yes':
+            self.document_ok = True
+            self.notebook.select(1)
+            self.btn_convert2data.configure(state=tk.NORMAL)
+            return
+        title = "docx"
+        message = _("Check the Word doc, save it and try again")
+        messagebox.showinfo(title=title, message=message)
+
+    def create_quizdata(self):
+        """
+        GUI: show the quiz_data in a tree
+        the quiz data is made in a worker thread, show_quizdata shows the result
+        :return:
+        """
+        _ = self.gettext
+
+        def to_int(var):
+            return int(var) if var.isdigit() else 0
+
+        filename = self.entry_file_name.get()
+        timing.new_run(f"convert {os.path.basename(filename)}")
+        normalize = to_int(self.tkvar_font_normalize.get())
+        check_num_questions = to_int(self.entry_num_questions.get())
+
+        def convert(progress, cancel):
+            from document import get_parsed_document
+            document = get_parsed_document(filename=filename, normalize_fontsize=normalize,
+                                           progress=progress, cancel=cancel)
+            return document.quiz_data(check_num_questions=check_num_questions)
+
+        self.start_parse(convert, self.show_quizdata, self.pb_quiz_data, self.btn_cancel_convert)
+
+    def show_quizdata(self, result):
+        """ replace the content of the quiz data tree """
+        _ = self.gettext
+
+        self.data_dict, not_recognized = result
+        self.tree_quiz_data.set_data(self.data_dict, not_recognized,
+                                     title_not_recognized=_('- Not recognized lines -'),
+                                     title_all_recognized=_('- All lines were recognized -'))
+
+    def create_quizzes(self):
+        """
+        Create the quiz in Canvas using the quizdata
+        :return: not used
+        """
+        _ = self.gettext
+
+        # the chosen course is uploaded to with the added courses
+        self.add_course()
+        if not self.upload_courses:
+            messagebox.showerror(title="Canvas", message=_("Choose a course"))
+            return
+        from images import CourseImages
+        from journal import UploadJournal
+        from reupload import UploadedItems, document_source, plan_changes
+        from upload import PreparedUpload
+        docx = self.entry_file_name.get()
+        source = document_source(docx)
+        # first check in the journal if the quizzes were already (partly) created
+        # a qti import always creates all quizzes, it is not in the journal
+        journal = UploadJournal.for_data(self.data_dict)
+        prepared = None  # the hashes of the document, to compare with an earlier version
+        course_ids = []
+        notes = []
+        for course_id, label in self.upload_courses:
+            title = "Canvas" if len(self.upload_courses) == 1 else f"Canvas {label}"
+            uploaded = UploadedItems(course_id, source)
+            current = uploaded.load()
+            created, total = journal.progress(course_id, self.data_dict)
+            if config.get('upload', 'method') == 'qti':
+                pass
+            elif created == total:
+                result = messagebox.askquestion(title=title,
+                                                message=_("These quizzes were already created in "
+                                                          "this course. Create them again?"))
+                if result != 'yes':
+                    continue
+                journal.clear(course_id)
+                uploaded.forget()
+                CourseImages.forget(course_id)  # the images may be removed in Canvas too
+            elif created:
+                notes.append((title, _("The previous upload to this course was interrupted,"
+                                       " it will be resumed")))
+            elif current:
+                prepared = prepared or PreparedUpload(self.data_dict, docx=docx)
+                creates, updates, deletes = plan_changes(current, prepared)
+                if updates or deletes:  # they change or remove what is in Canvas
+                    message = _("An earlier version of this document is in this course. "
+                                "Upload the changes: {} new, {} changed and {} removed "
+                                "quizzes and questions?").format(len(creates), len(updates),
+                                                                 len(deletes))
+                    if messagebox.askquestion(title=title, message=message) != 'yes':
+                        continue
+                else:
+                    notes.append((title, _("An earlier version of this document is in this "
+                                           "course, only the changes will be uploaded")))
+            course_ids.append(course_id)
+        if notes:
+            messagebox.showinfo(title="Canvas",
+                                message="\n".join(note if len(self.upload_courses) == 1
+                                                  else f"{title}: {note}" for title, note in notes))
+        if not course_ids:
+            return
+
+        # create a thread for the (slow) creating of quizzes in Canvas
+        # the uploader itself creates the questions concurrently
+        self.pb_create_quizzes['value'] = 0
+        kwargs = dict(source=source,
+                      docx=docx,
+                      course_ids=course_ids,
+                      data=self.data_dict,
+                      gui_root=self.master,
+                      gui_queue=self.upload_queue)
+
+        timing.new_run(f"upload {os.path.basename(docx)} "
+                       f"to {', '.join(str(course) for course in course_ids)}")
+        self.thread_create_quizzes = threading.Thread(target=timing.in_current_run(
+                                                          self.upload_quizzes),
+                                                      kwargs=kwargs,
+                                                      daemon=True)
+        self.thread_create_quizzes.start()
+        # print(f"Ready to create quiz for course {course_id}")
+        # todo: call create function and show result in box
+        #self.create_quiz(course_id)
+        self.btn_create_quizzes.configure(state= ctk.DISABLED,
+                                          text=_('Working...'))
+
+    def upload_quizzes(self, source, docx, course_ids, **kwargs):
+        """ runs in thread_create_quizzes, the Done handler reads uploader.stats, or
+        upload_stats when an exception ended the upload before the uploader sent Done """
+        from upload import CanvasApi, UploadStats
+        self.uploader = self.upload_stats = None
+        try:
+            if config.get('upload', 'method') == 'qti':
+                from qti import QtiUploader as make_uploader
+                docx = None  # the images of a qti package are not supported
+            else:
+                from reupload import ChangesUploader
+                make_uploader = partial(ChangesUploader, source=source, docx=docx)
+            api = CanvasApi.from_canvasrobot(get_canvasrobot())
+            if len(course_ids) == 1:
+                self.uploader = make_uploader(api)
+                course_id = course_ids[0]
+            else:
+                from fanout import FanoutUploader
+                self.uploader = FanoutUploader(api, make_uploader, docx=docx)
+                course_id = course_ids
+            with timing.profiled('upload'):
+                self.uploader.create_quizzes_from_data(course_id=course_id, **kwargs)
+        except Exception as e:  # e.g. the login, otherwise the window waits for Done forever
+            logging.exception("upload to Canvas failed")
+            stats = getattr(self.uploader, 'stats', None) or UploadStats()
+            stats.errors.append(f"{type(e).__name__}: {e}")
+            self.upload_stats = stats
+            self.master.event_generate('<<CreateQuizzes:Done>>')
+
+
+
+def run(started: float, importtime: bool = False):
+    """
+    Show the window and run the Tk main loop
+    :param started: time.perf_counter() at the start of main.py
+    :param importtime: print the import time breakdown after the first paint
+    """
+    global root
+    ctk.set_appearance_mode("Light")  # Modes: system (default/Mac), light, dark
+    ctk.set_default_color_theme("blue")  # Themes: blue (default), dark-blue, green
+    root = root or ctk.CTk()
+    root.geometry("600x800")
+    root.resizable(False, False)
+    # localization
+    p = root.tk.eval('::msgcat::mcpackagelocale preferences')
+    r = root.tk.eval('::msgcat::mcload [file join [file dirname [info script]] msgs]')
+    # root.tk.eval('::msgcat::mclocale nl')
+
+    app = Word2QuizApp()
+    app.init_ui()
+
+    # function updates the value of a progressbar
+    def pb_create_updater(pb, queue, event):
+        pb['value'] += 100 * queue.get()
+        app.show_course_progress()
+
+    # connect an event used to updating the progressbar
+    # the event is generated in canvasrobot-method _create_quiz_
+    update_handler_create_quizzes = partial(pb_create_updater, app.pb_create_quizzes,
+                                            app.upload_queue)
+    root.bind('<<CreateQuizzes:Progress>>', update_handler_create_quizzes)
+    def show_export_ready(event):
+        #todo: change buttontext and disable
+        stats = app.upload_stats or (app.uploader.stats if app.uploader else None)
+        app.show_run_stats()
+        app.show_course_progress()
+        # the result per course of an upload to several courses
+        report = ''.join(f"\n{line}" for line in getattr(app.uploader, 'report', list)())
+        if stats and stats.errors:
+            messagebox.showerror(title="Done",
+                                 message="Export to Canvas ready with errors:" + report + "\n" +
+                                         "\n".join(stats.errors[:10]))
+            return
+        messagebox.showinfo(title="Done", message="Export to Canvas ready" + report)
+
+    root.bind('<<CreateQuizzes:Done>>', show_export_ready)
+
+    def painted():
+        logging.info(f"window painted {time.perf_counter() - started:.2f}s after start")
+        if importtime:
+            import importtime as timer
+            timer.report()
+
+    root.after_idle(root.after, 0, painted)
+
+    root.mainloop()
@@ -0,0 +1,116 @@
+""" one pooled keep-alive http session for all Canvas API traffic
+pool size, timeouts and retries come from settings ([http] in word2quiz.ini) """
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from settings import config
+
+
+class ConnectionStats:
+    """ counts the requests sent and the (tcp/tls) connections opened for them """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.opened = 0
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def count_connection(self):
+        with self._lock:
+            self.opened += 1
+
+    @property
+    def reused(self) -> int:
+        return max(self.requests - self.opened, 0)
+
+    def log(self):
+        logging.info(f"http requests={self.requests} connections "
+                     f"opened={self.opened} reused={self.reused}")
+
+
+connection_stats = ConnectionStats()
+
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        connection_stats.count_connection()
+        return super()._new_conn()
+
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        connection_stats.count_connection()
+        return super()._new_conn()
+
+
+class PooledAdapter(HTTPAdapter):
+    """ HTTPAdapter counting requests and new connections, with default timeouts """
+
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': CountingHTTPConnectionPool,
+                                                   'https': CountingHTTPSConnectionPool}
+
+    def send(self, request, timeout=None, **kwargs):
+        connection_stats.count_request()
+        return super().send(request, timeout=timeout or self.timeout, **kwargs)
+
+
+def create_session(pool_size: Optional[int] = None) -> requests.Session:
+    """
+    :param pool_size: max number of kept-alive connections per host,
+     default [http] pool_size; should be at least the number of upload threads
+    :return: session with a pooled, retrying adapter for http and https
+    """
+    pool_size = pool_size or config.getint('http', 'pool_size')
+    retries = config.getint('http', 'retries')
+    # POST is not in the allowed methods: it is only retried when the connection failed
+    retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                  backoff_factor=config.getfloat('http', 'backoff_factor'),
+                  status_forcelist=(502, 503, 504))
+    adapter = PooledAdapter(timeout=(config.getfloat('http', 'connect_timeout'),
+                                     config.getfloat('http', 'read_timeout')),
+                            pool_connections=pool_size,
+                            pool_maxsize=pool_size,
+                            max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """ :return: the session shared by all Canvas traffic of the app """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+def share_session(canvasrobot) -> requests.Session:
+    """
+    Let the canvasapi client of canvasrobot (course lookups etc.) use the shared session too
+    :return: the shared session
+    """
+    session = get_session()
+    # noinspection PyProtectedMember
+    canvasrobot.canvas._Canvas__requester._session = session
+    return session
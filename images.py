@@ -0,0 +1,243 @@
+""" the images of a document in Canvas: every media part of the docx is hashed once and
+uploaded once per course to its files area, in parallel. The questions point at the
+shared file instead of the ----media/image1.png---- placeholder of the html.
+The file ids are kept in databases/storage.sqlite by content hash, a next upload of the
+same (or another) document to the course skips the images that are there already
+
+    images = DocumentImages('data/exam.docx')
+    sources = CourseImages(api, course_id, images).upload(images.targets_in(html))
+    html = images.rewrite(html, sources)
+"""
+import hashlib
+import logging
+import mimetypes
+import posixpath
+import re
+import time
+import zipfile
+from concurrent.futures import as_completed
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+import localdb
+import timing
+from settings import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS course_image(
+    course_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (course_id, content_hash)
+);
+"""
+# an image of docxstream, with the alt text Word puts before it
+IMAGE = re.compile(r'(?:----Image alt text---->([^<]*)<)?----(media/[^<>"]+?)----')
+CHUNK_SIZE = 1 << 16
+
+
+@dataclass(frozen=True)
+class MediaPart:
+    member: str  # in the zip, e.g. word/media/image1.png
+    content_hash: str  # sha256 of its content
+    size: int
+
+    @property
+    def name(self) -> str:
+        """ :return: the name in Canvas, the same image has the same name """
+        return f"w2q-{self.content_hash[:16]}{posixpath.splitext(self.member)[1].lower()}"
+
+
+def member_name(target: str) -> str:
+    """ :return: the zip member of a relationship target of word/document.xml """
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join('word', target))
+
+
+class DocumentImages:
+    """ The media parts of a docx, each hashed once """
+
+    def __init__(self, filename: str):
+        """ :param filename: the docx """
+        self.filename = filename
+        self.parts: Dict[str, MediaPart] = {}  # member (word/media/image1.png) -> part
+        with timing.span('hash_images', file_bytes=0) as attrs, \
+                zipfile.ZipFile(filename) as docx:
+            for info in docx.infolist():
+                if not info.filename.startswith('word/media/'):
+                    continue
+                digest = hashlib.sha256()
+                with docx.open(info) as member:
+                    for chunk in iter(lambda: member.read(CHUNK_SIZE), b''):
+                        digest.update(chunk)
+                self.parts[info.filename] = MediaPart(info.filename, digest.hexdigest(),
+                                                      info.file_size)
+                attrs['file_bytes'] += info.file_size
+            attrs['images'] = len(self.parts)
+            attrs['unique'] = len({part.content_hash for part in self.parts.values()})
+
+    def read(self, part: MediaPart) -> bytes:
+        with zipfile.ZipFile(self.filename) as docx:
+            return docx.read(part.member)
+
+    def targets_in(self, html: str) -> List[str]:
+        """ :return: the targets of the images in html that are parts of the docx """
+        return [target for _, target in IMAGE.findall(html)
+                if member_name(target) in self.parts]
+
+    def part(self, target: str) -> Optional[MediaPart]:
+        return self.parts.get(member_name(target))
+
+    def hashes_in(self, html: str) -> List[str]:
+        """ :return: the content hashes of the images in html, an edited image changes them """
+        return [self.part(target).content_hash for target in self.targets_in(html)]
+
+    def rewrite(self, html: str, sources: Dict[str, str]) -> str:
+        """
+        :param html: of a question or answer
+        :param sources: content hash -> url of the image in Canvas
+        :return: html with an img for every placeholder of an uploaded image
+        """
+        def img(match) -> str:
+            alt, target = match.groups()
+            part = self.part(target)
+            if part is None or part.content_hash not in sources:
+                return match.group(0)
+            alt = (alt or '').replace('"', '&quot;')
+            return f'<img src="{sources[part.content_hash]}" alt="{alt}">'
+        return IMAGE.sub(img, html)
+
+
+def image_source(course_id, file_id: int) -> str:
+    """ :return: the url of a file of the course as Canvas puts it in rich content """
+    return f"/courses/{course_id}/files/{file_id}/preview"
+
+
+class CourseImages:
+    """ The images of a document in the files area of a course """
+
+    def __init__(self, api, course_id, images: DocumentImages, max_workers: Optional[int] = None):
+        """
+        :param api: upload.CanvasApi
+        :param course_id: the course the images are uploaded to
+        :param images: of the document
+        :param max_workers: number of simultaneous uploads, default [upload] max_workers
+        """
+        self.api = api
+        self.course_id = str(course_id)
+        self.images = images
+        self.max_workers = max_workers or config.getint('upload', 'max_workers')
+        self.errors: List[str] = []
+
+    def load(self) -> Dict[str, int]:
+        """ :return: content hash -> Canvas file id of the images uploaded to the course """
+        with localdb.connect(SCHEMA) as conn:
+            rows = conn.execute("SELECT content_hash, file_id FROM course_image "
+                                "WHERE course_id = ?", (self.course_id,)).fetchall()
+        return dict(rows)
+
+    def save(self, content_hash: str, file_id: int):
+        with localdb.connect(SCHEMA) as conn:
+            conn.execute("INSERT OR REPLACE INTO course_image"
+                         "(course_id, content_hash, file_id, created) VALUES (?, ?, ?, ?)",
+                         (self.course_id, content_hash, file_id, time.time()))
+
+    @staticmethod
+    def forget(course_id):
+        """ a next upload sends the images again, e.g. after they were removed in Canvas """
+        with localdb.connect(SCHEMA) as conn:
+            conn.execute("DELETE FROM course_image WHERE course_id = ?", (str(course_id),))
+
+    def upload_part(self, part: MediaPart) -> int:
+        """ :return: the Canvas file id of part, after uploading it to the course """
+        content_type = mimetypes.guess_type(part.name)[0] or 'application/octet-stream'
+        upload = self.api.request('POST', f"courses/{self.course_id}/files",
+                                  data=dict(name=part.name, size=part.size,
+                                            content_type=content_type,
+                                            parent_folder_path=config.get('upload',
+                                                                          'image_folder'),
+                                            on_duplicate='overwrite'))
+        file = self.api.post_file(upload['upload_url'], upload['upload_params'], part.name,
+                                  content=self.images.read(part))
+        self.save(part.content_hash, file['id'])
+        return file['id']
+
+    def upload(self, targets: Iterable[str]) -> Dict[str, str]:
+        """
+        Upload the images of targets the course doesn't have yet, each unique image once
+        :param targets: placeholder targets, e.g. of DocumentImages.targets_in
+        :return: content hash -> url in Canvas, the images that failed are in errors
+        """
+        start = time.perf_counter()
+        parts = {}
+        for target in targets:
+            part = self.images.part(target)
+            if part is not None:
+                parts.setdefault(part.content_hash, part)
+        file_ids = self.load()
+        missing = [part for content_hash, part in parts.items() if content_hash not in file_ids]
+        if missing:
+            with timing.RunThreadPoolExecutor(max_workers=min(self.max_workers,
+                                                              len(missing))) as executor:
+                futures = {executor.submit(self.upload_part, part): part for part in missing}
+                for future in as_completed(futures):
+                    part = futures[future]
+                    try:
+                        file_ids[part.content_hash] = future.result()
+                    except (requests.RequestException, KeyError) as e:
+                        self.errors.append(f"image {part.member}: {e!r}")
+        for error in self.errors:
+            logging.error(error)
+        timing.record('upload_images', time.perf_counter() - start, course_id=self.course_id,
+                      images=len(parts), uploaded=len(missing) - len(self.errors),
+                      errors=len(self.errors))
+        return {content_hash: image_source(self.course_id, file_ids[content_hash])
+                for content_hash in parts if content_hash in file_ids}
+
+
+def payload_targets(payload: dict, images: DocumentImages) -> List[str]:
+    """ :return: the image targets of the question and its answers """
+    return [target for html in [payload['question_text']] +
+            [answer['answer_html'] for answer in payload['answers']]
+            for target in images.targets_in(html)]
+
+
+def payload_hashes(payload: dict, images: DocumentImages) -> List[str]:
+    """ :return: the content hashes of the images of the question and its answers """
+    return [images.part(target).content_hash for target in payload_targets(payload, images)]
+
+
+def rewrite_payloads(payloads: List[List[dict]], images: DocumentImages,
+                     sources: Dict[str, str]) -> List[List[dict]]:
+    """ :return: the payloads, those with images as copies pointing at sources """
+    def rewrite(payload: dict) -> dict:
+        return dict(payload,
+                    question_text=images.rewrite(payload['question_text'], sources),
+                    answers=[dict(answer, answer_html=images.rewrite(answer['answer_html'],
+                                                                     sources))
+                             for answer in payload['answers']])
+    return [[rewrite(payload) if payload_targets(payload, images) else payload
+             for payload in quiz] for quiz in payloads]
+
+
+def upload_images(api, course_id, payloads: List[List[dict]], images: DocumentImages,
+                  max_workers: Optional[int] = None
+                  ) -> Tuple[List[List[Optional[dict]]], List[str]]:
+    """
+    :param payloads: question payloads per quiz, see upload.PreparedUpload
+    :return: the payloads pointing at the images in the course, the upload errors.
+    A payload is None when one of its images is not uploaded: the question is not created
+    (or recorded as uploaded) with the placeholder, a next upload tries again
+    """
+    targets = [target for quiz in payloads for payload in quiz
+               for target in payload_targets(payload, images)]
+    if not targets:
+        return payloads, []
+    course_images = CourseImages(api, course_id, images, max_workers=max_workers)
+    sources = course_images.upload(targets)
+    return [[None if payload_targets(payload, images) else payload for payload in quiz]
+            for quiz in rewrite_payloads(payloads, images, sources)], course_images.errors
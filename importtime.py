@@ -0,0 +1,47 @@
+""" import time breakdown like python -X importtime, for main.py --importtime
+install() must be called before the modules to measure are imported """
+import builtins
+import sys
+import time
+
+_original_import = builtins.__import__
+_children = []  # stack: time spent in the imports made by the modules being imported
+_records = []  # (depth, module, self seconds, cumulative seconds) in order of completion
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:  # relative or already imported: no time worth reporting
+        return _original_import(name, globals, locals, fromlist, level)
+    _children.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        cumulative = time.perf_counter() - start
+        children = _children.pop()
+        if _children:
+            _children[-1] += cumulative
+        _records.append((len(_children), name, cumulative - children, cumulative))
+
+
+def install():
+    builtins.__import__ = _timed_import
+
+
+def report(file=None, min_seconds: float = 0.001):
+    """
+    Print the imports like -X importtime does, the slowest top level ones last
+    :param file: default stderr
+    :param min_seconds: leave out the imports that took less (cumulative)
+    """
+    file = file or sys.stderr
+    print("import time:      self [us] | cumulative | imported package", file=file)
+    for depth, name, self_time, cumulative in _records:
+        if cumulative >= min_seconds:
+            print(f"import time: {self_time * 1e6:>14.0f} | {cumulative * 1e6:>10.0f} | "
+                  f"{'  ' * depth}{name}", file=file)
+    top = sorted((record for record in _records if record[0] == 0), key=lambda r: r[3])
+    total = sum(record[3] for record in top)
+    print(f"import time: total {total:.3f}s, slowest: " +
+          ", ".join(f"{name} {cumulative:.3f}s" for _, name, _, cumulative in top[-5:]),
+          file=file)
@@ -0,0 +1,79 @@
+""" journal of the quizzes and questions created in Canvas, in databases/storage.sqlite
+a re-run of an interrupted upload skips everything that was created before """
+import hashlib
+import json
+import time
+from typing import Dict, Tuple
+
+import localdb
+import model
+
+# question_index 0 is the quiz itself, questions start at 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_journal(
+    doc_hash TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    quiz_index INTEGER NOT NULL,
+    question_index INTEGER NOT NULL,
+    canvas_id INTEGER NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (doc_hash, course_id, quiz_index, question_index)
+);
+"""
+
+
+def data_hash(data) -> str:
+    """ :return: sha256 of the quiz data, the same document gives the same hash """
+    content = json.dumps(model.to_json(data), separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class UploadJournal:
+    """ The Canvas ids of the created quizzes and questions of one document """
+
+    def __init__(self, doc_hash: str):
+        self.doc_hash = doc_hash
+
+    @classmethod
+    def for_data(cls, data):
+        return cls(data_hash(data))
+
+    def load(self, course_id) -> Dict[Tuple[int, int], int]:
+        """ :return: dict of (quiz_index, question_index) -> canvas_id already created in course """
+        with localdb.connect(SCHEMA) as conn:
+            rows = conn.execute("SELECT quiz_index, question_index, canvas_id FROM upload_journal "
+                                "WHERE doc_hash = ? AND course_id = ?",
+                                (self.doc_hash, str(course_id))).fetchall()
+        return {(quiz_index, question_index): canvas_id
+                for quiz_index, question_index, canvas_id in rows}
+
+    def record(self, course_id, quiz_index: int, question_index: int, canvas_id: int):
+        """ save right away: the upload can be interrupted any moment """
+        with localdb.connect(SCHEMA) as conn:
+            conn.execute("INSERT OR REPLACE INTO upload_journal"
+                         "(doc_hash, course_id, quiz_index, question_index, canvas_id, created) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         (self.doc_hash, str(course_id), quiz_index, question_index,
+                          canvas_id, time.time()))
+
+    def record_many(self, course_id, ids: Dict[Tuple[int, int], int]):
+        """ :param ids: dict of (quiz_index, question_index) -> canvas_id """
+        now = time.time()
+        with localdb.connect(SCHEMA) as conn:
+            conn.executemany("INSERT OR REPLACE INTO upload_journal"
+                             "(doc_hash, course_id, quiz_index, question_index, canvas_id, created) "
+                             "VALUES (?, ?, ?, ?, ?, ?)",
+                             [(self.doc_hash, str(course_id), quiz_index, question_index,
+                               canvas_id, now)
+                              for (quiz_index, question_index), canvas_id in ids.items()])
+
+    def progress(self, course_id, data) -> Tuple[int, int]:
+        """ :return: number of created items (quizzes + questions) in course, total number """
+        total = sum(1 + len(questions) for _, questions in data)
+        return len(self.load(course_id)), total
+
+    def clear(self, course_id):
+        """ forget the uploads to course, a next upload creates everything again """
+        with localdb.connect(SCHEMA) as conn:
+            conn.execute("DELETE FROM upload_journal WHERE doc_hash = ? AND course_id = ?",
+                         (self.doc_hash, str(course_id)))
@@ -0,0 +1,35 @@
+""" access to the local sqlite database (databases/storage.sqlite) for the tables of the app
+the tables of canvasrobot (course, user etc.) live in the same database """
+import os
+import sqlite3
+from contextlib import contextmanager
+
+DB_FOLDER = 'databases'
+DB_FILENAME = 'storage.sqlite'
+
+
+def db_path() -> str:
+    """ :return: path of the database, relative to the current folder like canvasrobot does """
+    return os.path.join(DB_FOLDER, DB_FILENAME)
+
+
+@contextmanager
+def connect(schema: str = ''):
+    """
+    Open a connection to the local database, commit when the block
+    finishes without exceptions, rollback otherwise.
+    A connection per block keeps it usable from worker threads.
+    :param schema: optional CREATE TABLE/INDEX IF NOT EXISTS statements
+    """
+    os.makedirs(DB_FOLDER, exist_ok=True)
+    conn = sqlite3.connect(db_path(), timeout=10)
+    try:
+        if schema:
+            conn.executescript(schema)
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
@@ -0,0 +1,104 @@
+""" compact model of the quiz data: sections (quizzes) of questions with their answers
+
+Slotted classes instead of nested tuples, lists and dicts, the strings that repeat
+(p_type labels, answer ids) are interned. Sections and questions unpack and index like
+the tuples of w2q.parse_document_d2p, so code written for those keeps working:
+
+    for quiz_name, questions in sections:
+        for question_text, answers in questions:
+            for answer in answers:
+                answer.answer_html, answer.answer_weight
+"""
+import sys
+from typing import List, Tuple
+
+
+def intern(value):
+    """ :return: the interned string, other values (question numbers, None) as they are """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Answer:
+    """ same attributes as canvasrobot.entities.Answer """
+    __slots__ = ('answer_html', 'answer_weight')
+
+    def __init__(self, answer_html: str, answer_weight: int):
+        self.answer_html = answer_html
+        self.answer_weight = answer_weight
+
+    def __eq__(self, other):
+        return (self.answer_html, self.answer_weight) == (other.answer_html, other.answer_weight)
+
+    def __repr__(self):
+        return f"Answer(answer_html={self.answer_html!r}, answer_weight={self.answer_weight!r})"
+
+
+class Question:
+    __slots__ = ('text', 'answers')
+
+    def __init__(self, text: str, answers: Tuple[Answer, ...]):
+        self.text = text
+        self.answers = tuple(answers)
+
+    def __iter__(self):  # question_text, answers = question
+        return iter((self.text, self.answers))
+
+    def __getitem__(self, index):  # question[1] is question.answers
+        return (self.text, self.answers)[index]
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"Question({self.text!r}, {self.answers!r})"
+
+
+class Section:
+    """ a quiz """
+    __slots__ = ('name', 'questions')
+
+    def __init__(self, name: str, questions: Tuple[Question, ...]):
+        self.name = name
+        self.questions = tuple(questions)
+
+    def __iter__(self):  # quiz_name, questions = section
+        return iter((self.name, self.questions))
+
+    def __getitem__(self, index):  # section[1] is section.questions
+        return (self.name, self.questions)[index]
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"Section({self.name!r}, {self.questions!r})"
+
+
+def to_json(sections) -> list:
+    """ :return: sections as nested lists, answers as [answer_html, answer_weight]
+    (also for quiz data in the old tuple shape) """
+    return [[quiz_name, [[question_text, [[answer.answer_html, answer.answer_weight]
+                                          for answer in answers]]
+                         for question_text, answers in questions]]
+            for quiz_name, questions in sections]
+
+
+def from_json(data: list) -> List[Section]:
+    """ :return: the sections of data as produced by to_json """
+    return [Section(quiz_name, [Question(question_text, [Answer(html, weight)
+                                                         for html, weight in answers])
+                                for question_text, answers in questions])
+            for quiz_name, questions in data]
+
+
+def to_tuples(sections) -> list:
+    """ :return: the quiz data in the shape of w2q.parse_document_d2p:
+    list of (quiz_name, list of (question_text, list of canvasrobot Answers)),
+    e.g. for CanvasRobot.create_quizzes_from_data """
+    from canvasrobot.entities import Answer as CanvasAnswer
+
+    return [(quiz_name, [(question_text, [CanvasAnswer(answer_html=answer.answer_html,
+                                                       answer_weight=answer.answer_weight)
+                                          for answer in answers])
+                         for question_text, answers in questions])
+            for quiz_name, questions in sections]
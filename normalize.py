@@ -0,0 +1,359 @@
+""" the "Normalize fontsize?" option as a docx: the runs of the questions and answers get
+the fontsize in word/document.xml itself, so the preview and the quiz data are read from
+a normalized copy of the document instead of changing the html of every paragraph
+
+    normalized = normalized_docx('exam.docx', 12)  # databases/normalized/<hash>_12pt.docx
+
+word/document.xml is rewritten in a streaming pass, paragraph by paragraph: a paragraph
+the word2quiz rules classify as a question or answer gets a w:sz and w:szCs in every run
+but the ones with its typed number or letter, in half points like Word reads them. The html
+shows w:sz as pt (like docx2python), the read of the copy shows the fontsize itself in its
+questions and answers, the value the option put in the html. The rest of the xml
+is copied as it is, the other members of the docx (images, styles...) are copied without
+decompressing them. The normalized copies are kept by
+the hash of the content of the document, unchanged documents are normalized once """
+import copy
+import logging
+import os
+import re
+import struct
+import tempfile
+import zipfile
+from functools import lru_cache
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+import docxstream
+import localdb
+import timing
+from classifier import get_classifier
+from quizcache import file_hash
+
+NORMALIZED_FOLDER = os.path.join(localdb.DB_FOLDER, 'normalized')
+MAX_NORMALIZED_FILES = 20  # the least recently used copies are removed above this
+BLOCK_SIZE = 1024 * 1024  # of the streaming pass over word/document.xml
+COMPRESS_LEVEL = 1  # of word/document.xml in the copy, it is only read by the app
+NORMALIZED_TYPES = ('Question', 'Answer')  # like the html normalization of word2quiz
+# the run properties after w:sz and w:szCs, in the order of the schema (CT_RPr)
+AFTER_SIZE = {b'highlight', b'u', b'effect', b'bdr', b'shd', b'fitText', b'vertAlign', b'rtl',
+              b'cs', b'em', b'lang', b'eastAsianLayout', b'specVanish', b'oMath', b'rPrChange'}
+LABEL = re.compile(r'(\d+[).]|[a-d]\))\s+')  # the start of a question or answer in word2quiz
+LOCAL_HEADER_SIZE = 30  # the fixed part of a local file header of a zip
+DATA_DESCRIPTOR_FLAG = 0x08
+
+Progress = Callable[[float], None]
+
+
+def _iter_parts(stream: BinaryIO, prefix: bytes,
+                block_size: int = BLOCK_SIZE) -> Iterator[Tuple[bool, bytes]]:
+    """
+    :param stream: the xml of the document part
+    :param prefix: namespace prefix of wordprocessingml, e.g. b'w'
+    :return: generator of (is_paragraph, xml) that together are the xml: the outermost
+    w:p elements and the xml between them, one block of the stream in memory at a time
+    """
+    tag = re.compile(rb'<(/?)' + re.escape(prefix) + rb':p(?=[\s>/])')
+    buffer = b''
+    paragraph = []  # the xml of the open paragraph
+    depth = 0
+    while True:
+        block = stream.read(block_size)
+        buffer += block
+        # the tags before the last '>' are complete
+        cut = buffer.rfind(b'>') + 1 if block else len(buffer)
+        position = 0
+        for match in tag.finditer(buffer, 0, cut):
+            tag_end = buffer.index(b'>', match.end()) + 1
+            if match.group(1):
+                depth -= 1
+                if depth == 0:
+                    paragraph.append(buffer[position:tag_end])
+                    yield True, b''.join(paragraph)
+                    paragraph, position = [], tag_end
+            elif buffer[tag_end - 2:tag_end - 1] == b'/':  # <w:p/>
+                if depth == 0:
+                    yield False, buffer[position:tag_end]
+                    position = tag_end
+            else:
+                if depth == 0:
+                    yield False, buffer[position:match.start()]
+                    position = match.start()
+                depth += 1
+        if depth:
+            paragraph.append(buffer[position:cut])
+        elif position < cut:
+            yield False, buffer[position:cut]
+        buffer = buffer[cut:]
+        if not block:
+            if paragraph:  # not closed, keep it
+                yield False, b''.join(paragraph)
+            return
+
+
+@lru_cache(maxsize=None)
+def _run_patterns(prefix: bytes) -> Tuple[re.Pattern, ...]:
+    """ :return: the expressions of set_run_sizes for a namespace prefix """
+    ns = re.escape(prefix)
+    return (re.compile(rb'<' + ns + rb':r(?=[\s>/])[^>]*>'),
+            re.compile(rb'\s*<' + ns + rb':rPr(?:\s[^>]*)?(/?)>'),
+            re.compile(rb'<' + ns + rb':sz(?:Cs)?\b[^>]*?(?:/>|>\s*</' + ns + rb':sz(?:Cs)?>)'),
+            re.compile(rb'<' + ns + rb':(\w+)'),
+            # a run with only text, tabs and line breaks, it can be split
+            re.compile(rb'(<' + ns + rb':r(?:\s[^>]*)?>)(\s*<' + ns + rb':rPr(?:\s[^>]*)?'
+                       rb'(?:/>|>(?:(?!<' + ns + rb':rPr[\s>/]).)*?</' + ns + rb':rPr>))?'
+                       rb'((?:\s*(?:<' + ns + rb':(?:tab|br)\s*/>|<' + ns +
+                       rb':t(?:\s[^>]*)?>[^<]*</' + ns + rb':t>))+)\s*</' + ns + rb':r>', re.S),
+            re.compile(rb'<' + ns + rb':(?:tab|br)\s*/>|(<' + ns + rb':t(?:\s[^>]*)?>)([^<]*)(</'
+                       + ns + rb':t>)'))
+
+
+def run_texts(paragraph) -> List[str]:
+    """ :return: the text of every run of the w:p element in document order, with its tabs
+    and line breaks like the html has them """
+    texts = []
+    for run in paragraph.iter(docxstream.R):
+        text = ''
+        for child in run:
+            if child.tag == docxstream.T:
+                text += child.text or ''
+            elif child.tag == docxstream.TAB:
+                text += '\t'
+            elif child.tag == docxstream.BR:
+                text += '\n'
+        texts.append(text)
+    return texts
+
+
+def label_runs(texts: List[str], html: str) -> Tuple[int, int]:
+    """
+    The number or letter of a question or answer that is typed (not a Word numbering)
+    keeps its formatting, the html should go on starting with it for word2quiz
+    :param texts: see run_texts
+    :param html: of the paragraph
+    :return: the number of runs with the label and the whitespace after it, and the
+    number of characters of the next run that belong to it (0: none)
+    """
+    label = LABEL.match(html)
+    text = ''.join(texts)
+    if label is None or not text.lstrip().startswith(label.group(0)):
+        return 0, 0
+    length = len(label.group(0)) + len(text) - len(text.lstrip())
+    done = 0
+    for index, run_text in enumerate(texts):
+        if done + len(run_text) >= length:
+            return (index + 1, 0) if done + len(run_text) == length else (index, length - done)
+        done += len(run_text)
+    return len(texts), 0
+
+
+def _split_run(paragraph: bytes, start: int, prefix: bytes,
+               split_at: int) -> Optional[Tuple[bytes, bytes, int]]:
+    """ :return: the xml of the run at start as two runs, the first with split_at characters
+    of its text (a tab or line break is one), and the end of the run. None if the run has
+    more than text, tabs and line breaks """
+    simple = _run_patterns(prefix)[4].match(paragraph, start)
+    if simple is None:
+        return None
+    run_start, rpr, content = simple.groups()
+    run_end = b'</%s:r>' % prefix
+    left = right = b''
+    done = 0
+    for item in _run_patterns(prefix)[5].finditer(content):
+        if done >= split_at:
+            right += item.group(0)
+            continue
+        if item.group(1) is None:  # tab or line break
+            left += item.group(0)
+            done += 1
+            continue
+        text_start, text, text_end = item.groups()
+        if done + len(text) <= split_at:
+            left += item.group(0)
+        else:  # the label ends in this text
+            label_start = (text_start if b'xml:space' in text_start
+                           else text_start[:-1] + b' xml:space="preserve">')
+            left += label_start + text[:split_at - done] + text_end
+            right += text_start + text[split_at - done:] + text_end
+        done += len(text)
+    rpr = rpr or b''
+    return run_start + rpr + left + run_end, run_start + rpr + right + run_end, simple.end()
+
+
+def set_run_sizes(paragraph: bytes, prefix: bytes, size: int, keep_runs: int = 0,
+                  split_at: int = 0) -> bytes:
+    """
+    :param paragraph: xml of a w:p element
+    :param prefix: namespace prefix of wordprocessingml
+    :param size: the value of w:sz and w:szCs, in half points
+    :param keep_runs: number of runs at the start that are left as they are, see label_runs
+    :param split_at: the first characters of the next run are left as they are too: the
+    run is split in two, if it only has text (otherwise it is left as it is)
+    :return: the xml with w:sz and w:szCs set in the run properties of every other run
+    """
+    runs, properties, old_size, child = _run_patterns(prefix)[:4]
+    size_xml = (b'<%s:sz %s:val="%d"/><%s:szCs %s:val="%d"/>'
+                % (prefix, prefix, size, prefix, prefix, size))
+    parts = []
+    position = 0
+    for index, run in enumerate(runs.finditer(paragraph)):
+        if index < keep_runs or run.start() < position or run.group(0).endswith(b'/>'):
+            continue
+        if index == keep_runs and split_at:
+            split = _split_run(paragraph, run.start(), prefix, split_at)
+            if split is None:
+                continue
+            label, rest, end = split
+            parts.append(paragraph[position:run.start()] + label)
+            parts.append(set_run_sizes(rest, prefix, size))
+            position = end
+            continue
+        parts.append(paragraph[position:run.end()])
+        position = run.end()
+        rpr = properties.match(paragraph, position)
+        if rpr is None:
+            parts.append(b'<%s:rPr>%s</%s:rPr>' % (prefix, size_xml, prefix))
+        elif rpr.group(1):  # <w:rPr/>
+            parts.append(b'<%s:rPr>%s</%s:rPr>' % (prefix, size_xml, prefix))
+            position = rpr.end()
+        else:
+            # the properties up to w:rPrChange (it has run properties of its own)
+            end = paragraph.find(b'</%s:rPr>' % prefix, rpr.end())
+            change = paragraph.find(b'<%s:rPrChange' % prefix, rpr.end(), end)
+            end = change if change != -1 else end
+            content = old_size.sub(b'', paragraph[rpr.end():end])
+            insert = next((found.start() for found in child.finditer(content)
+                           if found.group(1) in AFTER_SIZE), len(content))
+            parts.append(paragraph[position:rpr.end()] + content[:insert] + size_xml +
+                         content[insert:])
+            position = end
+    parts.append(paragraph[position:])
+    return b''.join(parts)
+
+
+def _copy_member(source: BinaryIO, target: zipfile.ZipFile, info: zipfile.ZipInfo):
+    """ add a member of the source zip to target as it is, without decompressing it:
+    a local header for it and its compressed data, target writes the central directory """
+    source.seek(info.header_offset)
+    header = source.read(LOCAL_HEADER_SIZE)
+    if header[:4] != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f"no local header for {info.filename}")
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    source.seek(info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length)
+    member = copy.copy(info)
+    member.flag_bits &= ~DATA_DESCRIPTOR_FLAG  # the sizes are known, in the local header
+    member.extra = b''
+    member.header_offset = target.fp.tell()
+    target.fp.write(member.FileHeader())
+    remaining = info.compress_size
+    while remaining:
+        data = source.read(min(remaining, BLOCK_SIZE))
+        if not data:
+            raise zipfile.BadZipFile(f"{info.filename} is truncated")
+        target.fp.write(data)
+        remaining -= len(data)
+    target.filelist.append(member)
+    target.NameToInfo[member.filename] = member
+    target.start_dir = target.fp.tell()
+
+
+def write_normalized(filename: str, target: str, fontsize: int,
+                     progress: Optional[Progress] = None) -> Optional[dict]:
+    """
+    Write a copy of the docx with the fontsize set in the runs of the questions and answers
+    :param filename: the Word docx
+    :param target: the docx to write
+    :param fontsize: in points
+    :param progress: called with the fraction of word/document.xml done
+    :return: dict with the number of paragraphs and of the normalized ones, None when the
+    document doesn't use a namespace prefix for wordprocessingml (nothing written)
+    """
+    classify = get_classifier().classify
+    result = dict(paragraphs=0, normalized=0)
+    with zipfile.ZipFile(filename) as docx:
+        document_part, rels, numbering = docxstream._document(docx)
+        info = docx.getinfo(document_part)
+        with docx.open(document_part) as stream:
+            start = stream.read(BLOCK_SIZE)
+            root_start, root_end = docxstream._root_tags(start)
+            prefix = re.search(rb'xmlns:([^\s=]+)\s*=\s*["\']' +
+                               re.escape(docxstream.W_NS.encode()) + rb'["\']', root_start)
+        if prefix is None:
+            return None
+        prefix = prefix.group(1)
+        # a paragraph is parsed in a root with only the namespaces, Word adds a lot more
+        root_start = b'<%s%s>' % (root_end[2:-1], b''.join(
+            re.findall(rb'\sxmlns(?::[^\s=]+)?\s*=\s*(?:"[^"]*"|\'[^\']*\')', root_start)))
+        writer = docxstream.ParagraphWriter(rels, numbering)
+
+        def normalized_paragraph(xml: bytes) -> bytes:
+            elem = ElementTree.fromstring(root_start + xml + root_end)[0]
+            texts = run_texts(elem)
+            docxstream.merge_runs(elem, rels)
+            writer.write(elem)  # counts the numbers, like a read
+            pars, writer.paragraphs = writer.paragraphs, []
+            # text boxes in it are paragraphs of their own, it is left as it is
+            if len(pars) != 1 or classify(pars[0].strip())[3] not in NORMALIZED_TYPES:
+                return xml
+            result['normalized'] += 1
+            return set_run_sizes(xml, prefix, 2 * fontsize, *label_runs(texts, pars[0].strip()))
+
+        with open(filename, 'rb') as source, \
+                zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED,
+                                compresslevel=COMPRESS_LEVEL) as normalized:
+            for member in docx.infolist():
+                if member.filename != document_part:
+                    _copy_member(source, normalized, member)
+                    continue
+                with docx.open(document_part) as stream, \
+                        normalized.open(member.filename, 'w') as output:
+                    if progress:
+                        stream = docxstream._ProgressReader(stream, info.file_size, progress)
+                    for is_paragraph, xml in _iter_parts(stream, prefix):
+                        if is_paragraph:
+                            result['paragraphs'] += 1
+                            xml = normalized_paragraph(xml)
+                        output.write(xml)
+    return result
+
+
+def _remove_old_copies():
+    copies = sorted((entry for entry in os.scandir(NORMALIZED_FOLDER) if entry.is_file()),
+                    key=lambda entry: entry.stat().st_mtime)
+    for entry in copies[:max(0, len(copies) - MAX_NORMALIZED_FILES)]:
+        try:
+            os.remove(entry.path)
+        except OSError as e:  # in use on Windows
+            logging.info(f"normalized copy {entry.name} not removed: {e}")
+
+
+def normalized_docx(filename: str, fontsize: int,
+                    progress: Optional[Progress] = None) -> Optional[str]:
+    """
+    :param filename: the Word docx
+    :param fontsize: in points
+    :param progress: called with the fraction done when the copy is made
+    :return: path of the normalized copy of the document, made when there is none for its
+    content and fontsize yet. None if the document can't be normalized this way
+    """
+    path = os.path.join(NORMALIZED_FOLDER, f"{file_hash(filename)}_{fontsize}pt.docx")
+    with timing.span('normalize docx', file=os.path.basename(filename), fontsize=fontsize,
+                     source='cache') as attrs:
+        if os.path.exists(path):
+            os.utime(path)  # recently used
+            return path
+        attrs['source'] = 'file'
+        os.makedirs(NORMALIZED_FOLDER, exist_ok=True)
+        # written next to it and renamed: other processes (batch) never see half a copy
+        handle, temporary = tempfile.mkstemp(suffix='.docx', dir=NORMALIZED_FOLDER)
+        os.close(handle)
+        try:
+            result = write_normalized(filename, temporary, fontsize, progress)
+            if result is None:
+                return None
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        attrs.update(result)
+    _remove_old_copies()
+    return path
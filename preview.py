@@ -0,0 +1,85 @@
+""" preview of a parsed document on the Docx tab, rendered page by page """
+import itertools
+import tkinter as tk
+from typing import Iterable, Iterator, TYPE_CHECKING
+
+from tkhtmlview import HTMLScrolledText
+
+import timing
+
+if TYPE_CHECKING:  # document imports word2quiz, too slow for the start of the GUI
+    from document import ParsedDocument
+
+
+def block_html(block) -> str:
+    """ :return: html of a question block, the right answer(s) in green """
+    return ''.join(f'<p style="color: green">{p_type} {html}</p>'
+                   if ans_weight else f"<p>{p_type} {html}</p>"
+                   for p_type, ans_weight, text, html in block)
+
+
+def preview_items(document: 'ParsedDocument', note_not_recognized: str) -> Iterator[str]:
+    """
+    :param document: the parsed document
+    :param note_not_recognized: heading above the not recognized lines
+    :return: html items: the first question block, the not recognized lines, the other blocks
+    """
+    blocks = document.blocks()
+    for block in itertools.islice(blocks, 1):
+        yield block_html(block)
+    if document.not_recognized:
+        yield f"<h3>{note_not_recognized}</h3>"
+        yield from document.not_recognized
+    for block in blocks:
+        yield block_html(block)
+
+
+class PagedHTMLPreview(HTMLScrolledText):
+    """ Shows a long sequence of html items. Only the first page is rendered
+    right away, the next page when the view is scrolled near its end """
+    PAGE_SIZE = 20  # items
+
+    def __init__(self, *args, page_size: int = PAGE_SIZE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_size = page_size
+        self._items: Iterator[str] = iter(())
+        self._more = False  # items left to render
+        self._page_pending = False  # append_page is scheduled
+        # the PhotoImages of all pages, w_set_html forgets those of the earlier pages
+        self._images = []
+        self.config(yscrollcommand=self._on_yscroll)
+
+    def set_items(self, items: Iterable[str]):
+        """ replace the content, render the first page """
+        self._items = iter(items)
+        self._more = True
+        self._images = []
+        self.set_html('')
+        self.append_page()
+
+    def append_page(self) -> bool:
+        """ render the next page at the end :return: False if there are no items left """
+        with timing.span('html', page_size=self.page_size) as attrs:
+            html = ''.join(itertools.islice(self._items, self.page_size))
+            attrs['chars'] = len(html)
+            if not html:
+                self._more = False
+                return False
+            prev_state = self.cget('state')
+            self.config(state=tk.NORMAL)
+            self.mark_set(tk.INSERT, tk.END)
+            self.html_parser.w_set_html(self, html, strip=True)
+            self._images.extend(self.html_parser.images)
+            self.config(state=prev_state)
+        return True
+
+    def _append_pending_page(self):
+        self._page_pending = False
+        self.append_page()
+
+    def _on_yscroll(self, first, last):
+        self.vbar.set(first, last)
+        # near the end, the idle callback keeps scrolling smooth, one page at a time
+        if float(last) > 0.9 and self._more and not self._page_pending:
+            self._page_pending = True
+            self.after_idle(self._append_pending_page)
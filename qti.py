@@ -0,0 +1,242 @@
+""" export of the quiz data as a QTI 1.2 package (the format of the quiz export of Canvas)
+and its upload as one content migration, instead of an API call per quiz and question
+
+The package is written in one pass, quiz by quiz, without network access:
+
+    write_package('chapter1.zip', quiz_data)
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import time
+import zipfile
+from typing import Optional
+from xml.sax.saxutils import escape, quoteattr
+
+import requests
+
+import timing
+from settings import config
+from upload import CanvasApi, UploadStats
+
+QTI_NS = 'http://www.imsglobal.org/xsd/ims_qtiasiv1p2'
+CANVAS_NS = 'http://canvas.instructure.com/xsd/cccv1p0'
+IMSCP_NS = 'http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1'
+
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)  # the same data gives the same package
+POINTS_POSSIBLE = 1.0  # per question, like upload.question_payload
+# the states of a content migration that is still busy, any other state is the end of it
+MIGRATION_BUSY = ('pre_processing', 'pre_processed', 'queued', 'running')
+
+
+def identifier(*parts) -> str:
+    """ :return: stable identifier for a quiz or question, Canvas wants them unique """
+    return 'w2q' + hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:24]
+
+
+def _field(label: str, entry) -> str:
+    return (f'<qtimetadatafield><fieldlabel>{label}</fieldlabel>'
+            f'<fieldentry>{escape(str(entry))}</fieldentry></qtimetadatafield>')
+
+
+def _html(html: str) -> str:
+    return f'<material><mattext texttype="text/html">{escape(html)}</mattext></material>'
+
+
+def item_xml(ident: str, title: str, question_text: str, answers) -> str:
+    """ :return: QTI item of a multiple choice question, answers with a weight score it """
+    labels = ''.join(f'<response_label ident="{ident}_{index}">{_html(answer.answer_html)}'
+                     f'</response_label>'
+                     for index, answer in enumerate(answers, start=1))
+    conditions = ''.join(f'<respcondition continue="No"><conditionvar>'
+                         f'<varequal respident="response1">{ident}_{index}</varequal>'
+                         f'</conditionvar><setvar action="Set" varname="SCORE">'
+                         f'{answer.answer_weight}</setvar></respcondition>'
+                         for index, answer in enumerate(answers, start=1)
+                         if answer.answer_weight)
+    return (f'<item ident="{ident}" title={quoteattr(title)}>'
+            f'<itemmetadata><qtimetadata>'
+            f'{_field("question_type", "multiple_choice_question")}'
+            f'{_field("points_possible", POINTS_POSSIBLE)}'
+            f'</qtimetadata></itemmetadata>'
+            f'<presentation>{_html(question_text)}'
+            f'<response_lid ident="response1" rcardinality="Single"><render_choice>{labels}'
+            f'</render_choice></response_lid></presentation>'
+            f'<resprocessing><outcomes><decvar maxvalue="100" minvalue="0" varname="SCORE" '
+            f'vartype="Decimal"/></outcomes>{conditions}</resprocessing></item>\n')
+
+
+def meta_xml(ident: str, title: str, nr_questions: int, quiz_type: str) -> str:
+    """ :return: the Canvas settings of the quiz, assessment_meta.xml """
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<quiz identifier="{ident}" xmlns="{CANVAS_NS}">'
+            f'<title>{escape(title)}</title><description></description>'
+            f'<shuffle_answers>false</shuffle_answers><scoring_policy>keep_highest</scoring_policy>'
+            f'<quiz_type>{quiz_type}</quiz_type>'
+            f'<points_possible>{nr_questions * POINTS_POSSIBLE}</points_possible>'
+            f'<allowed_attempts>1</allowed_attempts><available>false</available></quiz>\n')
+
+
+def manifest_xml(ident: str, quiz_idents) -> str:
+    resources = ''.join(f'<resource identifier="{quiz}" type="imsqti_xmlv1p2">'
+                        f'<file href="{quiz}/{quiz}.xml"/>'
+                        f'<dependency identifierref="{quiz}_meta"/></resource>'
+                        f'<resource identifier="{quiz}_meta" '
+                        f'type="associatedcontent/imscc_xmlv1p1/learning-application-resource" '
+                        f'href="{quiz}/assessment_meta.xml">'
+                        f'<file href="{quiz}/assessment_meta.xml"/></resource>'
+                        for quiz in quiz_idents)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<manifest identifier="{ident}" xmlns="{IMSCP_NS}">'
+            f'<metadata><schema>IMS Content</schema><schemaversion>1.1.3</schemaversion></metadata>'
+            f'<organizations/><resources>{resources}</resources></manifest>\n')
+
+
+def _member(package: zipfile.ZipFile, name: str):
+    info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    return package.open(info, 'w')
+
+
+def write_package(filename: str,
+                  data,
+                  question_format: str = "Question {}.",
+                  quiz_type: str = 'practice_quiz') -> dict:
+    """
+    Write the quiz data as a QTI 1.2 package Canvas can import, the questions are
+    written to the zip one by one
+    :param filename: the zip to write
+    :param data: the quiz data, list of (quiz_name, questions)
+    :param question_format: used to create the question name. Should contain '{}'
+    :param quiz_type: Canvas quiz type of the quizzes
+    :return: dict with the number of quizzes, questions and bytes of the package
+    """
+    if '{}' not in question_format:
+        raise ValueError(f"parameter 'question_format(={question_format})' "
+                         f"should contain {{}} als placeholder")
+    quiz_idents = []
+    nr_questions = 0
+    with timing.span('qti', file=os.path.basename(filename)) as attrs:
+        with zipfile.ZipFile(filename, 'w') as package:
+            for quiz_index, (quiz_name, questions) in enumerate(data):
+                quiz = identifier(quiz_index, quiz_name)
+                quiz_idents.append(quiz)
+                with _member(package, f"{quiz}/{quiz}.xml") as member:
+                    member.write(f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                                 f'<questestinterop xmlns="{QTI_NS}">'
+                                 f'<assessment ident="{quiz}" title={quoteattr(quiz_name or "")}>'
+                                 f'<qtimetadata>{_field("cc_maxattempts", 1)}</qtimetadata>'
+                                 f'<section ident="root_section">\n'.encode('utf-8'))
+                    for index, (question_text, answers) in enumerate(questions, start=1):
+                        member.write(item_xml(f"{quiz}_{index}", question_format.format(index),
+                                              question_text, answers).encode('utf-8'))
+                    member.write(b'</section></assessment></questestinterop>\n')
+                with _member(package, f"{quiz}/assessment_meta.xml") as member:
+                    member.write(meta_xml(quiz, quiz_name or '', len(questions),
+                                          quiz_type).encode('utf-8'))
+                nr_questions += len(questions)
+            with _member(package, 'imsmanifest.xml') as member:
+                member.write(manifest_xml(identifier(*quiz_idents), quiz_idents).encode('utf-8'))
+        result = dict(quizzes=len(quiz_idents), questions=nr_questions,
+                      bytes=os.path.getsize(filename))
+        attrs.update(result)
+    return result
+
+
+class QtiUploader:
+    """ Creates the quizzes of parsed quiz data in one content migration: the QTI package
+    is uploaded as one file and Canvas imports it. Canvas does not return the ids of the
+    quizzes, so the upload journal and the incremental re-upload don't know them """
+
+    def __init__(self, api: CanvasApi, poll_seconds: Optional[float] = None,
+                 timeout_seconds: Optional[float] = None):
+        """
+        :param api: CanvasApi
+        :param poll_seconds: interval of the status checks, default [upload] poll_seconds
+        :param timeout_seconds: the import is an error when it is not done by then,
+        default [upload] qti_timeout_seconds
+        """
+        self.api = api
+        self.poll_seconds = (poll_seconds if poll_seconds is not None
+                             else config.getfloat('upload', 'poll_seconds'))
+        self.timeout_seconds = (timeout_seconds if timeout_seconds is not None
+                                else config.getfloat('upload', 'qti_timeout_seconds'))
+        self.stats: Optional[UploadStats] = None  # of the last upload, set before the Done event
+
+    def create_quizzes_from_data(self,
+                                 course_id,
+                                 data,
+                                 question_format: str = "Question {}.",
+                                 gui_root=None,
+                                 gui_queue=None,
+                                 **kwargs) -> UploadStats:
+        """
+        Same parameters as upload.QuizUploader.create_quizzes_from_data
+        :return: UploadStats, errors contains the issues of the migration
+        """
+        start = time.perf_counter()
+        stats = UploadStats()
+        done = 0.0  # fraction, the progressbar receives the increments
+
+        def progress(fraction: float):
+            nonlocal done
+            if gui_root and fraction > done:
+                gui_queue.put(fraction - done)
+                gui_root.event_generate('<<CreateQuizzes:Progress>>')
+            done = max(done, fraction)
+
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'quizzes.zip')
+            package = write_package(filename, data, question_format)
+            try:
+                self.import_package(course_id, filename, stats, progress)
+            except (requests.RequestException, KeyError) as e:
+                # KeyError: Canvas answered without the pre_attachment or id of the migration
+                stats.errors.append(f"QTI import: {e!r}")
+        progress(1.0)
+        for error in stats.errors:
+            logging.error(error)
+        timing.record('upload', time.perf_counter() - start, course_id=course_id, method='qti',
+                      quizzes=package['quizzes'], questions=package['questions'],
+                      bytes=package['bytes'], errors=len(stats.errors))
+        self.stats = stats
+        if gui_root:
+            gui_root.event_generate('<<CreateQuizzes:Done>>')
+        return stats
+
+    def import_package(self, course_id, filename: str, stats: UploadStats, progress):
+        """ upload the package as a qti_converter content migration, wait until it is done """
+        migration = self.api.request('POST', f"courses/{course_id}/content_migrations",
+                                     json=dict(migration_type='qti_converter',
+                                               pre_attachment=dict(
+                                                   name=os.path.basename(filename),
+                                                   size=os.path.getsize(filename))))
+        pre_attachment = migration['pre_attachment']
+        self.api.post_file(pre_attachment['upload_url'], pre_attachment.get('upload_params', {}),
+                           filename)
+        progress(0.1)  # the import itself takes the rest
+        path = f"courses/{course_id}/content_migrations/{migration['id']}"
+        deadline = time.monotonic() + self.timeout_seconds
+        while migration.get('workflow_state') in MIGRATION_BUSY:
+            if time.monotonic() > deadline:
+                stats.errors.append(f"QTI import of {os.path.basename(filename)} not done after "
+                                    f"{self.timeout_seconds:g}s, it is "
+                                    f"{migration.get('workflow_state')} in Canvas")
+                return
+            time.sleep(self.poll_seconds)
+            if migration.get('progress_url'):
+                completion = self.api.request('GET', migration['progress_url']).get('completion')
+                progress(0.1 + 0.9 * (completion or 0) / 100)
+            migration = self.api.request('GET', path)
+        if migration.get('workflow_state') != 'completed':  # failed, waiting_for_select etc.
+            stats.errors.append(f"QTI import of {os.path.basename(filename)} "
+                                f"{migration.get('workflow_state') or 'failed'}")
+        for issue in self.api.request('GET', f"{path}/migration_issues") or []:
+            message = f"QTI import {issue.get('issue_type')}: {issue.get('description')}"
+            if issue.get('issue_type') == 'error':
+                stats.errors.append(message)
+            else:
+                logging.warning(message)
+        logging.info(f"content migration {migration['id']} to course {course_id}: "
+                     f"{migration.get('workflow_state')}")
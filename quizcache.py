@@ -0,0 +1,96 @@
+""" persistent cache of parsed documents, keyed by a hash of the docx content
+and the parse options. Unchanged files are never parsed again """
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Optional
+
+import localdb
+
+MAX_CACHE_BYTES = 50 * 1024 * 1024  # least recently used entries are evicted above this
+CACHE_VERSION = 3  # increase when the cached format (or content) changes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS parse_cache(
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS parse_cache_last_used ON parse_cache(last_used);
+"""
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def file_hash(filename: str) -> str:
+    """ :return: sha256 hex digest of the content of the file """
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def cache_key(content_hash: str, **options) -> str:
+    """
+    :param content_hash: hash of the docx bytes
+    :param options: the parse options (e.g. normalize_fontsize)
+    :return: key for the cache
+    """
+    options['cache_version'] = CACHE_VERSION
+    return f"{content_hash}:{json.dumps(options, sort_keys=True)}"
+
+
+def _count(hit: bool, key: str):
+    with _stats_lock:
+        _stats['hits' if hit else 'misses'] += 1
+        logging.info(f"parse cache {'hit' if hit else 'miss'} for {key[:12]} "
+                     f"(hits={_stats['hits']} misses={_stats['misses']})")
+
+
+def get(key: str) -> Optional[dict]:
+    """
+    :param key: see cache_key
+    :return: the cached entry or None
+    """
+    with localdb.connect(SCHEMA) as conn:
+        row = conn.execute("SELECT data FROM parse_cache WHERE key = ?", (key,)).fetchone()
+        if row:
+            conn.execute("UPDATE parse_cache SET last_used = ? WHERE key = ?",
+                         (time.time(), key))
+    _count(hit=row is not None, key=key)
+    return json.loads(row[0]) if row else None
+
+
+def put(key: str, entry: dict):
+    """
+    Save the entry, then evict the least recently used entries
+    until the cache fits in MAX_CACHE_BYTES
+    :param key: see cache_key
+    :param entry: json serializable value
+    """
+    data = json.dumps(entry, separators=(',', ':'))
+    with localdb.connect(SCHEMA) as conn:
+        conn.execute("INSERT OR REPLACE INTO parse_cache(key, data, size, last_used) "
+                     "VALUES (?, ?, ?, ?)",
+                     (key, data, len(data), time.time()))
+        total = 0
+        evict = []
+        for old_key, size in conn.execute("SELECT key, size FROM parse_cache "
+                                          "ORDER BY last_used DESC"):
+            total += size
+            if total > MAX_CACHE_BYTES:
+                evict.append((old_key,))
+        if evict:
+            conn.executemany("DELETE FROM parse_cache WHERE key = ?", evict)
+            logging.info(f"parse cache evicted {len(evict)} entries")
+
+
+def stats() -> dict:
+    """ :return: copy of the hit/miss counters of this process """
+    with _stats_lock:
+        return dict(_stats)
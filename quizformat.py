@@ -0,0 +1,93 @@
+""" the format of a quiz document as word2quiz defines it: the rules that classify the html
+of a paragraph, the score of the right answer and the exceptions of a document that is
+not in the format. A copy of word2quiz.main: importing that module makes a CanvasRobot
+(it logs in to Canvas), the parse (document, batch, the service, watch) doesn't need one.
+robot.py is the only module that imports word2quiz """
+import io
+import re
+from dataclasses import dataclass
+
+FORMAT_VERSION = '1'  # change it with the rules, the quizcache keeps parses per version
+FULL_SCORE = 100  # weight of an answer marked with '!'
+QA_SIZE = 12
+
+
+class Error(Exception):
+    """ Base class for other exceptions"""
+    pass
+
+
+class IncorrectNumberofQuestions(Error):
+    """ the quiz contains unexpected number of questions"""
+    pass
+
+
+class IncorrectAnswerMarking(Error):
+    """ the answers of a particular question should have
+        only one good (!) marking (or total of 100 points) """
+    pass
+
+
+class IncorrectNumberofAnswers(Error):
+    """ a question should have 4 answers (word2quiz asserts it) """
+    pass
+
+
+@dataclass(frozen=True)
+class Rule:
+    """ a paragraph format: the groups 'text' and optional 'id', 'prefix' and
+    'fullscore' (the right answer) make the result """
+    name: str
+    pattern: re.Pattern
+    type: str
+
+
+# '!' before the text of answer marks it as the right answer
+RULES = [
+    Rule('comment', re.compile(r"^#(?P<text>.*)"), 'Comment'),
+    Rule('title', re.compile(r"^<font size=\"(?P<fontsize>\d+)\"><u>(?P<text>.*)</u></font>"),
+         'Title'),
+    Rule('title_style',
+         re.compile(r"^<span style=\"font-size:(?P<fontsize>[\dpt]+)\"><u>(?P<text>.*)</u>"),
+         'Title'),
+    Rule('quiz_name',
+         re.compile(r"^<font size=\"(?P<fontsize>\d+[^\"]+)\"><b>(?P<text>.*)\s*</b></font>"),
+         'Quizname'),
+    Rule('quiz_name_style',
+         re.compile(r"^<span style=\"font-size:(?P<fontsize>[\dpt]+)"
+                    r"(;text-transform:uppercase)?\"><b>(?P<text>.*)\s*</b></span>"),
+         'Quizname'),
+    Rule('page_ref_style', re.compile(r'(\(pp\.\s+[\d-]+)'), 'PageRefStyle'),
+    Rule('question_fontsize',
+         re.compile(r'^(?P<id>\d+)[).]\s+'
+                    r'(?P<prefix><font size="(?P<fontsize>\d+)">)(?P<text>.*</font>)'),
+         'Question'),
+    Rule('question', re.compile(r"^(?P<id>\d+)[).]\s+(?P<text>.*)"), 'Question'),
+    Rule('ok_answer_fontsize',
+         re.compile(r'^(?P<id>[a-d])\)\s+(?P<prefix><font size="(?P<fontsize>\d+)">.*)'
+                    r'(?P<fullscore>!)(?P<text>.*</font>)'),
+         'Answer'),
+    Rule('ok_answer', re.compile(r"^(?P<id>[a-d])\)\s+(?P<prefix>.*)(?P<fullscore>!)(?P<text>.*)"),
+         'Answer'),
+    Rule('wrong_answer_fontsize',
+         re.compile(r'^(?P<id>[a-d])\)\s+'
+                    r'(?P<prefix><font size="(?P<fontsize>\d+)">)(?P<text>.*</font>)'),
+         'Answer'),
+    Rule('wrong_answer', re.compile(r"^(?P<id>[a-d])\)\s+(?P<text>.*)"), 'Answer'),
+]
+
+
+def normalize_size(text: str, size: int):
+    """ :return: the html of a question or answer with fontsize size, like word2quiz """
+    from lxml import etree  # of docx2python, only for the html normalization
+
+    try:  # can be html or not
+        tree = etree.parse(io.StringIO(text), etree.XMLParser())
+        # text could contain style attribute
+        ele = tree.xpath('//span[starts-with(@style,"font-size:")]')
+        if ele is not None and len(ele):
+            ele[0].attrib['style'] = f"font-size:{size}pt"
+            return etree.tostring(ele[0], encoding='unicode')
+    except etree.XMLSyntaxError:
+        # assume simple html string no surrounding tags
+        return f'<span style="font-size:{size}pt">{text}</span>'
@@ -0,0 +1,78 @@
+""" tree view of the quiz data on the Quiz Data tab: quizzes > questions > answers
+rows are only made when their parent is opened """
+import html
+import re
+import tkinter as tk
+from tkinter import ttk
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+CHUNK = 200  # rows inserted at once, a 'more' row loads the next chunk
+
+
+def plain_text(text) -> str:
+    """ :return: text without html tags, on one line """
+    return ' '.join(html.unescape(TAG_PATTERN.sub('', str(text))).split())
+
+
+class QuizDataTree(ttk.Treeview):
+    """ Treeview showing the quiz data lazily """
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, columns=('weight',), **kwargs)
+        self.heading('#0', text='')
+        self.heading('weight', text='%')
+        self.column('weight', width=50, anchor=tk.E, stretch=False)
+        self._children = {}  # item id -> (list of (text, weight, children), next index)
+        self.bind('<<TreeviewOpen>>', self._on_open)
+        self.bind('<<TreeviewSelect>>', self._on_select)
+
+    def set_data(self, data, not_recognized, title_not_recognized: str, title_all_recognized: str):
+        """
+        Replace the content of the tree, only the quiz rows are made
+        :param data: the quiz data, list of (quiz_name, questions)
+        :param not_recognized: list of the not recognized lines
+        :param title_not_recognized: text of the row above the not recognized lines
+        :param title_all_recognized: text of the row when all lines were recognized
+        """
+        self.delete(*self.get_children())
+        self._children.clear()
+        rows = [(quiz_name, '', [(question_text, '', [(answer.answer_html, answer.answer_weight,
+                                                       None)
+                                                      for answer in answers])
+                                 for question_text, answers in questions])
+                for quiz_name, questions in data]
+        if not_recognized:
+            rows.append((title_not_recognized, '', [(line, '', None) for line in not_recognized]))
+        else:
+            rows.append((title_all_recognized, '', None))
+        self._children[''] = (rows, 0)
+        self._insert_chunk('')
+
+    def _insert_chunk(self, parent):
+        rows, start = self._children[parent]
+        for text, weight, children in rows[start:start + CHUNK]:
+            item = self.insert(parent, tk.END, text=plain_text(text), values=(weight,))
+            if children:
+                self._children[item] = (children, 0)
+                self.insert(item, tk.END, text='')  # placeholder, makes the row openable
+        if start + CHUNK < len(rows):
+            self._children[parent] = (rows, start + CHUNK)
+            self.insert(parent, tk.END, iid=f'more:{parent}',
+                        text=f'... {len(rows) - start - CHUNK} more')
+        else:
+            del self._children[parent]
+
+    def _on_open(self, event):
+        item = self.focus()
+        if item in self._children and self.get_children(item):
+            placeholder = self.get_children(item)[0]
+            if not self.item(placeholder, 'text'):
+                self.delete(placeholder)
+                self._insert_chunk(item)
+
+    def _on_select(self, event):
+        for item in self.selection():
+            if item.startswith('more:'):
+                parent = self.parent(item)
+                self.delete(item)
+                self._insert_chunk(parent)
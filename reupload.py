@@ -0,0 +1,233 @@
+""" incremental re-upload: send only the quizzes and questions of an edited document
+that differ from what was uploaded before to the same course """
+import logging
+import os
+import threading
+import time
+from concurrent.futures import as_completed
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+import localdb
+import timing
+from upload import CanvasApi, Key, PreparedUpload, QuizUploader, UploadStats
+from settings import config
+
+# what is in Canvas now, per document (source, see document_source) and course:
+# question_index 0 is the quiz itself, content_hash is of its title or question payload
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploaded_item(
+    course_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    quiz_index INTEGER NOT NULL,
+    question_index INTEGER NOT NULL,
+    canvas_id INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (course_id, source, quiz_index, question_index)
+);
+"""
+
+
+def document_source(filename: str) -> str:
+    """ :return: the source of a document in uploaded_item, its absolute path: another
+    document with the same name (e.g. exam.docx of another year) is another source """
+    return os.path.abspath(filename)
+
+
+def plan_changes(current: Dict[Key, Tuple[int, str]],
+                 prepared: PreparedUpload) -> Tuple[List[Key], List[Key], List[Key]]:
+    """
+    :param current: UploadedItems.load of the course
+    :param prepared: the payloads of the edited document
+    :return: the keys of the items to create, update and delete in the course
+    """
+    desired = prepared.items
+    hashes = prepared.hashes
+    creates = [key for key in desired if key not in current]
+    updates = [key for key in desired if key in current and current[key][1] != hashes[key]]
+    deletes = [key for key in current if key not in desired and
+               (key[1] == 0 or (key[0], 0) in desired)]  # questions go with their quiz
+    return creates, updates, deletes
+
+
+class UploadedItems:
+    """ the Canvas ids and content hashes of an uploaded document in a course """
+
+    def __init__(self, course_id, source: str):
+        self.course_id = str(course_id)
+        self.source = source
+
+    def load(self) -> Dict[Key, Tuple[int, str]]:
+        with localdb.connect(SCHEMA) as conn:
+            rows = conn.execute("SELECT quiz_index, question_index, canvas_id, content_hash "
+                                "FROM uploaded_item WHERE course_id = ? AND source = ?",
+                                (self.course_id, self.source)).fetchall()
+        return {(quiz_index, question_index): (canvas_id, chash)
+                for quiz_index, question_index, canvas_id, chash in rows}
+
+    def save(self, key: Key, canvas_id: int, chash: str):
+        with localdb.connect(SCHEMA) as conn:
+            conn.execute("INSERT OR REPLACE INTO uploaded_item"
+                         "(course_id, source, quiz_index, question_index, canvas_id, content_hash) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         (self.course_id, self.source, *key, canvas_id, chash))
+
+    def save_many(self, items: Dict[Key, Tuple[int, str]]):
+        with localdb.connect(SCHEMA) as conn:
+            conn.executemany("INSERT OR REPLACE INTO uploaded_item"
+                             "(course_id, source, quiz_index, question_index, canvas_id, "
+                             "content_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                             [(self.course_id, self.source, *key, canvas_id, chash)
+                              for key, (canvas_id, chash) in items.items()])
+
+    def delete(self, key: Key):
+        quiz_index, question_index = key
+        with localdb.connect(SCHEMA) as conn:
+            if question_index:
+                conn.execute("DELETE FROM uploaded_item WHERE course_id = ? AND source = ? "
+                             "AND quiz_index = ? AND question_index = ?",
+                             (self.course_id, self.source, quiz_index, question_index))
+            else:  # the quiz and its questions
+                conn.execute("DELETE FROM uploaded_item WHERE course_id = ? AND source = ? "
+                             "AND quiz_index = ?",
+                             (self.course_id, self.source, quiz_index))
+
+    def forget(self):
+        """ a next upload creates everything again """
+        with localdb.connect(SCHEMA) as conn:
+            conn.execute("DELETE FROM uploaded_item WHERE course_id = ? AND source = ?",
+                         (self.course_id, self.source))
+
+
+class ChangesUploader:
+    """ Uploads a document to a course: the first time completely (QuizUploader),
+    after that only the quizzes and questions that changed, are new or are removed """
+
+    def __init__(self, api: CanvasApi, source: str, max_workers: Optional[int] = None,
+                 docx: Optional[str] = None):
+        """
+        :param api: CanvasApi
+        :param source: identifies the document across edits, see document_source
+        :param max_workers: number of simultaneous API calls
+        :param docx: the document of the quiz data, its images are uploaded to the course
+        """
+        self.api = api
+        self.source = source
+        self.max_workers = max_workers or config.getint('upload', 'max_workers')
+        self.docx = docx
+        self.stats: Optional[UploadStats] = None  # of the last upload, set before the Done event
+
+    def create_quizzes_from_data(self,
+                                 course_id,
+                                 data,
+                                 question_format: str = "Question {}.",
+                                 gui_root=None,
+                                 gui_queue=None,
+                                 prepared: Optional[PreparedUpload] = None) -> UploadStats:
+        """ same parameters as QuizUploader.create_quizzes_from_data """
+        prepared = prepared or PreparedUpload(data, question_format, docx=self.docx)
+        uploaded = UploadedItems(course_id, self.source)
+        current = uploaded.load()
+        desired = prepared.items
+        hashes = prepared.hashes
+        if not current:
+            uploader = QuizUploader(self.api, max_workers=self.max_workers)
+            self.stats = uploader.create_quizzes_from_data(course_id, data, question_format,
+                                                           gui_root=gui_root, gui_queue=gui_queue,
+                                                           prepared=prepared)
+            created = prepared.journal.load(course_id)
+            uploaded.save_many({key: (canvas_id, hashes[key])
+                                for key, canvas_id in created.items()})
+            return self.stats
+
+        start = time.perf_counter()
+        stats = self.stats = UploadStats()
+        creates, updates, deletes = plan_changes(current, prepared)
+        stats.skipped = len(desired) - len(creates) - len(updates)
+        total = len(creates) + len(updates) + len(deletes) or 1
+        logging.info(f"re-upload of {self.source} to course {course_id}: {len(creates)} new, "
+                     f"{len(updates)} changed, {len(deletes)} removed, "
+                     f"{stats.skipped} unchanged")
+        ids = {key: canvas_id for key, (canvas_id, _) in current.items()}
+        ids_lock = threading.Lock()
+        payloads, stats.errors = (prepared.course_payloads(self.api, course_id, self.max_workers)
+                                  if any(key[1] for key in creates + updates)
+                                  else (prepared.payloads, []))
+        missing = [key for key in creates + updates
+                   if key[1] and payloads[key[0]][key[1] - 1] is None]
+
+        def progress(items: int = 1):
+            """ items are done, changed or not """
+            if gui_root:
+                gui_queue.put(items / total)
+                gui_root.event_generate('<<CreateQuizzes:Progress>>')
+
+        if missing:
+            progress(len(missing))
+        for key in missing:  # not saved, the next upload tries again
+            stats.errors.append(f"{'create' if key in creates else 'update'} quiz {key[0] + 1} "
+                                f"question {key[1]}: its images are not uploaded")
+
+        def apply(action, key):
+            quiz_index, index = key
+            value = desired.get(key) if index == 0 or action == 'delete' \
+                else payloads[quiz_index][index - 1]
+            canvas_id = ids.get(key)
+            if index == 0:
+                if action == 'create':
+                    canvas_id = self.api.create_quiz(course_id, value)
+                elif action == 'update':
+                    self.api.update_quiz(course_id, canvas_id, value)
+                else:
+                    self.api.delete_quiz(course_id, canvas_id)
+            else:
+                quiz_id = ids[(quiz_index, 0)]
+                if action == 'create':
+                    canvas_id = self.api.create_question(course_id, quiz_id, value)
+                elif action == 'update':
+                    self.api.update_question(course_id, quiz_id, canvas_id, value)
+                else:
+                    self.api.delete_question(course_id, quiz_id, canvas_id)
+            with ids_lock:
+                if action == 'delete':
+                    uploaded.delete(key)
+                    for done_key in [k for k in ids
+                                     if k == key or (index == 0 and k[0] == quiz_index)]:
+                        del ids[done_key]
+                else:
+                    ids[key] = canvas_id
+                    uploaded.save(key, canvas_id, hashes[key])
+
+        work = [('create', key) for key in creates if key not in missing] + \
+               [('update', key) for key in updates if key not in missing] + \
+               [('delete', key) for key in deletes]
+        with timing.RunThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # quizzes first, their questions need the quiz id
+            for quiz_phase in (True, False):
+                futures = {executor.submit(apply, action, key): (action, key)
+                           for action, key in work if (key[1] == 0) == quiz_phase}
+                for future in as_completed(futures):
+                    action, key = futures[future]
+                    try:
+                        future.result()
+                    except (requests.RequestException, KeyError) as e:
+                        # KeyError: the quiz of the question could not be created
+                        stats.errors.append(f"{action} quiz {key[0] + 1} "
+                                            f"question {key[1]}: {e!r}")
+                    progress()
+
+        stats.quiz_ids = [ids[key] for key in sorted(ids) if key[1] == 0]
+        stats.question_ids = [ids[key] for key in sorted(ids) if key[1] != 0]
+        # the journal of the new version knows all items now
+        prepared.journal.record_many(course_id, {key: canvas_id
+                                                 for key, canvas_id in ids.items()
+                                                 if key in desired})
+        for error in stats.errors:
+            logging.error(error)
+        timing.record('upload', time.perf_counter() - start, course_id=course_id,
+                      created=len(creates), updated=len(updates), deleted=len(deletes),
+                      unchanged=stats.skipped, errors=len(stats.errors))
+        if gui_root:
+            gui_root.event_generate('<<CreateQuizzes:Done>>')
+        return stats
@@ -0,0 +1,21 @@
+""" the CanvasRobot of the app, made the first time it is needed
+importing word2quiz already makes one (word2quiz.main.cr), that one is used """
+import logging
+import threading
+import time
+
+_lock = threading.Lock()
+_canvasrobot = None
+
+
+def get_canvasrobot():
+    """ :return: the CanvasRobot, waits when it is being made in another thread """
+    global _canvasrobot
+    with _lock:
+        if _canvasrobot is None:
+            start = time.perf_counter()
+            import word2quiz as w2q  # includes canvasrobot
+            _canvasrobot = getattr(w2q.main, 'cr', None) or w2q.CanvasRobot()
+            logging.info(f"CanvasRobot ready in {time.perf_counter() - start:.2f}s")
+    return _canvasrobot
+
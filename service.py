@@ -0,0 +1,288 @@
+""" headless conversion service: the documents of many teachers are converted centrally,
+without the GUI
+
+    python main.py --serve
+
+POST /jobs?filename=exam.docx&num_questions=0&normalize_fontsize=0 with the docx as body
+    202, the job: {"id": ..., "status": "queued", "progress": 0.0, ...}
+GET /jobs/<id>
+    the job, status queued, running, done or error (like the ParseDocument Progress and
+    Done events of the GUI), when done with "result": the quizzes and the not recognized lines,
+    a document with errors in its structure has them in "problems" (paragraph, message),
+    "warnings" are the doubts of that check, e.g. a numbered quiz name
+GET /health
+    the number of workers and of the jobs per status
+
+The documents are parsed in a pool of worker processes that are started and import
+the parse modules once, the progress of a job comes back through a queue """
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+from xml.etree.ElementTree import ParseError
+
+import timing
+from settings import config
+
+JOB_STATUSES = ('queued', 'running', 'done', 'error')
+PROGRESS_STEP = 0.01  # smaller progress changes are not sent by the workers
+
+_progress_queue = None  # of the worker process, see init_worker
+
+
+def init_worker(progress_queue):
+    """ runs once in every worker process: keep the queue, import the parse modules
+    and load the translations so a job doesn't wait for them """
+    global _progress_queue
+    _progress_queue = progress_queue
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C stops the service, it stops the pool
+    import document  # noqa: F401 the rules, docxstream and the quizcache with it
+    from translation import get_translator
+    try:
+        get_translator()
+    except OSError as e:  # no locales folder
+        logging.warning(f"no translations in the worker: {e}")
+
+
+def convert_job(job_id: str, filename: str, check_num_questions: int = 0,
+                normalize_fontsize: int = 0) -> dict:
+    """
+    Parse the document of a job, runs in a worker process
+    :return: dict with the result: quizzes (model.to_json), questions, not_recognized (lines)
+    and error, problems and warnings (of validate, found before the parse), seconds
+    """
+    from document import get_parsed_document, IncorrectNumberofQuestions, IncorrectAnswerMarking, \
+        IncorrectNumberofAnswers
+    from model import to_json
+    from validate import validate
+
+    start = time.perf_counter()
+    sent = 0.0
+
+    def progress(fraction: float):
+        nonlocal sent
+        if fraction - sent >= PROGRESS_STEP:
+            sent = fraction
+            _progress_queue.put((job_id, fraction))
+
+    _progress_queue.put((job_id, 0.0))  # running
+    result = dict(quizzes=[], questions=0, not_recognized=[], error='', problems=[], warnings=[])
+    try:
+        validation = validate(filename, check_num_questions=check_num_questions)
+        result['warnings'] = [asdict(warning) for warning in validation.warnings]
+        if not validation.ok:  # rejected without the cost of the parse
+            result.update(error=f"{len(validation.problems)} structural errors, the first: "
+                                f"{validation.problems[0]}",
+                          problems=[asdict(problem) for problem in validation.problems],
+                          seconds=time.perf_counter() - start)
+            return result
+        document = get_parsed_document(filename, normalize_fontsize=normalize_fontsize,
+                                       progress=progress)
+        quiz_data, not_recognized = document.quiz_data(check_num_questions=check_num_questions)
+    except (IncorrectNumberofQuestions, IncorrectAnswerMarking, IncorrectNumberofAnswers) as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    except (zipfile.BadZipFile, ParseError, KeyError, OSError) as e:  # no docx
+        result['error'] = f"{type(e).__name__}: {e}"
+    else:
+        result.update(quizzes=to_json(quiz_data),
+                      questions=sum(len(questions) for _, questions in quiz_data),
+                      not_recognized=list(not_recognized))
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+@dataclass
+class Job:
+    id: str
+    filename: str
+    status: str = 'queued'
+    progress: float = 0.0  # fraction
+    created: float = field(default_factory=time.time)
+    seconds: float = 0.0  # parse time in the worker
+    result: Optional[dict] = None  # when done
+    error: str = ''
+    problems: List[dict] = field(default_factory=list)  # of validate.validate, with an error
+    warnings: List[dict] = field(default_factory=list)  # of validate.validate
+
+
+class JobQueue:
+    """ The jobs of the service and the pool of worker processes that run them """
+
+    def __init__(self, workers: Optional[int] = None, max_jobs: Optional[int] = None):
+        """
+        :param workers: number of worker processes, default the number of cores
+        :param max_jobs: finished jobs kept for GET /jobs/<id>, the oldest go first
+        """
+        self.workers = workers or config.getint('service', 'workers') or os.cpu_count() or 1
+        self.max_jobs = max_jobs or config.getint('service', 'max_jobs')
+        self.folder = tempfile.mkdtemp(prefix='word2quiz-jobs-')  # the uploaded documents
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._progress_queue = multiprocessing.Queue()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                             initargs=(self._progress_queue,))
+        self._progress_thread = threading.Thread(target=self._read_progress, daemon=True)
+        self._progress_thread.start()
+
+    def warm_up(self):
+        """ start all worker processes now instead of at the first jobs """
+        with timing.span('warm up', workers=self.workers):
+            for future in [self._executor.submit(time.sleep, 0.1) for _ in range(self.workers)]:
+                future.result()
+
+    def submit(self, content: bytes, filename: str, check_num_questions: int = 0,
+               normalize_fontsize: int = 0) -> Job:
+        """ queue the conversion of a document, :return: the job """
+        job = Job(id=uuid.uuid4().hex, filename=os.path.basename(filename) or 'document.docx')
+        path = os.path.join(self.folder, f"{job.id}.docx")
+        with open(path, 'wb') as file:
+            file.write(content)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._forget_old_jobs()
+        future = self._executor.submit(convert_job, job.id, path, check_num_questions,
+                                       normalize_fontsize)
+        future.add_done_callback(lambda done: self._finish(job, path, done))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def counts(self) -> Dict[str, int]:
+        """ :return: number of jobs per status """
+        with self._lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {status: statuses.count(status) for status in JOB_STATUSES}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._progress_queue.put(None)
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _finish(self, job: Job, path: str, future):
+        try:
+            result = future.result()
+        except Exception as e:  # of the worker, it died (BrokenProcessPool) or was cancelled
+            result = dict(error=f"{type(e).__name__}: {e}", seconds=0.0)
+        with self._lock:
+            job.seconds = result.pop('seconds')
+            job.error = result['error']
+            job.problems = result.pop('problems', [])
+            job.warnings = result.pop('warnings', [])
+            job.status = 'error' if job.error else 'done'
+            job.progress = 1.0
+            job.result = None if job.error else result
+        os.remove(path)
+        timing.record('job', job.seconds, file=job.filename, status=job.status,
+                      questions=result.get('questions', 0))
+
+    def _read_progress(self):
+        while True:
+            try:
+                message = self._progress_queue.get()
+            except (EOFError, OSError):  # the queue is closed
+                return
+            if message is None:
+                return
+            job_id, fraction = message
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job and job.status in ('queued', 'running'):
+                    job.status = 'running'
+                    job.progress = max(job.progress, fraction)
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items()
+                    if job.status in ('done', 'error')]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    jobs: JobQueue = None  # set by serve
+    max_upload_bytes = 0
+
+    def log_message(self, format, *args):
+        logging.info(f"service {self.address_string()} {format % args}")
+
+    def _reply(self, status: int, obj):
+        body = json.dumps(obj).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') != '/jobs':
+            self._reply(404, dict(error='not found'))
+            return
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            check_num_questions = int(query.get('num_questions', 0))
+            normalize_fontsize = int(query.get('normalize_fontsize', 0))
+        except ValueError:
+            self._reply(400, dict(error='Content-Length, num_questions and normalize_fontsize '
+                                        'are numbers'))
+            return
+        # a negative length would make the read wait for the end of the connection
+        if not 0 < length <= self.max_upload_bytes:
+            self._reply(400, dict(error=f"the docx should be the body of the request, "
+                                        f"at most {self.max_upload_bytes} bytes"))
+            return
+        job = self.jobs.submit(self.rfile.read(length), query.get('filename', ''),
+                               check_num_questions, normalize_fontsize)
+        self._reply(202, asdict(job))
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.rstrip('/')
+        if path == '/health':
+            self._reply(200, dict(workers=self.jobs.workers, jobs=self.jobs.counts()))
+        elif path.startswith('/jobs/'):
+            job = self.jobs.get(path[len('/jobs/'):])
+            if job:
+                self._reply(200, asdict(job))
+            else:
+                self._reply(404, dict(error='no such job'))
+        else:
+            self._reply(404, dict(error='not found'))
+
+
+def serve(host: Optional[str] = None, port: Optional[int] = None,
+          workers: Optional[int] = None):
+    """ run the service until it is interrupted (Ctrl-C) """
+    host = host or config.get('service', 'host')
+    port = port or config.getint('service', 'port')
+    jobs = JobQueue(workers)
+    jobs.warm_up()
+    handler = type('Handler', (ServiceHandler,),
+                   dict(jobs=jobs,
+                        max_upload_bytes=config.getint('service', 'max_upload_mb') * 1024 * 1024))
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    logging.info(f"service on http://{host}:{server.server_port} with {jobs.workers} workers")
+    print(f"word2quiz service on http://{host}:{server.server_port} "
+          f"with {jobs.workers} workers, Ctrl-C stops it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        jobs.shutdown()
@@ -0,0 +1,55 @@
+""" settings of the app, the defaults can be changed in word2quiz.ini, e.g.
+
+[upload]
+max_workers = 8
+"""
+import configparser
+
+CONFIG_FILE = 'word2quiz.ini'
+
+DEFAULTS = {
+    'upload': {
+        'max_workers': '4',  # number of simultaneous Canvas API calls
+        'max_retries': '5',  # when Canvas throttles a request
+        'backoff_seconds': '1.0',  # first wait after throttling, doubles each retry
+        'min_rate_limit_remaining': '50',  # slow down when the Canvas quota drops below this
+        'method': 'api',  # api: a call per quiz and question, qti: one package (see qti.py)
+        'poll_seconds': '2.0',  # interval of the status checks of a qti import
+        'qti_timeout_seconds': '600',  # a qti import that takes longer is an error
+        'fanout_workers': '8',  # simultaneous API calls of an upload to several courses together
+        'image_folder': 'word2quiz',  # folder of the course files for the images of the questions
+    },
+    'http': {
+        'pool_size': '8',  # kept-alive connections to Canvas, at least upload max_workers
+                           # and fanout_workers
+        'connect_timeout': '10',
+        'read_timeout': '60',
+        'retries': '3',  # on connection errors and 502/503/504 responses
+        'backoff_factor': '0.5',
+    },
+    'sync': {
+        'account_id': '',  # account of the courses, default the admin account of canvasrobot
+        'per_page': '100',  # the maximum Canvas allows
+        'max_workers': '8',  # pages fetched simultaneously
+        # the enrollments of a course are fetched again after this time, also when its
+        # total_students is the same (e.g. a student left and another one enrolled)
+        'refresh_hours': '24',
+    },
+    'service': {
+        'host': '127.0.0.1',  # 0.0.0.0 to accept other machines
+        'port': '8080',
+        'workers': '0',  # worker processes, 0 is the number of cores
+        'max_upload_mb': '20',
+        'max_jobs': '1000',  # finished jobs kept for their results, the oldest go first
+    },
+    'watch': {
+        'poll_seconds': '0.5',  # interval of the checks for a saved document
+    },
+    'profile': {
+        'enabled': 'no',  # save a cProfile of every run in profiles/, see timing.py
+    },
+}
+
+config = configparser.ConfigParser()
+config.read_dict(DEFAULTS)
+config.read(CONFIG_FILE)
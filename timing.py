@@ -0,0 +1,153 @@
+""" timing spans of a run (opening a document, converting it, uploading the quizzes)
+every span is written to word2quiz.log as one line of json, the spans of the last run
+are kept for the Stats tab of the GUI and the summary table of the CMD version
+
+    with span('classify', paragraphs=len(pars)) as attrs:
+        ...
+        attrs['questions'] = nr_questions  # known at the end
+
+The run is bound to the context (contextvars) of new_run: runs at the same time (an
+upload while the next document is opened) keep their own spans. A thread or a pool
+started in a run continues it with in_current_run or RunThreadPoolExecutor
+"""
+import cProfile
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from settings import config
+
+PROFILE_FOLDER = 'profiles'
+
+
+class Run:
+    """ The spans of one run, spans may come from several threads """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.time()
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> List[dict]:
+        """ :return: per span name (in order of the first one): count, total and max seconds,
+        the attributes if there is only one span of that name """
+        rows: Dict[str, dict] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            row = rows.setdefault(span['span'], dict(name=span['span'], count=0, total=0.0,
+                                                     max=0.0, attrs={}))
+            row['count'] += 1
+            row['total'] += span['seconds']
+            row['max'] = max(row['max'], span['seconds'])
+            row['attrs'] = span['attrs'] if row['count'] == 1 else {}
+        return list(rows.values())
+
+
+_current_run: contextvars.ContextVar = contextvars.ContextVar('run', default=Run('start'))
+_last_run: Run = _current_run.get()
+
+
+def new_run(name: str) -> Run:
+    """ start a new run, the spans that follow in this context belong to it """
+    global _last_run
+    run = _last_run = Run(name)
+    _current_run.set(run)
+    logging.info(f"run {name}")
+    return run
+
+
+def current_run() -> Run:
+    """ :return: the run the spans of this context belong to """
+    return _current_run.get()
+
+
+def last_run() -> Run:
+    """ :return: the run started last, in any context """
+    return _last_run
+
+
+def in_current_run(function: Callable) -> Callable:
+    """ :return: function that runs in a copy of the current context, e.g. the target
+    of a thread: its spans belong to the current run """
+    return partial(contextvars.copy_context().run, function)
+
+
+class RunThreadPoolExecutor(ThreadPoolExecutor):
+    """ ThreadPoolExecutor whose tasks run in the context of their submit, their spans
+    belong to the run of the caller """
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def record(name: str, seconds: float, level: int = logging.INFO, **attrs):
+    """ add a span that was measured elsewhere, e.g. the sum of many small steps """
+    run = _current_run.get()
+    span = dict(span=name, run=run.name, seconds=round(seconds, 6), attrs=attrs)
+    run.add(span)
+    logging.log(level, json.dumps(span, default=str))
+
+
+@contextmanager
+def span(name: str, level: int = logging.INFO, **attrs):
+    """
+    time the block
+    :param name: name of the span, the summary adds up spans with the same name
+    :param level: logging level, e.g. DEBUG for the (many) api calls
+    :param attrs: sizes and counts, the block can add more to the yielded dict
+    """
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record(name, time.perf_counter() - start, level, **attrs)
+
+
+@contextmanager
+def profiled(name: str):
+    """ profile the block with cProfile (only the current thread) when [profile] enabled,
+    the stats are saved in profiles/, open them with e.g. snakeviz or pstats """
+    if not config.getboolean('profile', 'enabled'):
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(PROFILE_FOLDER, exist_ok=True)
+        filename = os.path.join(PROFILE_FOLDER, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+        profiler.dump_stats(filename)
+        logging.info(f"profile of {name} saved in {filename}")
+
+
+def show_summary(console, run: Optional[Run] = None):
+    """ print the summary of run (default the current one) as a rich table """
+    from rich.table import Table
+
+    run = run or current_run()
+    table = Table(title=f"Run {run.name}")
+    table.add_column("Span")
+    table.add_column("Count", justify="right")
+    table.add_column("Total ms", justify="right")
+    table.add_column("Max ms", justify="right")
+    table.add_column("Details")
+    for row in run.summary():
+        table.add_row(row['name'], str(row['count']), f"{row['total'] * 1000:.1f}",
+                      f"{row['max'] * 1000:.1f}",
+                      ', '.join(f"{key}={value}" for key, value in row['attrs'].items()))
+    console.print(table)
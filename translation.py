@@ -0,0 +1,80 @@
+""" translation of the texts of the app: Dutch or English, from the locales folder """
+import os
+import locale
+import sys
+import gettext
+
+
+def get_translator() -> callable(str):
+    def setup_env_windows(system_lang=True):
+        """ Check environment variables used by gettext
+        and setup LANG if there is none.
+        """
+        if _get_lang_env_var() is not None:
+            return
+        lang = get_language_windows(system_lang)
+        if lang:
+            os.environ['LANGUAGE'] = ':'.join(lang)
+
+    def get_language_windows(system_lang=True):
+        """ Get language code based on current Windows settings.
+        @return: list of languages.
+        """
+        try:
+            import ctypes
+        except ImportError:
+            return [locale.getdefaultlocale()[0]]
+        # get all locales using Windows API
+        lcid_user = ctypes.windll.kernel32.GetUserDefaultLCID()
+        lcid_system = ctypes.windll.kernel32.GetSystemDefaultLCID()
+        if system_lang and lcid_user != lcid_system:
+            lcids = [lcid_user, lcid_system]
+        else:
+            lcids = [lcid_user]
+        return filter(None, [locale.windows_locale.get(i) for i in lcids]) or None
+
+    def setup_env_other(system_lang=True):
+        pass
+
+    def get_language_other(system_lang=True):
+        # standard behavior for POSIX
+        lang = _get_lang_env_var()
+        if lang is not None:
+            return lang.split(':')
+        # next lines needed for MACOS when there are no LC_ or LANG env vars
+        lang, encoding = locale.getdefaultlocale()
+        os.environ["LANG"] = f"{lang}.{encoding}"
+        return [lang]
+
+    def _get_lang_env_var():
+        for i in ('LANGUAGE', 'LC_ALL', 'LC_MESSAGES', 'LANG'):
+            lang = os.environ.get(i)
+            if lang:
+                return lang
+        return None
+
+    if sys.platform == 'win32':
+        setup_env = setup_env_windows
+        get_language = get_language_windows
+    else:
+        setup_env = setup_env_other
+        get_language = get_language_other
+
+    en = gettext.translation('base', localedir='locales', languages=['en'])
+    nl = gettext.translation('base', localedir='locales', languages=['nl'])
+
+    # en.install()  # assume en
+    # nl.install()
+    # loc = locale.getlocale()
+    # locale.setlocale(locale.LC_ALL, 'nl_NL')
+    # print(os.environ["LC_ALL"])
+    # os.environ["LC_ALL"] = "nl_NL"
+
+    loc = locale.getlocale()
+
+    language = get_language()
+    if language and 'nl' in language[0]:
+        return nl.gettext
+    else:
+        return en.gettext
+
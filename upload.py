@@ -0,0 +1,410 @@
+""" create quizzes and their questions in Canvas with a bounded number of concurrent API calls
+honoring the rate limit of Canvas """
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import as_completed
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+import images
+import timing
+from settings import config
+from httpsession import connection_stats, share_session
+from journal import UploadJournal
+
+
+@dataclass
+class UploadStats:
+    quiz_ids: List[int] = field(default_factory=list)
+    question_ids: List[int] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    skipped: int = 0  # created in an earlier (interrupted) upload
+
+
+class RateLimiter:
+    """ Shared by all threads of an upload: when Canvas signals throttling
+    (low X-Rate-Limit-Remaining, 403 Rate Limit Exceeded or 429) every
+    request waits until the pause is over """
+
+    def __init__(self, min_remaining: Optional[float] = None,
+                 max_concurrent: Optional[int] = None):
+        """
+        :param min_remaining: slow down when the quota of Canvas drops below this
+        :param max_concurrent: number of requests at the same time, unlimited by default
+        (the uploaders bound it with their number of workers)
+        """
+        self.min_remaining = (min_remaining if min_remaining is not None
+                              else config.getfloat('upload', 'min_rate_limit_remaining'))
+        self._lock = threading.Lock()
+        self._pause_until = 0.0
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+
+    @contextmanager
+    def slot(self):
+        """ hold one of the max_concurrent request slots during the block """
+        if self._slots is None:
+            yield
+            return
+        with self._slots:
+            yield
+
+    def wait(self):
+        with self._lock:
+            delay = self._pause_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+
+    def update(self, response: requests.Response):
+        """ slow down a little when the quota of Canvas is almost used """
+        remaining = response.headers.get('X-Rate-Limit-Remaining')
+        if remaining is not None and float(remaining) < self.min_remaining:
+            self.pause(0.5)
+
+
+def is_throttled(response: requests.Response) -> bool:
+    return (response.status_code == 429 or
+            (response.status_code == 403 and b'Rate Limit Exceeded' in response.content))
+
+
+class CanvasApi:
+    """ Minimal client for the Canvas REST API calls of the upload and the course sync """
+
+    def __init__(self, base_url: str, api_key: str,
+                 session: Optional[requests.Session] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
+        """
+        :param base_url: url of the Canvas instance, without /api/v1
+        :param api_key: Canvas access token
+        :param session: requests session to use, a new (unpooled) one by default. It can be
+        shared (canvasapi of canvasrobot, other logins), the token goes with each request
+        :param rate_limiter: shared rate limiter, a new one by default
+        """
+        self.base_url = base_url.rstrip('/')
+        self.session = session or requests.Session()
+        self.auth_headers = {'Authorization': f"Bearer {api_key}"}
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_retries = config.getint('upload', 'max_retries')
+        self.backoff_seconds = config.getfloat('upload', 'backoff_seconds')
+
+    @classmethod
+    def from_canvasrobot(cls, canvasrobot, **kwargs):
+        """ :return: CanvasApi using the url and api key canvasrobot is logged in with
+        and the pooled session it shares with canvasrobot """
+        # noinspection PyProtectedMember
+        requester = canvasrobot.canvas._Canvas__requester
+        kwargs.setdefault('session', share_session(canvasrobot))
+        return cls(canvasrobot.canvas_url, requester.access_token, **kwargs)
+
+    def with_rate_limiter(self, rate_limiter: RateLimiter) -> 'CanvasApi':
+        """ :return: a copy with the same session that uses rate_limiter """
+        api = copy.copy(self)
+        api.rate_limiter = rate_limiter
+        return api
+
+    def request(self, method: str, path: str, **kwargs):
+        """
+        :param method: http method
+        :param path: path after /api/v1/
+        :param kwargs: passed to requests
+        :return: the decoded json response
+        :raises requests.HTTPError when Canvas refuses, also after max_retries throttled attempts
+        """
+        response = self.send(method, path, **kwargs)
+        return response.json() if response.content else None
+
+    def get_page(self, path: str, **kwargs):
+        """
+        :param path: path after /api/v1/ or a complete url from a Link header
+        :return: the decoded json response, the links of the Link header (next, last etc.)
+        """
+        response = self.send('GET', path, **kwargs)
+        return response.json(), {rel: link['url'] for rel, link in response.links.items()}
+
+    def send(self, method: str, path: str, **kwargs) -> requests.Response:
+        """ same as request, but :return: the response """
+        url = path if path.startswith(('http://', 'https://')) \
+            else f"{self.base_url}/api/v1/{path.lstrip('/')}"
+        headers = {**self.auth_headers, **kwargs.pop('headers', {})}
+        with timing.span(f"api {method}", logging.DEBUG, path=path) as attrs:
+            for attempt in range(self.max_retries + 1):
+                self.rate_limiter.wait()
+                with self.rate_limiter.slot():
+                    response = self.session.request(method, url, headers=headers, **kwargs)
+                self.rate_limiter.update(response)
+                if not is_throttled(response) or attempt == self.max_retries:
+                    break
+                retry_after = response.headers.get('Retry-After', '')
+                delay = (float(retry_after) if retry_after.replace('.', '', 1).isdigit()
+                         else self.backoff_seconds * 2 ** attempt)
+                logging.info(f"Canvas throttled {method} {path}, retry in {delay:.1f}s")
+                self.rate_limiter.pause(delay)
+            attrs.update(status=response.status_code, attempts=attempt + 1)
+        response.raise_for_status()
+        return response
+
+    def post_file(self, upload_url: str, upload_params: dict, filename: str,
+                  content: Optional[bytes] = None):
+        """
+        Step 2 and 3 of a Canvas file upload, after step 1 (e.g. a content migration
+        with a pre_attachment) returned upload_url and upload_params
+        :param filename: the file to upload, only its name when content is given
+        :param content: of the file, e.g. read from a zip
+        :return: the decoded json of the file object
+        """
+        size = len(content) if content is not None else os.path.getsize(filename)
+        with timing.span('api upload', logging.DEBUG, bytes=size) as attrs:
+            with ExitStack() as stack:
+                file = content if content is not None else stack.enter_context(
+                    open(filename, 'rb'))
+                # the upload url is signed, it gets no token (it can be another host)
+                response = self.session.post(upload_url, data=upload_params,
+                                             files={'file': (os.path.basename(filename), file)},
+                                             allow_redirects=False)
+            attrs['status'] = response.status_code
+        if response.is_redirect:  # confirm the upload
+            return self.request('GET', response.headers['Location'])
+        response.raise_for_status()
+        return response.json()
+
+    def create_quiz(self, course_id, title: str, quiz_type: str = 'practice_quiz') -> int:
+        quiz = self.request('POST', f"courses/{course_id}/quizzes",
+                            json=dict(quiz=dict(title=title, quiz_type=quiz_type)))
+        return quiz['id']
+
+    def update_quiz(self, course_id, quiz_id: int, title: str):
+        self.request('PUT', f"courses/{course_id}/quizzes/{quiz_id}",
+                     json=dict(quiz=dict(title=title)))
+
+    def delete_quiz(self, course_id, quiz_id: int):
+        self.request('DELETE', f"courses/{course_id}/quizzes/{quiz_id}")
+
+    def create_question(self, course_id, quiz_id: int, question: dict) -> int:
+        quiz_question = self.request('POST', f"courses/{course_id}/quizzes/{quiz_id}/questions",
+                                     json=dict(question=question))
+        return quiz_question['id']
+
+    def update_question(self, course_id, quiz_id: int, question_id: int, question: dict):
+        self.request('PUT', f"courses/{course_id}/quizzes/{quiz_id}/questions/{question_id}",
+                     json=dict(question=question))
+
+    def delete_question(self, course_id, quiz_id: int, question_id: int):
+        self.request('DELETE', f"courses/{course_id}/quizzes/{quiz_id}/questions/{question_id}")
+
+
+def question_payload(question_format: str, index: int, question_text: str, answers) -> dict:
+    """ :return: the question as Canvas expects it, position keeps the order when created concurrently """
+    return dict(question_name=question_format.format(index),
+                question_text=question_text,
+                question_type='multiple_choice_question',
+                points_possible=1.0,
+                position=index,
+                answers=[dict(answer_html=answer.answer_html,
+                              answer_weight=answer.answer_weight)
+                         for answer in answers])
+
+
+def content_hash(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+Key = Tuple[int, int]  # (quiz_index, question_index), question_index 0 is the quiz itself
+
+
+class PreparedUpload:
+    """ The quiz data as Canvas payloads with their hashes, the same for every course:
+    an upload to several courses builds it once. The images of the payloads are
+    placeholders until course_payloads uploads them to a course """
+
+    def __init__(self, data, question_format: str = "Question {}.", docx: Optional[str] = None):
+        """
+        :param data: the quizdata
+        :param question_format: used to create the question name. Should contain '{}'
+        :param docx: the document of data, its images are uploaded with the questions
+        """
+        if '{}' not in question_format:
+            raise ValueError(f"parameter 'question_format(={question_format})' "
+                             f"should contain {{}} als placeholder")
+        self.data = data
+        self.question_format = question_format
+        with timing.span('prepare', quizzes=len(data)) as attrs:
+            self.payloads: List[List[dict]] = [
+                [question_payload(question_format, index, question_text, answers)
+                 for index, (question_text, answers) in enumerate(questions, start=1)]
+                for _, questions in data]
+            self.journal = UploadJournal.for_data(data)
+            attrs['questions'] = sum(len(payloads) for payloads in self.payloads)
+        self.images = images.DocumentImages(docx) if docx else None
+
+    @cached_property
+    def items(self) -> Dict[Key, object]:
+        """ :return: (quiz_index, question_index) -> title (quiz) or payload (question) """
+        items = {}
+        for quiz_index, (quiz_name, _) in enumerate(self.data):
+            items[(quiz_index, 0)] = quiz_name
+            for index, payload in enumerate(self.payloads[quiz_index], start=1):
+                items[(quiz_index, index)] = payload
+        return items
+
+    @cached_property
+    def hashes(self) -> Dict[Key, str]:
+        """ :return: (quiz_index, question_index) -> content_hash of the item,
+        of a question with images also of their content """
+        hashes = {}
+        for key, value in self.items.items():
+            image_hashes = (images.payload_hashes(value, self.images)
+                            if self.images and key[1] else [])
+            hashes[key] = content_hash([value, image_hashes] if image_hashes else value)
+        return hashes
+
+    def course_payloads(self, api: 'CanvasApi', course_id,
+                        max_workers: Optional[int] = None
+                        ) -> Tuple[List[List[Optional[dict]]], List[str]]:
+        """
+        Upload the images the course doesn't have yet
+        :return: the payloads pointing at the images in the course, None for a question
+        with an image that failed, the errors of the images
+        """
+        if self.images is None:
+            return self.payloads, []
+        return images.upload_images(api, course_id, self.payloads, self.images,
+                                    max_workers=max_workers)
+
+
+class QuizUploader:
+    """ Creates the quizzes and questions of parsed quiz data using
+    at most max_workers concurrent API calls """
+
+    def __init__(self, api: CanvasApi, max_workers: Optional[int] = None,
+                 docx: Optional[str] = None):
+        """
+        :param api: CanvasApi
+        :param max_workers: number of simultaneous API calls
+        :param docx: the document of the quiz data, its images are uploaded to the course
+        """
+        self.api = api
+        self.max_workers = max_workers or config.getint('upload', 'max_workers')
+        self.docx = docx
+        self.stats: Optional[UploadStats] = None  # of the last upload, set before the Done event
+
+    def create_quizzes_from_data(self,
+                                 course_id,
+                                 data,
+                                 question_format: str = "Question {}.",
+                                 gui_root=None,
+                                 gui_queue=None,
+                                 resume: bool = True,
+                                 prepared: Optional[PreparedUpload] = None) -> UploadStats:
+        """
+        Same as canvasrobot.create_quizzes_from_data, but questions are created
+        concurrently as soon as their quiz exists
+        :param course_id: the quizzes are added to this course
+        :param data: the quizdata
+        :param question_format: used to create the question name. Should contain '{}'
+        :param gui_root: used in combination with GUI (tkinter)
+        :param gui_queue: used in combination with GUI, receives the progress per question
+        :param resume: skip the quizzes and questions the journal has for this data and course
+        :param prepared: the payloads of data, when they are built already
+        :return: UploadStats, errors contains the calls that failed
+        """
+        prepared = prepared or PreparedUpload(data, question_format, docx=self.docx)
+        start = time.perf_counter()
+        stats = UploadStats()
+        journal = prepared.journal
+        done = journal.load(course_id) if resume else {}
+        payloads, stats.errors = prepared.course_payloads(self.api, course_id, self.max_workers)
+        total_questions = sum(len(questions) for _, questions in data) or 1
+        quiz_ids: List[Optional[int]] = [None] * len(data)
+        question_ids = [[None] * len(questions) for _, questions in data]
+
+        def progress(questions: int = 1):
+            """ questions are done, created or not """
+            if gui_root:
+                gui_queue.put(questions / total_questions)
+                gui_root.event_generate('<<CreateQuizzes:Progress>>')
+
+        def create_quiz(quiz_index, quiz_name):
+            quiz_id = self.api.create_quiz(course_id, quiz_name)
+            journal.record(course_id, quiz_index, 0, quiz_id)
+            return quiz_id
+
+        def create_question(quiz_index, index, quiz_id, payload):
+            question_id = self.api.create_question(course_id, quiz_id, payload)
+            journal.record(course_id, quiz_index, index, question_id)
+            return question_id
+
+        with timing.RunThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            question_futures = {}
+
+            def submit_questions(quiz_index, quiz_id):
+                for index, payload in enumerate(payloads[quiz_index], start=1):
+                    if (quiz_index, index) in done:
+                        question_ids[quiz_index][index - 1] = done[(quiz_index, index)]
+                        stats.skipped += 1
+                        progress()
+                        continue
+                    if payload is None:  # not in the journal, resume creates it
+                        stats.errors.append(f"Quiz '{data[quiz_index][0]}' "
+                                            f"{question_format.format(index)}: "
+                                            f"its images are not uploaded")
+                        progress()
+                        continue
+                    future = executor.submit(create_question, quiz_index, index, quiz_id, payload)
+                    question_futures[future] = (quiz_index, index)
+
+            quiz_futures = {}
+            for quiz_index, (quiz_name, _) in enumerate(data):
+                if (quiz_index, 0) in done:
+                    quiz_ids[quiz_index] = done[(quiz_index, 0)]
+                    stats.skipped += 1
+                    submit_questions(quiz_index, quiz_ids[quiz_index])
+                    continue
+                quiz_futures[executor.submit(create_quiz, quiz_index, quiz_name)] = quiz_index
+
+            for future in as_completed(quiz_futures):
+                quiz_index = quiz_futures[future]
+                try:
+                    quiz_ids[quiz_index] = future.result()
+                except (requests.RequestException, KeyError) as e:  # KeyError: no id in reply
+                    stats.errors.append(f"Quiz '{data[quiz_index][0]}': {e!r}")
+                    progress(len(data[quiz_index][1]))  # its questions are not created
+                    continue
+                submit_questions(quiz_index, quiz_ids[quiz_index])
+
+            for future in as_completed(question_futures):
+                quiz_index, index = question_futures[future]
+                try:
+                    question_ids[quiz_index][index - 1] = future.result()
+                except (requests.RequestException, KeyError) as e:
+                    stats.errors.append(f"Quiz '{data[quiz_index][0]}' "
+                                        f"{question_format.format(index)}: {e!r}")
+                progress()
+
+        stats.quiz_ids = [quiz_id for quiz_id in quiz_ids if quiz_id is not None]
+        stats.question_ids = [question_id for ids in question_ids
+                              for question_id in ids if question_id is not None]
+        if stats.skipped:
+            logging.info(f"upload to course {course_id} resumed, "
+                         f"{stats.skipped} quizzes/questions already created")
+        for error in stats.errors:
+            logging.error(error)
+        connection_stats.log()
+        timing.record('upload', time.perf_counter() - start, course_id=course_id,
+                      quizzes=len(data), questions=sum(len(questions) for _, questions in data),
+                      skipped=stats.skipped, errors=len(stats.errors))
+        self.stats = stats
+        if gui_root:
+            gui_root.event_generate('<<CreateQuizzes:Done>>')
+        return stats
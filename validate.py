@@ -0,0 +1,123 @@
+""" fail-fast check of the structure of a quiz document before it is parsed: the plain text
+of the paragraphs (docxstream.iter_texts, no html) is enough to count the sections,
+questions, answers and right answers. All errors are found in one pass, with the position
+of their paragraph, in a fraction of the time of the full parse
+
+    validation = validate('data/exam.docx', check_num_questions=6)
+    if not validation.ok:
+        print('\\n'.join(str(problem) for problem in validation.problems))
+
+The plain text has no formatting: a numbered paragraph can be a question or a quiz name or
+title ("1. Module 4"), it counts as a question when answers follow it. Only the problems the
+full parse is certain to raise reject a document, the others are warnings. A document that
+passes can still have lines that are not recognized, the full parse finds them """
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import docxstream
+import timing
+
+ANSWERS_PER_QUESTION = 4  # like the full parse (document.ParsedDocument.quiz_data) checks
+# the numbers and letters of the question and answer rules of word2quiz, on the plain text,
+# a numbered quiz name or title matches QUESTION too
+QUESTION = re.compile(r'(?P<id>\d+)[).]\s+')
+ANSWER = re.compile(r'(?P<id>[a-d])\)\s+(?P<text>.*)')
+
+
+@dataclass
+class Problem:
+    paragraph: int  # position in the document, from 1, 0 is the document as a whole
+    message: str
+
+    def __str__(self):
+        return f"paragraph {self.paragraph}: {self.message}" if self.paragraph else self.message
+
+
+@dataclass
+class _Question:
+    paragraph: int
+    nr: int  # 0 for the answers before the first question
+    answers: int = 0
+    right: int = 0  # answers marked with '!'
+
+
+@dataclass
+class Validation:
+    sections: int = 0
+    questions: int = 0
+    answers: int = 0
+    problems: List[Problem] = field(default_factory=list)  # the parse raises these
+    warnings: List[Problem] = field(default_factory=list)  # the parse may go on
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+def check_question(question: Optional[_Question], validation: Validation):
+    """ count question when answers follow it and check them, like the full parse """
+    if question is None:
+        return
+    if not question.answers:  # the parse skips it, or it is a quiz name or title
+        validation.warnings.append(Problem(question.paragraph,
+                                           f"numbered paragraph {question.nr} has no answers, "
+                                           f"not counted as a question"))
+        return
+    validation.questions += 1
+    if question.nr == 1:
+        validation.sections += 1
+    name = (f"quiz {max(validation.sections, 1)} question {question.nr}" if question.nr
+            else "the answers before the first question")
+    if question.answers != ANSWERS_PER_QUESTION:
+        validation.problems.append(Problem(question.paragraph,
+                                           f"{name} has {question.answers} answers "
+                                           f"instead of {ANSWERS_PER_QUESTION}"))
+    if question.right != 1:
+        validation.problems.append(Problem(question.paragraph,
+                                           f"{name} has {question.right} answers marked "
+                                           f"right with '!' instead of 1"))
+
+
+def validate(filename: str, check_num_questions: int = 0) -> Validation:
+    """
+    :param filename: the Word docx
+    :param check_num_questions: number of questions (0 is no check)
+    :return: Validation with the numbers of the document, its problems and warnings in
+    document order, a problem of the document as a whole (the number of questions) comes last
+    """
+    start = time.perf_counter()
+    validation = Validation()
+    with timing.span('validate', file=os.path.basename(filename)) as attrs:
+        question: Optional[_Question] = None
+        for position, text in enumerate(docxstream.iter_texts(filename), 1):
+            text = text.strip()
+            question_match = QUESTION.match(text)
+            if question_match:
+                check_question(question, validation)
+                question = _Question(position, int(question_match.group('id')))
+                continue
+            answer_match = ANSWER.match(text)
+            if not answer_match:
+                continue
+            if question is None:  # the parse makes a question without text of them
+                validation.warnings.append(Problem(position,
+                                                   f"answer {answer_match.group('id')}) "
+                                                   f"before the first question"))
+                question = _Question(position, 0)
+            validation.answers += 1
+            question.answers += 1
+            question.right += '!' in answer_match.group('text')
+        check_question(question, validation)
+        if not validation.questions:
+            validation.problems.append(Problem(0, "no questions"))
+        elif check_num_questions and validation.questions != check_num_questions:
+            validation.problems.append(Problem(0, f"{validation.questions} questions instead of "
+                                                  f"{check_num_questions}"))
+        attrs.update(questions=validation.questions, problems=len(validation.problems),
+                     warnings=len(validation.warnings))
+    validation.seconds = time.perf_counter() - start
+    return validation
@@ -0,0 +1,153 @@
+""" watch mode: parse a document again as soon as it is saved in Word. Only the paragraphs
+that changed are parsed again (docxstream.ParagraphMemo), the files are polled for a new
+modification time and the lock files of Word (~$name.docx) are ignored
+
+    watcher = DocumentWatcher('data/exam.docx', on_change)  # or a folder or glob
+    watcher.start()
+"""
+import logging
+import os
+import threading
+import time
+import zipfile
+from typing import Callable, Dict, List, Optional, Tuple
+from xml.etree.ElementTree import ParseError
+
+import docxstream
+import timing
+from document import get_parsed_document, IncorrectNumberofQuestions, IncorrectAnswerMarking, \
+    IncorrectNumberofAnswers, ParsedDocument
+from settings import config
+
+# receives the filename, the parsed document and the number of changed question blocks
+OnChange = Callable[[str, ParsedDocument, int], None]
+
+
+def is_lock_file(filename: str) -> bool:
+    """ :return: True for the file Word makes next to an open document, e.g. ~$rsion2.docx """
+    return os.path.basename(filename).startswith('~$')
+
+
+def find_documents(path_or_glob: str) -> List[str]:
+    """ :return: the docx files of a folder or glob, or the file itself, without lock files """
+    if os.path.isdir(path_or_glob) or any(char in path_or_glob for char in '*?['):
+        from batch import find_documents as find_batch_documents
+        return [filename for filename in find_batch_documents(path_or_glob)
+                if not is_lock_file(filename)]
+    return [] if is_lock_file(path_or_glob) else [path_or_glob]
+
+
+def changed_blocks(old: Optional[ParsedDocument], new: ParsedDocument) -> int:
+    """ :return: number of question blocks of new that are not in old """
+    old_blocks = {tuple(block) for block in old.blocks()} if old else set()
+    return sum(1 for block in new.blocks() if tuple(block) not in old_blocks)
+
+
+class DocumentWatcher:
+    """ Polls documents in a thread of its own, a saved document is parsed again
+    and passed to on_change """
+
+    def __init__(self, path_or_glob: str, on_change: OnChange, normalize_fontsize: int = 0,
+                 poll_seconds: Optional[float] = None):
+        """
+        :param path_or_glob: a docx, a folder or a glob pattern (new files are found too)
+        :param on_change: called in the watch thread after a document is parsed again
+        :param normalize_fontsize: if > 0 change fontsizes Q&A
+        :param poll_seconds: interval of the checks, default [watch] poll_seconds
+        """
+        self.path_or_glob = path_or_glob
+        self.on_change = on_change
+        self.normalize_fontsize = normalize_fontsize
+        self.poll_seconds = (poll_seconds if poll_seconds is not None
+                             else config.getfloat('watch', 'poll_seconds'))
+        self._parsed: Dict[str, Tuple[int, int]] = {}  # filename -> (mtime_ns, size) parsed
+        self._saving: Dict[str, Tuple[int, int]] = {}  # changed, parsed when it stays the same
+        self._memos: Dict[str, docxstream.ParagraphMemo] = {}
+        self._documents: Dict[str, ParsedDocument] = {}
+        self.seconds: Dict[str, float] = {}  # filename -> time of its last parse
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        # the parses are spans of the run that started the watch
+        self._thread = threading.Thread(target=timing.in_current_run(self.run), daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = False):
+        """
+        :param wait: until the thread ended. Not in the Tk thread: on_change may be waiting
+        for it (event_generate), the thread ends by itself and doesn't call on_change anymore
+        """
+        self._stop.set()
+        if wait and self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def run(self):
+        """ the first check reads the documents into the memos, the next ones report changes """
+        self.check(initial=True)
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def check(self, initial: bool = False):
+        for filename in find_documents(self.path_or_glob):
+            if self._stop.is_set():
+                return
+            try:
+                stat = os.stat(filename)
+            except FileNotFoundError:  # Word replaces the file when it saves
+                continue
+            key = (stat.st_mtime_ns, stat.st_size)
+            if self._parsed.get(filename) == key:
+                continue
+            if not initial and self._saving.get(filename) != key:
+                self._saving[filename] = key  # the save may not be complete, next check
+                continue
+            self._saving.pop(filename, None)
+            self.parse(filename, key, notify=not initial)
+
+    def parse(self, filename: str, key: Tuple[int, int], notify: bool = True):
+        memo = self._memos.setdefault(filename, docxstream.ParagraphMemo())
+        start = time.perf_counter()
+        try:
+            with timing.span('watch', file=os.path.basename(filename)) as attrs:
+                if filename in self._documents:
+                    document = get_parsed_document(filename, self.normalize_fontsize, memo=memo)
+                else:  # not from the caches: this read fills the memo
+                    document = ParsedDocument(filename, self.normalize_fontsize, memo=memo)
+                changed = changed_blocks(self._documents.get(filename), document)
+                attrs.update(changed_blocks=changed, reused=memo.reused)
+        except (zipfile.BadZipFile, ParseError, KeyError, OSError) as e:
+            logging.info(f"watch: {filename} can't be read (yet): {e}")
+            return
+        self.seconds[filename] = time.perf_counter() - start
+        self._parsed[filename] = key
+        self._documents[filename] = document
+        if notify and not self._stop.is_set():
+            self.on_change(filename, document, changed)
+
+
+def run_console(console, path_or_glob: str, normalize_fontsize: int = 0,
+                check_num_questions: int = 0):
+    """ watch and print a line per saved document (and its not recognized lines)
+    until Ctrl-C """
+    def on_change(filename: str, document: ParsedDocument, changed: int):
+        try:
+            quiz_data, not_recognized = document.quiz_data(check_num_questions=check_num_questions)
+        except (IncorrectNumberofQuestions, IncorrectAnswerMarking, IncorrectNumberofAnswers) as e:
+            console.print(f"{os.path.basename(filename)}: [bold red]{type(e).__name__}:[/] {e}")
+            return
+        console.print(f"{time.strftime('%H:%M:%S')} {os.path.basename(filename)}: "
+                      f"{changed} question blocks changed, {len(quiz_data)} quizzes, "
+                      f"{sum(len(questions) for _, questions in quiz_data)} questions, "
+                      f"{len(not_recognized)} not recognized ({watcher.seconds[filename] * 1000:.0f}ms)")
+        for line in not_recognized:
+            console.print(f"  [yellow]{line}[/]")
+
+    watcher = DocumentWatcher(path_or_glob, on_change, normalize_fontsize=normalize_fontsize)
+    console.print(f"watching {path_or_glob}, Ctrl-C stops")
+    watcher.start()
+    try:
+        while watcher._thread.is_alive():
+            watcher._thread.join(0.5)
+    except KeyboardInterrupt:
+        watcher.stop(wait=True)